@@ -0,0 +1,318 @@
+"""
+Analysis prompt builders
+Prompt text, completion arguments and artifact keys for the fraud, merchant, customer and
+dispute analyses, plus the artifact store and prompt budget they are versioned by. Shared by
+the API (main.py), the warmup and the dispute triage job workers, so none of them imports main.
+"""
+
+import fraud_scoring
+from artifact_store import AnalysisArtifactStore
+from merchant_anomalies import prompt_facts
+from prompt_encoding import PROMPT_ENCODING, embed
+from token_budget import PromptBudget, clip_text, drop, keep_last
+
+# Bump whenever a prompt builder or *_completion spec changes so stale artifacts are not served
+PROMPT_TEMPLATE_VERSION = "3"
+
+FRAUD_AUDIENCES = ["Risk Analyst", "Executive Summary", "Customer-friendly"]
+UPGRADE_OUTPUT_MODES = ["Executive", "Analyst", "Customer-friendly"]
+UPGRADE_FORMAT_MODES = ["JSON", "Narrative"]
+
+# The prompt encoding changes every prompt, so artifacts are versioned by it as well
+analysis_artifacts = AnalysisArtifactStore(template_version=f"{PROMPT_TEMPLATE_VERSION}-{PROMPT_ENCODING}")
+prompt_budget = PromptBudget(template_version=analysis_artifacts.template_version)
+
+# Lowest-priority fields first; applied one at a time only while a prompt is over its token budget
+FRAUD_REDUCERS = [
+    keep_last("historical_transactions", 3),
+    keep_last("historical_transactions", 0),
+]
+MERCHANT_REDUCERS = [
+    clip_text("problem_statement", 200),
+]
+CUSTOMER_REDUCERS = []  # profiles are small and every field feeds the recommendation
+DISPUTE_REDUCERS = [
+    drop("merchant_evidence.delivery_photo_link"),
+    drop("merchant_evidence.tracking_number"),
+    clip_text("dispute_details.customer_statement", 400),
+]
+
+
+def fraud_artifact_key(scenario_id, audience, scored: bool = False) -> str:
+    return f"fraud:{scenario_id}:{audience}" + (":scored" if scored else "")
+
+
+def merchant_artifact_key(merchant_id) -> str:
+    return f"merchant:{merchant_id}"
+
+
+def customer_artifact_key(customer_id, output_mode, format_mode) -> str:
+    return f"customer:{customer_id}:{output_mode}:{format_mode}"
+
+
+def dispute_artifact_key(case_id) -> str:
+    return f"dispute:{case_id}"
+
+
+def fraud_analysis_completion(scenario: dict, audience: str, catalog_scenario: bool = True,
+                              local_score: dict = None) -> dict:
+    """
+    Completion arguments for a fraud analysis, fitted to the endpoint's token budget.
+    Inline (non-catalog) scenarios skip the per-record token count cache, since their ids are not unique.
+    With local_score the model is given the rule-based score and asked for the narrative only.
+    """
+    record_id = fraud_artifact_key(scenario["id"], audience, local_score is not None) if catalog_scenario else None
+    return prompt_budget.fit("analyze-fraud", record_id, scenario, lambda scenario: {
+        "messages": [
+            {"role": "system", "content": "You are a fraud analysis expert for Mastercard. Analyze transaction data and explain fraud risks clearly."},
+            {"role": "user", "content": create_fraud_analysis_prompt(scenario, audience, local_score)}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 800
+    }, FRAUD_REDUCERS)
+
+
+def create_fraud_analysis_prompt(scenario: dict, audience: str, local_score: dict = None) -> str:
+    audience_instructions = {
+        "Risk Analyst": "Provide a detailed technical analysis with specific fraud indicators, risk scores, and model reasoning. Use industry terminology.",
+        "Executive Summary": "Provide a concise, high-level summary focusing on business impact and key risk factors. Keep it brief and actionable.",
+        "Customer-friendly": "Explain in simple, non-technical language that a cardholder would understand. Be empathetic and clear."
+    }
+    
+    instruction = audience_instructions.get(audience, audience_instructions["Risk Analyst"])
+    
+    scenario_json = embed(scenario)
+    
+    if local_score is None:
+        task = "Analyze"
+        requests = """Please provide:
+1. A risk score assessment (Low/Medium/High/Critical)
+2. Key fraud indicators identified
+3. Explanation of why this transaction was flagged
+4. Recommended action"""
+    else:
+        task = "Explain"
+        requests = f"""Our scoring engine has already rated it {fraud_scoring.describe(local_score)}.
+Do not re-score it. Please provide:
+1. Key fraud indicators identified
+2. Explanation of why this transaction was flagged
+3. Recommended action"""
+    
+    prompt = f"""{task} this transaction that was flagged for potential fraud:
+
+{scenario_json}
+
+Audience: {audience}
+Instructions: {instruction}
+
+{requests}
+
+Format your response appropriately for the {audience} audience."""
+    
+    return prompt
+
+
+def merchant_narrative_completion(merchant_id, merchant) -> dict:
+    """Completion arguments for a merchant narrative, fitted to the endpoint's token budget"""
+    return prompt_budget.fit("merchant-narrative", merchant_artifact_key(merchant_id), merchant, lambda merchant: {
+        "messages": [
+            {"role": "system", "content": "You are a Senior Strategic Fintech Consultant acting as a Virtual CFO."},
+            {"role": "user", "content": build_merchant_narrative_prompt(merchant_id, merchant)}
+        ],
+        "max_tokens": 2000,
+        "temperature": 0.7
+    }, MERCHANT_REDUCERS)
+
+
+def build_merchant_narrative_prompt(merchant_id, merchant):
+    """Build the master prompt for merchant narrative generation"""
+    
+    # Exact statistics and ranked anomalies computed locally instead of the raw 12-month dump
+    kpi_facts = prompt_facts(merchant_id)
+    months = merchant["monthly_data"]
+    period = f"{months[0]['month']} - {months[-1]['month']}" if months else "n/a"
+    top_mcc = months[-1]["top_mcc"] if months else "n/a"
+    
+    prompt = f"""You are provided with precomputed statistics for {len(months)} months of KPI data for a specific merchant. All numbers below are exact; anomalies were detected with robust z-scores, trend residuals and changepoint tests. Your task is to act as their 'Virtual CFO' and generate a highly structured, actionable 'Merchant Growth & Health Narrative.'
+
+**Merchant Profile:**
+- Name: {merchant["name"]}
+- Business Type: {merchant["business_type"]}
+- Location: {merchant["location"]}
+- Known Business Challenge: {merchant["problem_statement"]}
+- Top MCC: {top_mcc}
+- Period: {period}
+
+**KPI Findings:**
+{kpi_facts}
+
+**Your Task:**
+Generate a comprehensive strategic report with the following sections:
+
+1. **Executive Scorecard**: A 2-sentence summary of the business's current state (e.g., 'Scaling Rapidly,' 'Efficiency Recovery Phase,' or 'Churn Risk Alert').
+
+2. **The "Why" Behind the Numbers**: Explain one non-obvious correlation from the correlations above (e.g., how a change in Average Ticket Size relates to transaction volume, or how Saturday revenue patterns affect overall performance).
+
+3. **Anomaly Detection**: Using the detected anomalies (prefer those marked "last 90 days"; otherwise the most recent three months in the summary), explain the most significant one and hypothesize a business reason for it (e.g., a sudden spike in chargebacks, terminal latency issues, or seasonal patterns).
+
+4. **Strategic Roadmap**: Provide 3 hyper-specific, actionable recommendations. Do NOT use generic advice like 'increase sales.' Instead, use the data to suggest concrete actions like:
+   - "Implement a tiered loyalty program to capture the top 10% of high-frequency shoppers"
+   - "Address terminal latency during peak hours to reduce walk-away losses"
+   - "Investigate the correlation between refund rates and product descriptions"
+
+5. **Risk Assessment**: Flag any brewing issues in Chargeback rates, Refund rates, Terminal Downtime, or Customer Retention that require immediate attention.
+
+**Tone**: Professional, encouraging, and data-driven. Avoid fluff. Be specific and reference actual numbers from the data.
+
+Format your response with clear section headers using **bold** for section titles."""
+    
+    return prompt
+
+
+def customer_upgrade_completion(customer, output_mode, format_mode) -> dict:
+    """Completion arguments for customer upgrade recommendations, fitted to the endpoint's token budget"""
+    item_key = customer_artifact_key(customer["customer_id"], output_mode, format_mode)
+    return prompt_budget.fit("customer-upgrade", item_key, customer, lambda customer: {
+        "messages": [
+            {"role": "system", "content": "You are Mastercard AI – Internal Product Strategy Assistant. You analyze credit card customers to identify upgrade opportunities that increase revenue, retention, and cardholder satisfaction."},
+            {"role": "user", "content": build_customer_upgrade_prompt(customer, output_mode, format_mode)}
+        ],
+        "max_tokens": 1500,
+        "temperature": 0.7
+    }, CUSTOMER_REDUCERS)
+
+
+def build_customer_upgrade_prompt(customer, output_mode, format_mode):
+    """Build the prompt for customer upgrade recommendations"""
+    
+    customer_json = embed(customer)
+    
+    prompt = f"""SYSTEM:
+You are Mastercard AI – Internal Product Strategy Assistant.
+You analyze fictitious credit card customers to identify upgrade opportunities that increase revenue, retention, and cardholder satisfaction.
+You NEVER reference Mastercard confidential data. All examples are generic / public-safe.
+Respond using professional, concise wording suitable for an internal Mastercard strategy review.
+
+USER INPUT:
+CUSTOMER_PROFILE:
+{customer_json}
+
+OUTPUT_MODE: "{output_mode}"
+FORMAT: "{format_mode}"
+
+TASK:
+Based on CUSTOMER_PROFILE, determine:
+
+1. Their spending patterns
+2. Their probable financial behavior
+3. Which upgrade(s) would fit:
+   - Premium card tier (cashback, travel rewards, concierge)
+   - Fraud-protection or subscription-management add-ons
+   - Credit limit increase or BNPL offers
+4. Why the upgrade makes sense (business justification + customer value)
+5. A 1-to-3 sentence pitch that could be emailed or shown in-app (OPTIONAL, only if OUTPUT_MODE is "Customer-friendly")
+
+"""
+
+    if format_mode == "JSON":
+        prompt += """
+Please provide your response in the following JSON structure:
+{{
+  "recommended_upgrades": [
+    {{
+      "offer": "Upgrade name",
+      "reasoning": "Why this fits the customer's behavior",
+      "business_value": "Revenue/retention impact for Mastercard",
+      "customer_value_statement": "Customer-facing benefit statement"
+    }}
+  ]
+}}
+"""
+    else:
+        prompt += """
+Please provide a narrative response with clear sections:
+- **Spending Analysis**
+- **Recommended Upgrades**
+- **Business Justification**
+- **Customer Pitch** (if Customer-friendly mode)
+"""
+
+    if output_mode == "Executive":
+        prompt += "\nTone: Concise, strategic, business-focused. Highlight ROI and retention metrics."
+    elif output_mode == "Analyst":
+        prompt += "\nTone: Detailed, data-driven, analytical. Include specific numbers and behavioral patterns."
+    elif output_mode == "Customer-friendly":
+        prompt += "\nTone: Warm, benefit-focused, easy to understand. Emphasize value to the customer."
+    
+    return prompt
+
+
+def dispute_analysis_completion(dispute) -> dict:
+    """Completion arguments for a dispute forensic analysis, fitted to the endpoint's token budget"""
+    return prompt_budget.fit("analyze-dispute", dispute_artifact_key(dispute["case_id"]), dispute, lambda dispute: {
+        "messages": [
+            {"role": "system", "content": "You are the 'Mastercard First-Party Trust AI,' a specialized forensic agent designed to identify 'Friendly Fraud' (First-Party Misuse). Your goal is to analyze transaction disputes by cross-referencing customer claims against merchant telemetry and carrier evidence."},
+            {"role": "user", "content": build_dispute_analysis_prompt(dispute)}
+        ],
+        "max_tokens": 1500,
+        "temperature": 0.7
+    }, DISPUTE_REDUCERS)
+
+
+def build_dispute_analysis_prompt(dispute):
+    """Build the forensic analysis prompt for dispute investigation"""
+    
+    dispute_json = embed(dispute)
+    
+    prompt = f"""You are analyzing a chargeback dispute to determine if it is legitimate or 'Friendly Fraud' (first-party misuse).
+
+DISPUTE CASE:
+{dispute_json}
+
+INSTRUCTIONS:
+
+1. **Analyze Inconsistencies**: Compare the 'Customer Dispute Reason' against the 'Merchant Evidence Bundle.' Look for contradictions, impossible claims, or suspicious patterns.
+
+2. **Assign a Trust Score** (0-100):
+   - 0-20: High-confidence fraud (customer is lying)
+   - 21-40: Likely fraud (strong evidence against customer)
+   - 41-60: Uncertain (conflicting evidence)
+   - 61-80: Likely legitimate (customer claim seems valid)
+   - 81-100: High-confidence legitimate (strong evidence supports customer)
+
+3. **Draft an Evidence Summary**: Write a concise, professional summary to be sent to the issuing bank. This should be objective and evidence-based.
+
+4. **Highlight Smoking Guns**: Explicitly point out specific data points that prove or disprove the customer's claim. Examples:
+   - GPS coordinates matching home address
+   - Signature matching cardholder name
+   - Device activation logs
+   - Social media posts
+   - Usage patterns
+   - Access logs
+
+5. **Provide a Recommendation**: 
+   - "Deny Chargeback" (if fraud detected)
+   - "Approve Chargeback" (if legitimate)
+   - "Request Additional Evidence" (if uncertain)
+
+**TONE**: Objective, evidence-based, and authoritative. Act like a forensic investigator presenting findings to a judge.
+
+**FORMAT YOUR RESPONSE AS**:
+
+**AI Dispute Analysis: [CASE_ID]**
+**Trust Score**: [0-100]/100 ([Risk Level])
+
+**Evidence Summary**:
+[Your analysis of what the evidence shows]
+
+**Key Inconsistencies** (or **Supporting Evidence** if legitimate):
+[Bullet points of specific contradictions or confirmations]
+
+**Smoking Gun Evidence**:
+[The most damning or exonerating piece of evidence]
+
+**Recommendation**:
+[Your final recommendation with brief justification]
+"""
+    
+    return prompt
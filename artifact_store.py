@@ -0,0 +1,110 @@
+"""
+Versioned store of precomputed analyses
+Artifacts are keyed by (dataset hash + prompt template version, item key) in a SQLite file
+shared by every worker, so endpoints can serve pre-generated analyses without an LLM call.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from customer_profiles import CUSTOMER_PROFILES
+from dispute_cases import DISPUTE_CASES
+from fraud_scenarios import get_fraud_scenarios
+from llm_gateway import CompletionResult
+from merchant_data import MERCHANTS
+
+ANALYSIS_ARTIFACT_PATH = os.getenv(
+    "ANALYSIS_ARTIFACT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_artifacts.sqlite3")
+)
+
+
+def dataset_hash() -> str:
+    """SHA-256 over every dataset the analysis prompts are built from"""
+    payload = json.dumps(
+        [get_fraud_scenarios(), MERCHANTS, CUSTOMER_PROFILES, DISPUTE_CASES],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisArtifactStore:
+    """Precomputed completions for one (dataset, prompt template) version"""
+
+    def __init__(self, template_version: str, path: str = ANALYSIS_ARTIFACT_PATH):
+        self.template_version = template_version
+        self.path = path
+        self.version = f"{dataset_hash()[:16]}-t{template_version}"
+        self._memo = {}
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_artifacts ("
+                "version TEXT NOT NULL, item_key TEXT NOT NULL, content TEXT NOT NULL, "
+                "model TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (version, item_key))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, item_key: str) -> Optional[CompletionResult]:
+        """Return the precomputed analysis for item_key, or None to fall back to live generation"""
+        row = self._memo.get(item_key)
+        if row is None:
+            try:
+                with self._lock:
+                    row = self._connection().execute(
+                        "SELECT content, model FROM analysis_artifacts WHERE version = ? AND item_key = ?",
+                        (self.version, item_key)
+                    ).fetchone()
+            except sqlite3.Error:
+                return None
+            if row is None:
+                return None
+            self._memo[item_key] = row
+        return CompletionResult(content=row[0], model=row[1], cache_status="ARTIFACT")
+
+    async def aget(self, item_key: str) -> Optional[CompletionResult]:
+        """get() for the event loop: memoized artifacts inline, SQLite reads in the threadpool"""
+        row = self._memo.get(item_key)
+        if row is not None:
+            return CompletionResult(content=row[0], model=row[1], cache_status="ARTIFACT")
+        return await run_in_threadpool(self.get, item_key)
+
+    def put(self, item_key: str, result: CompletionResult):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO analysis_artifacts (version, item_key, content, model, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.version, item_key, result.content, result.model, time.time())
+            )
+        self._memo[item_key] = (result.content, result.model)
+
+    def keys(self) -> set:
+        try:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT item_key FROM analysis_artifacts WHERE version = ?", (self.version,)
+                ).fetchall()
+        except sqlite3.Error:
+            return set()
+        return {row[0] for row in rows}
+
+    def prune(self) -> int:
+        """Delete artifacts from older versions; returns the number of rows removed"""
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM analysis_artifacts WHERE version != ?", (self.version,)
+            )
+        return cursor.rowcount
@@ -0,0 +1,59 @@
+"""
+Bounded parallel fan-out
+Runs many coroutines with at most `concurrency` in flight and a per-item timeout, yielding each
+outcome as soon as it finishes so callers can stream results instead of waiting for the batch.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ITEM_TIMEOUT", "60"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+
+@dataclass
+class BatchOutcome:
+    index: int
+    result: Any = None
+    error: Optional[BaseException] = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def run_bounded(jobs: List[Callable[[], Awaitable[Any]]], concurrency: int = BATCH_CONCURRENCY,
+                      timeout: float = BATCH_ITEM_TIMEOUT) -> AsyncIterator[BatchOutcome]:
+    """
+    Yield a BatchOutcome per job in completion order. A job that raises or exceeds `timeout`
+    seconds (queueing time excluded) yields an outcome with `error` set; the rest carry on.
+    Pending jobs are cancelled if the consumer stops early (e.g. the client disconnects).
+    """
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, BATCH_MAX_CONCURRENCY)))
+
+    async def run(index: int, job) -> BatchOutcome:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(job(), timeout)
+                outcome = BatchOutcome(index, result=result)
+            except asyncio.TimeoutError:
+                outcome = BatchOutcome(index, error=TimeoutError(f"Timed out after {timeout:g}s"))
+            except Exception as e:
+                outcome = BatchOutcome(index, error=e)
+            outcome.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            return outcome
+
+    tasks = [asyncio.create_task(run(index, job)) for index, job in enumerate(jobs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,52 @@
+"""
+Per-record memory: scenario dicts vs the slotted Scenario model
+Loads the fraud scenarios N times from JSON (as a large ingest would) and compares the
+retained heap of the raw dicts against domain.Scenario. This is what a consumer holding
+typed scenarios instead of dicts would save; the API process itself keeps only the dicts
+and parses a Scenario on demand for fraud scoring.
+
+Usage:
+    python benchmarks/domain_memory.py --copies 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import domain
+from fraud_scenarios import FRAUD_SCENARIOS
+
+
+def retained_bytes(build) -> int:
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=2000)
+    args = parser.parse_args()
+
+    datasets = [
+        ("Scenario", [json.dumps(s) for s in FRAUD_SCENARIOS], domain.Scenario.from_dict),
+    ]
+
+    print(f"{'model':<18}{'records':>9}{'dict B/rec':>12}{'model B/rec':>13}{'saving':>9}")
+    for name, rows, from_dict in datasets:
+        records = len(rows) * args.copies
+        as_dicts = retained_bytes(lambda: [json.loads(row) for row in rows for _ in range(args.copies)])
+        as_models = retained_bytes(lambda: [from_dict(json.loads(row)) for row in rows for _ in range(args.copies)])
+        print(f"{name:<18}{records:>9}{as_dicts / records:>12.0f}{as_models / records:>13.0f}"
+              f"{1 - as_models / as_dicts:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
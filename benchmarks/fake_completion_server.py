@@ -0,0 +1,67 @@
+"""
+Local fake OpenAI chat completion server used by the benchmarks
+Sleeps for a fixed latency (plus an optional per-prompt-token prefill cost) and returns a
+canned completion, so benchmarks measure our own concurrency rather than OpenAI's.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from prompt_encoding import count_tokens
+
+CANNED_TEXT = "Risk Score: High. The transaction shows geographic velocity and device anomalies."
+
+
+def create_fake_app(latency: float, prefill_per_token: float = 0.0) -> FastAPI:
+    fake = FastAPI()
+
+    @fake.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        prompt_tokens = sum(count_tokens(message.get("content") or "") for message in body.get("messages", []))
+        await asyncio.sleep(latency + prompt_tokens * prefill_per_token)
+        created = int(time.time())
+        model = body.get("model", "gpt-3.5-turbo")
+
+        if body.get("stream"):
+            async def events():
+                for word in CANNED_TEXT.split(" "):
+                    chunk = {
+                        "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": CANNED_TEXT},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20}
+        }
+
+    return fake
+
+
+def start_fake_server(port: int, latency: float, prefill_per_token: float = 0.0) -> uvicorn.Server:
+    """Start the fake server on a daemon thread and wait until it accepts connections"""
+    config = uvicorn.Config(create_fake_app(latency, prefill_per_token), host="127.0.0.1", port=port,
+                            log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
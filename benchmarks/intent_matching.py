@@ -0,0 +1,115 @@
+"""
+Virtual agent keyword classification benchmark
+Builds a synthetic corpus of chat messages (card requests, off-topic chatter, filler and
+near-miss words like "recharge" or "helpful"), then times the original three substring scans
+(sentiment, intent, off-topic, each rebuilding its tables per call) against the compiled
+single-pass matcher, and reports where the two disagree.
+
+Usage:
+    python benchmarks/intent_matching.py --messages 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import virtual_agent
+
+REQUESTS = [
+    "what's my balance", "how much do I owe this month", "I lost my card", "my wallet was stolen",
+    "please freeze my card", "unfreeze my card please", "can you unlock my card", "I want to dispute a charge",
+    "there are charges I didn't make", "I need a replacement card", "how many rewards points do I have",
+    "I'm travelling abroad next week", "activate my new card", "let me speak to someone",
+    "update my billing address", "recharge my transit pass", "that was helpful",
+]
+CHATTER = ["tell me a joke", "how are you today", "what's the weather like", "who won the sports game",
+           "what's your favorite movie", "any news on politics"]
+MOODS = ["", "thanks", "this is ridiculous", "I'm so frustrated", "great", "it's not working", "I have a problem"]
+FILLER = ["hi", "hello", "um", "so", "ok", "please", "quickly", "again", "today", "Tracy", "right now"]
+
+
+def corpus(messages: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(messages):
+        body = rng.choice(CHATTER) if rng.random() < 0.15 else rng.choice(REQUESTS)
+        words = [rng.choice(FILLER) for _ in range(rng.randint(0, 4))] + [body, rng.choice(MOODS)]
+        rng.shuffle(words)
+        out.append(" ".join(word for word in words if word).capitalize() + rng.choice(["", ".", "!", "?"]))
+    return out
+
+
+def legacy_sentiment(message: str) -> str:
+    message_lower = message.lower()
+    frustrated_keywords = ["angry", "upset", "frustrated", "terrible", "awful",
+                           "horrible", "worst", "ridiculous", "unacceptable"]
+    if any(keyword in message_lower for keyword in frustrated_keywords):
+        return "frustrated"
+    negative_keywords = ["problem", "issue", "error", "wrong", "not working", "help", "lost", "stolen"]
+    if any(keyword in message_lower for keyword in negative_keywords):
+        return "negative"
+    positive_keywords = ["thank", "thanks", "great", "good", "perfect", "excellent", "appreciate"]
+    if any(keyword in message_lower for keyword in positive_keywords):
+        return "positive"
+    return "neutral"
+
+
+def legacy_intent(message: str) -> str:
+    message_lower = message.lower()
+    intent_patterns = {label: keywords for label, keywords in virtual_agent.INTENT_KEYWORDS}
+    intent_patterns["freeze_card"] = ["freeze", "lock", "disable", "turn off"]
+    for intent, keywords in intent_patterns.items():
+        if any(keyword in message_lower for keyword in keywords):
+            return intent
+    return "general_inquiry"
+
+
+def legacy_off_topic(message: str) -> bool:
+    message_lower = message.lower()
+    return any(pattern in message_lower for pattern in virtual_agent.OFF_TOPIC_KEYWORDS[0][1])
+
+
+def legacy_classify(message: str) -> tuple:
+    return legacy_sentiment(message), legacy_intent(message), legacy_off_topic(message)
+
+
+def timed(classify, messages: list):
+    started = time.perf_counter()
+    results = [classify(message) for message in messages]
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    args = parser.parse_args()
+
+    messages = corpus(args.messages)
+    legacy, legacy_seconds = timed(legacy_classify, messages)
+    compiled, compiled_seconds = timed(virtual_agent.keyword_classify, messages)
+
+    print(f"{args.messages} messages")
+    print(f"{'matcher':<24}{'total s':>10}{'us/msg':>10}{'msg/s':>14}")
+    for name, seconds in (("substring scans", legacy_seconds), ("compiled single pass", compiled_seconds)):
+        print(f"{name:<24}{seconds:>10.3f}{seconds / args.messages * 1e6:>10.2f}{args.messages / seconds:>14,.0f}")
+    print(f"Speedup: {legacy_seconds / compiled_seconds:.1f}x")
+
+    differences = Counter()
+    examples = {}
+    for message, old, new in zip(messages, legacy, compiled):
+        for field, before, after in zip(("sentiment", "intent", "off_topic"), old, new):
+            if before != after:
+                differences[(field, before, after)] += 1
+                examples.setdefault((field, before, after), message)
+    print(f"Disagreements: {sum(differences.values())} field values")
+    for (field, before, after), count in differences.most_common(10):
+        print(f"  {field}: {before} -> {after} x{count}  e.g. {examples[(field, before, after)]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Response encoding micro-benchmark
+Measures per-response encode time for each catalog/analysis endpoint shape:
+  - before:   Dict[str, Any] response models + stdlib JSONResponse (the original models.py)
+  - typed:    typed catalog models + FastJSONResponse (orjson when installed)
+  - prebuilt: the pre-serialized catalog body (catalog endpoints only)
+
+Usage:
+    python benchmarks/json_encoding.py --iterations 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+import catalog
+import models
+from customer_profiles import get_all_customers, get_customer_profile
+from dispute_cases import get_all_disputes, get_dispute_case
+from fast_json import FastJSONResponse, orjson
+from fraud_scenarios import get_fraud_scenario, get_fraud_scenarios
+from merchant_data import get_all_merchants, get_merchant_data
+
+
+# The response models as they were before typed catalog models existed
+class UntypedScenariosResponse(BaseModel):
+    scenarios: List[Dict[str, Any]]
+    total: int
+
+
+class UntypedFraudAnalysisResponse(BaseModel):
+    scenario: Dict[str, Any]
+    analysis: str
+    audience: str
+
+
+class UntypedMerchantListResponse(BaseModel):
+    merchants: List[Dict[str, Any]]
+
+
+class UntypedCustomerListResponse(BaseModel):
+    customers: List[Dict[str, Any]]
+
+
+class UntypedDisputeListResponse(BaseModel):
+    disputes: List[Dict[str, Any]]
+
+
+ANALYSIS_TEXT = "Risk Score: High. " * 60
+
+
+def endpoint_cases():
+    """(endpoint, untyped model + payload, typed model + payload, catalog key or None)"""
+    scenarios = get_fraud_scenarios()
+    scenario = get_fraud_scenario(0)
+    return [
+        ("GET /api/scenarios",
+         (UntypedScenariosResponse, {"scenarios": scenarios, "total": len(scenarios)}),
+         (models.ScenariosResponse, {"scenarios": scenarios, "total": len(scenarios)}),
+         ("list", "scenarios")),
+        ("POST /api/analyze-fraud",
+         (UntypedFraudAnalysisResponse, {"scenario": scenario, "analysis": ANALYSIS_TEXT, "audience": "Risk Analyst"}),
+         (models.FraudAnalysisResponse, {"scenario": scenario, "analysis": ANALYSIS_TEXT, "audience": "Risk Analyst"}),
+         None),
+        ("GET /api/merchants",
+         (UntypedMerchantListResponse, {"merchants": get_all_merchants()}),
+         (models.MerchantListResponse, {"merchants": get_all_merchants()}),
+         ("list", "merchants")),
+        ("GET /api/merchants/{id}",
+         (None, get_merchant_data("weekend_warrior")),
+         (models.MerchantDetail, get_merchant_data("weekend_warrior")),
+         ("item", "merchants", "weekend_warrior")),
+        ("GET /api/customers",
+         (UntypedCustomerListResponse, {"customers": get_all_customers()}),
+         (models.CustomerListResponse, {"customers": get_all_customers()}),
+         ("list", "customers")),
+        ("GET /api/customers/{id}",
+         (None, get_customer_profile("CUST001")),
+         (models.CustomerDetail, get_customer_profile("CUST001")),
+         ("item", "customers", "CUST001")),
+        ("GET /api/disputes",
+         (UntypedDisputeListResponse, {"disputes": get_all_disputes()}),
+         (models.DisputeListResponse, {"disputes": get_all_disputes()}),
+         ("list", "disputes")),
+        ("GET /api/disputes/{id}",
+         (None, get_dispute_case("DISP-99283")),
+         (models.DisputeDetail, get_dispute_case("DISP-99283")),
+         ("item", "disputes", "DISP-99283")),
+    ]
+
+
+def encode_before(model, payload) -> bytes:
+    if model is None:
+        # Untyped detail endpoints returned the raw dict; FastAPI ran it through jsonable_encoder
+        from fastapi.encoders import jsonable_encoder
+        return JSONResponse(jsonable_encoder(payload)).body
+    return JSONResponse(model.model_validate(payload).model_dump(mode="json")).body
+
+
+def encode_typed(model, payload) -> bytes:
+    return FastJSONResponse(model.model_validate(payload).model_dump(mode="json")).body
+
+
+def encode_prebuilt(key) -> bytes:
+    if key[0] == "list":
+        return catalog._lists[key[1]].body
+    return catalog._items[key[1]][key[2]].body
+
+
+def per_call_us(fn, iterations) -> float:
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    catalog.build()
+    print(f"orjson: {'installed' if orjson else 'missing (stdlib fallback)'}")
+    print(f"{'endpoint':<28}{'before us':>12}{'typed us':>12}{'prebuilt us':>13}{'speed-up':>10}")
+    for endpoint, (old_model, old_payload), (new_model, new_payload), key in endpoint_cases():
+        assert json.loads(encode_typed(new_model, new_payload)) == json.loads(encode_before(old_model, old_payload)), endpoint
+        before = per_call_us(lambda: encode_before(old_model, old_payload), args.iterations)
+        typed = per_call_us(lambda: encode_typed(new_model, new_payload), args.iterations)
+        fastest = typed
+        prebuilt_text = "-"
+        if key is not None:
+            prebuilt = per_call_us(lambda: encode_prebuilt(key), args.iterations)
+            prebuilt_text = f"{prebuilt:.2f}"
+            fastest = prebuilt
+        print(f"{endpoint:<28}{before:>12.1f}{typed:>12.1f}{prebuilt_text:>13}{before / fastest:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Concurrency benchmark for the async LLM gateway
+Fires N concurrent /api/analyze-fraud calls against a local fake completion server,
+once through the old blocking openai.OpenAI path and once through llm_gateway.
+
+Usage:
+    python benchmarks/llm_concurrency.py --requests 50 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_completion_server import start_fake_server
+
+
+def blocking_analyze_fraud(api_key, messages):
+    """The pre-gateway handler body: a synchronous client called from inside the event loop"""
+    import openai
+    client = openai.OpenAI(api_key=api_key)
+    return client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=messages,
+        temperature=0.7,
+        max_tokens=800
+    )
+
+
+async def run_blocking(count):
+    async def one():
+        blocking_analyze_fraud("sk-bench", [{"role": "user", "content": "bench"}])
+    await asyncio.gather(*(one() for _ in range(count)))
+
+
+async def run_gateway(count):
+    import llm_gateway
+    from fastapi import Response
+    from main import analyze_fraud
+    from models import FraudAnalysisRequest
+    request = FraudAnalysisRequest(scenario_id=0, audience="Risk Analyst")
+    try:
+        await asyncio.gather(*(analyze_fraud(request, Response()) for _ in range(count)))
+    finally:
+        await llm_gateway.close_client()
+
+
+def timed(label, count, coro_factory):
+    started = time.perf_counter()
+    asyncio.run(coro_factory(count))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {count:>5} calls  {elapsed:8.2f}s  {count / elapsed:8.1f} req/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="concurrent completions per run")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake server latency per completion (s)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    start_fake_server(args.port, args.latency)
+    os.environ["OPENAI_API_KEY"] = "sk-bench"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["LLM_CACHE_BACKEND"] = "none"  # every call must reach the fake server
+
+    print(f"Fake completion latency: {args.latency:.3f}s")
+    blocking = timed("blocking openai.OpenAI", args.requests, run_blocking)
+    gateway = timed("llm_gateway (async)", args.requests, run_gateway)
+    print(f"Speed-up: {blocking / gateway:.1f}x")
+
+    import llm_gateway
+    print(f"Pool metrics: {llm_gateway.get_pool_metrics()}")
+
+
+if __name__ == "__main__":
+    main()
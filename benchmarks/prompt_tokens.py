@@ -0,0 +1,99 @@
+"""
+Prompt encoding benchmark
+Reports characters and tokens per encoding for every record in the real datasets, the full
+prompt size per analysis endpoint, and end-to-end completion latency against the local fake
+server with a per-prompt-token prefill cost (so input size shows up in latency).
+
+Usage:
+    python benchmarks/prompt_tokens.py --latency 0.05 --prefill-ms-per-1k 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_completion_server import start_fake_server
+
+import prompt_encoding
+from customer_profiles import CUSTOMER_PROFILES
+from dispute_cases import DISPUTE_CASES
+from fraud_scenarios import get_fraud_scenarios
+from merchant_data import MERCHANTS
+
+
+def datasets():
+    return {
+        "fraud scenarios": get_fraud_scenarios(),
+        "merchant monthly_data": [merchant["monthly_data"] for merchant in MERCHANTS.values()],
+        "customer profiles": CUSTOMER_PROFILES,
+        "dispute cases": DISPUTE_CASES,
+    }
+
+
+def completion_jobs():
+    """(endpoint, completion arguments) for every record, built with the current PROMPT_ENCODING"""
+    import analysis_prompts
+    for scenario in get_fraud_scenarios():
+        yield "analyze-fraud", analysis_prompts.fraud_analysis_completion(scenario, "Risk Analyst")
+    for customer in CUSTOMER_PROFILES:
+        yield "analyze-customer-upgrade", analysis_prompts.customer_upgrade_completion(customer, "Analyst", "Narrative")
+    for dispute in DISPUTE_CASES:
+        yield "analyze-dispute", analysis_prompts.dispute_analysis_completion(dispute)
+
+
+def prompt_tokens(job) -> int:
+    return sum(prompt_encoding.count_tokens(message["content"]) for message in job["messages"])
+
+
+async def run_completions(jobs) -> float:
+    """Mean seconds per completion, one request at a time"""
+    import llm_gateway
+    durations = []
+    try:
+        for job in jobs:
+            started = time.perf_counter()
+            await llm_gateway.chat_completion("sk-bench", **job)
+            durations.append(time.perf_counter() - started)
+    finally:
+        await llm_gateway.close_client()
+    return sum(durations) / len(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="fixed fake completion latency (s)")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=20.0, help="extra latency per 1k prompt tokens")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    print(f"Tokenizer: {prompt_encoding.tokenizer_name()}")
+    print(f"\n{'dataset':<24}" + "".join(f"{encoding:>20}" for encoding in prompt_encoding.ENCODINGS))
+    for name, records in datasets().items():
+        totals = {encoding: 0 for encoding in prompt_encoding.ENCODINGS}
+        for record in records:
+            for encoding, sizes in prompt_encoding.encoding_report(record).items():
+                totals[encoding] += sizes["tokens"]
+        baseline = totals["pretty"]
+        cells = [f"{tokens:>8} tok ({tokens / baseline - 1:+4.0%})" for tokens in totals.values()]
+        print(f"{name:<24}" + "".join(f"{cell:>20}" for cell in cells))
+
+    start_fake_server(args.port, args.latency, args.prefill_ms_per_1k / 1000 / 1000)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["LLM_CACHE_BACKEND"] = "none"
+
+    print(f"\nEnd-to-end (fake server: {args.latency:.3f}s + {args.prefill_ms_per_1k:g}ms per 1k prompt tokens)")
+    print(f"{'encoding':<12}{'prompt tokens':>15}{'mean latency ms':>18}")
+    for encoding in prompt_encoding.ENCODINGS:
+        prompt_encoding.PROMPT_ENCODING = encoding
+        jobs = [job for _, job in completion_jobs()]
+        tokens = sum(prompt_tokens(job) for job in jobs)
+        latency = asyncio.run(run_completions(jobs))
+        print(f"{encoding:<12}{tokens:>15}{latency * 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
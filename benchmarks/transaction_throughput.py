@@ -0,0 +1,89 @@
+"""
+Transaction scoring throughput benchmark
+Generates synthetic card transactions (a few per card per day, some cross-border, bursts
+and off-hours outliers), then times parsing, vectorized scoring and NDJSON serialization
+for CSV and NDJSON input on one core.
+
+Usage:
+    python benchmarks/transaction_throughput.py --transactions 1000000 --cards 50000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transaction_scoring
+
+
+def synthetic_columns(transactions: int, cards: int, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    card = rng.integers(0, cards, transactions)
+    usual_hour = rng.uniform(8, 22, cards)
+    day = rng.integers(0, 30, transactions)
+    hour = (usual_hour[card] + rng.normal(0, 2, transactions)) % 24
+    outliers = rng.random(transactions) < 0.01
+    hour[outliers] = rng.uniform(0, 24, outliers.sum())
+    monthly = rng.uniform(500, 5000, cards)
+    home = np.array(["US", "CA", "GB"])[rng.integers(0, 3, cards)]
+    country = home[card].copy()
+    abroad = rng.random(transactions) < 0.02
+    country[abroad] = "JP"
+    return {
+        "transaction_id": [f"TXN-{i}" for i in range(transactions)],
+        "card_id": [f"CARD-{c}" for c in card],
+        "timestamp": (1735689600 + day * 86400 + hour * 3600).astype(np.int64).tolist(),
+        "amount": np.round(rng.lognormal(3.5, 1.2, transactions), 2).tolist(),
+        "country": country.tolist(),
+        "home_country": home[card].tolist(),
+        "typical_monthly_spend": np.round(monthly[card], 2).tolist(),
+    }
+
+
+def as_csv(columns: dict) -> bytes:
+    names = list(columns)
+    lines = [",".join(names)] + [",".join(map(str, row)) for row in zip(*columns.values())]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def as_ndjson(columns: dict) -> bytes:
+    names = list(columns)
+    return "".join(json.dumps(dict(zip(names, row))) + "\n" for row in zip(*columns.values())).encode()
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--cards", type=int, default=50_000)
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.transactions, args.cards)
+    uploads = {"csv": as_csv(columns), "ndjson": as_ndjson(columns)}
+
+    print(f"{args.transactions} transactions over {args.cards} cards")
+    print(f"{'format':<8}{'MB':>8}{'parse s':>10}{'score s':>10}{'write s':>10}{'total s':>10}{'tx/min':>14}")
+    for fmt, data in uploads.items():
+        batch, parse = timed(transaction_scoring.load, data, fmt)
+        scored, score = timed(transaction_scoring.score_batch, batch)
+        _, write = timed(lambda: sum(len(chunk) for chunk in transaction_scoring.iter_ndjson(batch, scored)))
+        total = parse + score + write
+        print(f"{fmt:<8}{len(data) / 1e6:>8.1f}{parse:>10.2f}{score:>10.2f}{write:>10.2f}{total:>10.2f}"
+              f"{args.transactions / total * 60:>14,.0f}")
+
+    ratings, counts = np.unique(scored["rating"], return_counts=True)
+    print("Ratings: " + ", ".join(f"{rating} {count}" for rating, count in zip(ratings, counts)))
+
+
+if __name__ == "__main__":
+    main()
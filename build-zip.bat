@@ -23,6 +23,10 @@ echo Copying Python files...
 copy *.py dist\
 copy requirements.txt dist\
 
+REM Copy the trained virtual agent intent model (loaded at startup; without it only keywords are used)
+echo Copying intent model...
+copy intent_model.npz dist\
+
 REM Create ZIP file
 echo.
 echo Creating backend-deploy.zip...
@@ -0,0 +1,158 @@
+"""
+Pre-serialized catalog responses
+The static catalog endpoints (scenarios, merchants, customers, disputes) are rendered to JSON
+once with a strong ETag; conditional requests are answered with 304 from the ETag alone.
+Records ingested into the record store are rendered per request: item lookups read the one
+record, and a list streams its ingested records page by page after the pre-rendered built-in
+part, under an ETag derived from the table version (rows are insert-only).
+"""
+
+import hashlib
+import json
+import os
+from itertools import islice
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from customer_profiles import CUSTOMER_PROFILES, CUSTOMER_REPOSITORY, customer_summary, get_customer_profile
+from dispute_cases import DISPUTE_CASES, DISPUTE_REPOSITORY, dispute_summary, get_dispute_case
+from fraud_scenarios import FRAUD_SCENARIOS, SCENARIO_REPOSITORY
+from merchant_data import MERCHANTS, get_all_merchants
+from record_store import RECORD_PAGE_SIZE
+
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "300"))
+CACHE_CONTROL = f"public, max-age={CATALOG_MAX_AGE}"
+
+
+class CachedBody:
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def render(payload) -> bytes:
+    """Encode exactly like FastAPI's JSONResponse"""
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class CatalogList:
+    """
+    A list body: the built-in records rendered once, followed by the records ingested into
+    table (mapped through summarize, if given), which are streamed rather than held in memory.
+    total appends a "total" count after the list.
+    """
+
+    def __init__(self, field: str, records, table=None, summarize=None, total: bool = False):
+        self.field = field
+        self.table = table
+        self.summarize = summarize
+        self.total = total
+        self.count = len(records)
+        self.items = b",".join(render(record) for record in records)
+        self.builtin = CachedBody(self._head() + self.items + self._tail(self.count))
+
+    def _head(self) -> bytes:
+        return b'{"' + self.field.encode() + b'":['
+
+    def _tail(self, count: int) -> bytes:
+        return b'],"total":' + str(count).encode() + b"}" if self.total else b"]}"
+
+    def etag(self, version) -> str:
+        digest = hashlib.sha256(f"{self.builtin.etag}:{version}".encode()).hexdigest()[:32]
+        return f'"{digest}"'
+
+    def chunks(self):
+        """The body in pieces: the built-in part, then one piece per page of ingested records"""
+        yield self._head() + self.items
+        count = self.count
+        records = self.table.all()
+        while True:
+            page = [
+                render(self.summarize(record) if self.summarize else record)
+                for record in islice(records, RECORD_PAGE_SIZE)
+            ]
+            if not page:
+                break
+            yield (b"," if count else b"") + b",".join(page)
+            count += len(page)
+        yield self._tail(count)
+
+
+_lists = {}
+_items = {}
+
+# Item lookups for records that are not pre-rendered (ingested at runtime)
+_fallbacks = {
+    "customers": get_customer_profile,
+    "disputes": get_dispute_case,
+}
+
+
+def build():
+    """Serialize every catalog body; called at startup and whenever the datasets change"""
+    _lists.clear()
+    _items.clear()
+
+    _lists["scenarios"] = CatalogList("scenarios", FRAUD_SCENARIOS, SCENARIO_REPOSITORY.store, total=True)
+    _lists["merchants"] = CatalogList("merchants", get_all_merchants())
+    _lists["customers"] = CatalogList(
+        "customers", [customer_summary(customer) for customer in CUSTOMER_PROFILES],
+        CUSTOMER_REPOSITORY.store, customer_summary
+    )
+    _lists["disputes"] = CatalogList(
+        "disputes", [dispute_summary(case) for case in DISPUTE_CASES],
+        DISPUTE_REPOSITORY.store, dispute_summary
+    )
+
+    _items["merchants"] = {merchant_id: CachedBody(render(merchant)) for merchant_id, merchant in MERCHANTS.items()}
+    _items["customers"] = {customer["customer_id"]: CachedBody(render(customer)) for customer in CUSTOMER_PROFILES}
+    _items["disputes"] = {case["case_id"]: CachedBody(render(case)) for case in DISPUTE_CASES}
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    return bool(if_none_match) and _etag_matches(if_none_match, etag)
+
+
+def respond(request: Request, cached: CachedBody) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+def list_response(request: Request, name: str) -> Response:
+    """Reads the table version from the record store (call from the threadpool unless name has no table)"""
+    if not _lists:
+        build()
+    catalog_list = _lists[name]
+    version = catalog_list.table.version() if catalog_list.table is not None else (0, None)
+    if version[0] == 0:
+        return respond(request, catalog_list.builtin)
+    headers = {"ETag": catalog_list.etag(version), "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return StreamingResponse(catalog_list.chunks(), media_type="application/json", headers=headers)
+
+
+def item_response(request: Request, name: str, item_id: str, not_found: str) -> Response:
+    """Records that are not pre-rendered are read from the record store (call from the threadpool)"""
+    if not _items:
+        build()
+    cached = _items[name].get(item_id)
+    if cached is None:
+        record = _fallbacks[name](item_id) if name in _fallbacks else None
+        if record is None:
+            raise HTTPException(status_code=404, detail=not_found)
+        cached = CachedBody(render(record))
+    return respond(request, cached)
@@ -3,6 +3,9 @@ Customer Profile Data for Upgrade Recommendations Demo
 15 diverse customer personas with realistic spending patterns and upgrade opportunities
 """
 
+from record_store import RECORD_STORE
+from repository import Repository
+
 CUSTOMER_PROFILES = [
     {
         "customer_id": "CUST001",
@@ -321,25 +324,43 @@ CUSTOMER_PROFILES = [
     }
 ]
 
+CUSTOMER_INDEXES = {
+    "card_type": lambda customer: customer["card_type"],
+    "location": lambda customer: customer["location"],
+    "credit_score_band": lambda customer: customer["credit_score_band"]
+}
+
+CUSTOMER_REPOSITORY = Repository(
+    CUSTOMER_PROFILES,
+    primary_key="customer_id",
+    indexes=CUSTOMER_INDEXES,
+    store=RECORD_STORE.table("customers", CUSTOMER_INDEXES)
+)
+
+def customer_summary(customer):
+    """Summary fields shown in customer lists"""
+    return {
+        "customer_id": customer["customer_id"],
+        "name": customer["name"],
+        "age": customer["age"],
+        "occupation": customer["occupation"],
+        "monthly_spend": customer["monthly_spend"],
+        "card_type": customer["card_type"],
+        "location": customer["location"],
+        "credit_utilization": customer["credit_utilization"]
+    }
+
 def get_all_customers():
     """Return list of all customer profiles with summary info"""
-    return [
-        {
-            "customer_id": customer["customer_id"],
-            "name": customer["name"],
-            "age": customer["age"],
-            "occupation": customer["occupation"],
-            "monthly_spend": customer["monthly_spend"],
-            "card_type": customer["card_type"],
-            "location": customer["location"],
-            "credit_utilization": customer["credit_utilization"]
-        }
-        for customer in CUSTOMER_PROFILES
-    ]
+    return [customer_summary(customer) for customer in CUSTOMER_REPOSITORY.all()]
 
 def get_customer_profile(customer_id):
     """Get full customer profile by ID"""
-    for customer in CUSTOMER_PROFILES:
-        if customer["customer_id"] == customer_id:
-            return customer
-    return None
+    return CUSTOMER_REPOSITORY.get(customer_id)
+
+def find_customers(card_type=None, location=None, credit_score_band=None):
+    """Customer summaries matching all given filters (case-insensitive exact match)"""
+    matches = CUSTOMER_REPOSITORY.find(
+        card_type=card_type, location=location, credit_score_band=credit_score_band
+    )
+    return [customer_summary(customer) for customer in matches]
@@ -3,6 +3,9 @@ Dispute Cases for First-Party Fraud Detection (Friendly Fraud)
 Realistic chargeback disputes with merchant evidence for forensic analysis
 """
 
+from record_store import RECORD_STORE
+from repository import Repository
+
 DISPUTE_CASES = [
     {
         "case_id": "DISP-99283",
@@ -316,23 +319,41 @@ DISPUTE_CASES = [
     }
 ]
 
+DISPUTE_INDEXES = {
+    "customer_claim": lambda case: case["dispute_details"]["customer_claim"],
+    "status": lambda case: case["status"],
+    "transaction_date": lambda case: case["dispute_details"]["transaction_date"]
+}
+
+DISPUTE_REPOSITORY = Repository(
+    DISPUTE_CASES,
+    primary_key="case_id",
+    indexes=DISPUTE_INDEXES,
+    store=RECORD_STORE.table("disputes", DISPUTE_INDEXES)
+)
+
+def dispute_summary(case):
+    """Summary fields shown in dispute lists"""
+    return {
+        "case_id": case["case_id"],
+        "status": case["status"],
+        "customer_claim": case["dispute_details"]["customer_claim"],
+        "transaction_amount": case["dispute_details"]["transaction_amount"],
+        "item": case["dispute_details"]["item"],
+        "transaction_date": case["dispute_details"]["transaction_date"]
+    }
+
 def get_all_disputes():
     """Return list of all dispute cases with summary info"""
-    return [
-        {
-            "case_id": case["case_id"],
-            "status": case["status"],
-            "customer_claim": case["dispute_details"]["customer_claim"],
-            "transaction_amount": case["dispute_details"]["transaction_amount"],
-            "item": case["dispute_details"]["item"],
-            "transaction_date": case["dispute_details"]["transaction_date"]
-        }
-        for case in DISPUTE_CASES
-    ]
+    return [dispute_summary(case) for case in DISPUTE_REPOSITORY.all()]
 
 def get_dispute_case(case_id):
     """Get full dispute case by ID"""
-    for case in DISPUTE_CASES:
-        if case["case_id"] == case_id:
-            return case
-    return None
+    return DISPUTE_REPOSITORY.get(case_id)
+
+def find_disputes(customer_claim=None, status=None, transaction_date=None):
+    """Dispute summaries matching all given filters (case-insensitive exact match)"""
+    matches = DISPUTE_REPOSITORY.find(
+        customer_claim=customer_claim, status=status, transaction_date=transaction_date
+    )
+    return [dispute_summary(case) for case in matches]
@@ -0,0 +1,124 @@
+"""
+Typed fraud scenario models
+Frozen, slotted dataclasses parsed from the scenario dicts on demand. Currency is parsed to
+integer cents and timestamps to datetimes once per record, so fraud scoring and geo-velocity
+never re-parse strings. The dict literals stay the source of record (and the only resident
+copy) for API and prompt JSON; ingest also runs Scenario.from_dict to reject records those
+numeric paths could not parse.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from fraud_scenarios import get_fraud_scenario
+
+
+def parse_cents(value) -> int:
+    """Parse 4599.99, 45000 or "$1,245.00" into integer cents"""
+    if isinstance(value, str):
+        value = value.replace("$", "").replace(",", "").strip()
+        negative = value.startswith("-")
+        whole, _, fraction = value.lstrip("-").partition(".")
+        cents = int(whole or "0") * 100 + int((fraction + "00")[:2])
+        return -cents if negative else cents
+    return round(value * 100)
+
+
+def _parse_timestamp(text: str) -> datetime:
+    return datetime.fromisoformat(text.replace("Z", "+00:00"))
+
+
+@dataclass(frozen=True, slots=True)
+class Account:
+    account_number: str
+    cardholder_name: str
+    account_age_days: int
+    address: str
+    typical_monthly_spend_cents: int
+    past_chargebacks: int
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Account":
+        return cls(
+            account_number=data["account_number"],
+            cardholder_name=data["cardholder_name"],
+            account_age_days=data["account_age_days"],
+            address=data["address"],
+            typical_monthly_spend_cents=parse_cents(data["typical_monthly_spend"]),
+            past_chargebacks=data["past_chargebacks"]
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class FlaggedTransaction:
+    amount_cents: int
+    merchant: str
+    mcc: str
+    mcc_description: str
+    location: str
+    timestamp: datetime
+    device_id: str
+    card_present: bool
+    ip_address: str
+    transaction_id: str
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FlaggedTransaction":
+        return cls(
+            amount_cents=parse_cents(data["amount"]),
+            merchant=data["merchant"],
+            mcc=data["mcc"],
+            mcc_description=data["mcc_description"],
+            location=data["location"],
+            timestamp=_parse_timestamp(data["timestamp"]),
+            device_id=data["device_id"],
+            card_present=data["card_present"],
+            ip_address=data["ip_address"],
+            transaction_id=data["transaction_id"]
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class HistoricalTransaction:
+    date: date
+    amount_cents: int
+    merchant: str
+    location: str
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HistoricalTransaction":
+        return cls(
+            date=date.fromisoformat(data["date"]),
+            amount_cents=parse_cents(data["amount"]),
+            merchant=data["merchant"],
+            location=data["location"]
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    id: int
+    case_name: str
+    account: Account
+    flagged_transaction: FlaggedTransaction
+    fraud_indicators: Mapping[str, object]
+    historical_transactions: Tuple[HistoricalTransaction, ...]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Scenario":
+        return cls(
+            id=data["id"],
+            case_name=data["case_name"],
+            account=Account.from_dict(data["account"]),
+            flagged_transaction=FlaggedTransaction.from_dict(data["flagged_transaction"]),
+            fraud_indicators=MappingProxyType(dict(data["fraud_indicators"])),
+            historical_transactions=tuple(HistoricalTransaction.from_dict(t) for t in data["historical_transactions"])
+        )
+
+
+def get_scenario(scenario_id: int) -> Optional[Scenario]:
+    """Typed scenario by id (built-in or ingested), parsed from its dict; callers cache their results"""
+    data = get_fraud_scenario(scenario_id)
+    return Scenario.from_dict(data) if data is not None else None
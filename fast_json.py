@@ -0,0 +1,28 @@
+"""
+High-performance JSON response class
+Renders with orjson when it is installed and falls back to the stdlib encoder otherwise.
+Enable app-wide with FAST_JSON_RESPONSES=true.
+"""
+
+import os
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+
+def dumps(content) -> bytes:
+    """Encode to compact UTF-8 JSON bytes"""
+    if orjson is None:
+        return JSONResponse(content).body
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
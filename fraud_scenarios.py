@@ -1,7 +1,17 @@
+"""
+Fraud scenario dataset
+The scenarios are built once at import into an id-indexed store (catalog.py renders the
+/api/scenarios body from them once). Returned dicts are shared - treat them as read-only.
+Scenarios ingested at runtime (see ingest.py) are read from the record store after these.
+"""
+
 import random
 from datetime import datetime, timedelta
 
-def get_fraud_scenarios():
+from record_store import RECORD_STORE
+from repository import Repository
+
+def _build_fraud_scenarios():
     scenarios = [
         {
             "id": 0,
@@ -845,3 +855,15 @@ def get_fraud_scenarios():
     ]
     
     return scenarios
+
+
+FRAUD_SCENARIOS = tuple(_build_fraud_scenarios())
+SCENARIO_REPOSITORY = Repository(FRAUD_SCENARIOS, primary_key="id", store=RECORD_STORE.table("scenarios"))
+
+def get_fraud_scenarios():
+    """Return all fraud scenarios"""
+    return list(FRAUD_SCENARIOS)
+
+def get_fraud_scenario(scenario_id):
+    """Get a fraud scenario by id in O(1), or None"""
+    return SCENARIO_REPOSITORY.get(scenario_id)
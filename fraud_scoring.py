@@ -0,0 +1,206 @@
+"""
+Local rule-based fraud scoring
+A deterministic 0-100 risk score and Low/Medium/High/Critical rating computed from a scenario's
+structured fields (account, flagged transaction, fraud_indicators, historical_transactions),
+so a rating is available in microseconds without a completion. Each rule that fires adds its
+points and a short reason; the total is capped at 100.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import geo_velocity
+from domain import Scenario, get_scenario
+
+# Score at or above which each rating applies, highest first
+RATINGS = (
+    (75, "Critical"),
+    (50, "High"),
+    (25, "Medium"),
+    (0, "Low"),
+)
+
+# fraud_indicators keys grouped by the signal they carry
+IMPOSSIBLE_TRAVEL = ("geographic_velocity",)
+LOCATION_ANOMALY = ("geographic_anomaly", "foreign_atm", "no_travel_history")
+DEVICE_ANOMALY = ("device_fingerprint", "device_change")
+ACCOUNT_TAKEOVER = ("password_reset", "email_change_attempt", "shipping_address_change")
+HIGH_RISK_COUNTRY = ("high_risk_country",)
+NEW_RELATIONSHIP = ("new_merchant", "new_merchant_category", "new_recipient", "merchant_verification")
+BURST_PATTERN = (
+    "transaction_frequency", "micro_transaction_pattern", "atm_withdrawal_pattern", "fuel_velocity",
+    "same_merchant_velocity", "same_mcc_pattern", "skimming_indicator", "round_amount", "round_amounts",
+)
+HIGH_RISK_CATEGORY_EXTRA = ("high_risk_mcc", "luxury_goods_category", "gift_card_indicator", "high_value_cash")
+
+# "15 transactions vs avg 2.1", "3 transactions in 24h vs avg 0.8": the leading count and the average
+_VELOCITY = re.compile(r"^\D*?(\d+(?:\.\d+)?).*?\bavg\.?\s*(\d+(?:\.\d+)?)")
+
+
+def _present(scenario: Scenario, keys) -> List[str]:
+    return [key for key in keys if scenario.fraud_indicators.get(key) not in (None, False, "")]
+
+
+def _category_keys(scenario: Scenario) -> List[str]:
+    """Merchant-category risk flags: every *_risk indicator except account age, plus a few named ones"""
+    keys = [key for key in scenario.fraud_indicators if key.endswith("_risk") and key != "new_account_risk"]
+    return _present(scenario, keys) + _present(scenario, HIGH_RISK_CATEGORY_EXTRA)
+
+
+def _tiered(value: float, tiers) -> int:
+    """Points for the first (threshold, points) tier that value reaches"""
+    for threshold, points in tiers:
+        if value >= threshold:
+            return points
+    return 0
+
+
+def _amount_vs_monthly(scenario: Scenario) -> Optional[Tuple[int, str]]:
+    typical = scenario.account.typical_monthly_spend_cents
+    if typical <= 0:
+        return None
+    ratio = scenario.flagged_transaction.amount_cents / typical
+    points = _tiered(ratio, ((2.0, 20), (1.0, 14), (0.5, 8), (0.25, 4)))
+    return (points, f"amount is {ratio:.2f}x typical monthly spend") if points else None
+
+
+def _amount_vs_history(scenario: Scenario) -> Optional[Tuple[int, str]]:
+    largest = max((t.amount_cents for t in scenario.historical_transactions), default=0)
+    if largest <= 0:
+        return None
+    ratio = scenario.flagged_transaction.amount_cents / largest
+    points = _tiered(ratio, ((10.0, 8), (3.0, 4)))
+    return (points, f"amount is {ratio:.1f}x the largest recent transaction") if points else None
+
+
+def _velocity(scenario: Scenario) -> Optional[Tuple[int, str]]:
+    text = scenario.fraud_indicators.get("velocity_24h")
+    if not isinstance(text, str):
+        return None
+    match = _VELOCITY.search(text)
+    if match is None:
+        return 3, f"unusual 24h activity ({text})"
+    count, average = float(match.group(1)), float(match.group(2))
+    ratio = count / average if average > 0 else count
+    points = _tiered(ratio, ((3.0, 10), (1.5, 5)))
+    return (points, f"{count:g} transactions in 24h vs average {average:g}") if points else None
+
+
+def _account_age(scenario: Scenario) -> Optional[Tuple[int, str]]:
+    days = scenario.account.account_age_days
+    points = 10 if days < 90 else 5 if days < 365 else 0
+    return (points, f"account is {days} days old") if points else None
+
+
+def _chargebacks(scenario: Scenario) -> Optional[Tuple[int, str]]:
+    count = scenario.account.past_chargebacks
+    return (4 * min(count, 3), f"{count} past chargeback(s)") if count else None
+
+
+def _card_not_present(scenario: Scenario) -> Optional[Tuple[int, str]]:
+    return None if scenario.flagged_transaction.card_present else (6, "card not present")
+
+
+def _impossible_travel(scenario: Scenario) -> Optional[Tuple[int, str]]:
+    """Fastest impossible hop measured by the geo-velocity engine, else the geographic_velocity indicator"""
+    segments = [s for s in geo_velocity.analyze(geo_velocity.scenario_transactions(scenario))["segments"] if s["impossible"]]
+    if segments:
+        fastest = max(segments, key=lambda s: float("inf") if s["speed_kmh"] is None else s["speed_kmh"])
+        speed = "instantly" if fastest["speed_kmh"] is None else f"at {fastest['speed_kmh']:g} km/h"
+        return 18, (f"impossible travel: {fastest['from_location']} to {fastest['to_location']}, "
+                    f"{fastest['distance_km']:g} km {speed}")
+    found = _present(scenario, IMPOSSIBLE_TRAVEL)
+    return (18, f"impossible travel: {', '.join(found)}") if found else None
+
+
+def _flag(name: str, points: int, detail: str) -> Callable[[Scenario], Optional[Tuple[int, str]]]:
+    def rule(scenario: Scenario):
+        return (points, detail) if scenario.fraud_indicators.get(name) is True else None
+    return rule
+
+
+def _any_of(keys, points: int, detail: str) -> Callable[[Scenario], Optional[Tuple[int, str]]]:
+    def rule(scenario: Scenario):
+        found = _present(scenario, keys)
+        return (points, f"{detail}: {', '.join(found)}") if found else None
+    return rule
+
+
+def _each_of(keys, points: int, cap: int, detail: str) -> Callable[[Scenario], Optional[Tuple[int, str]]]:
+    def rule(scenario: Scenario):
+        found = _present(scenario, keys)
+        return (min(points * len(found), cap), f"{detail}: {', '.join(found)}") if found else None
+    return rule
+
+
+def _category(scenario: Scenario) -> Optional[Tuple[int, str]]:
+    found = _category_keys(scenario)
+    return (8, f"high-risk merchant category: {', '.join(found)}") if found else None
+
+
+RULES = (
+    ("amount_vs_monthly_spend", _amount_vs_monthly),
+    ("amount_vs_history", _amount_vs_history),
+    ("velocity_24h", _velocity),
+    ("impossible_travel", _impossible_travel),
+    ("location_anomaly", _any_of(LOCATION_ANOMALY, 6, "location anomaly")),
+    ("cross_border", _flag("cross_border_transaction", 8, "cross-border transaction")),
+    ("ip_geolocation_mismatch", _any_of(("ip_geolocation_mismatch",), 8, "IP geolocation mismatch")),
+    ("card_not_present", _card_not_present),
+    ("device_anomaly", _any_of(DEVICE_ANOMALY, 8, "unrecognized device")),
+    ("account_takeover", _each_of(ACCOUNT_TAKEOVER, 6, 15, "account takeover signals")),
+    ("new_account", _account_age),
+    ("past_chargebacks", _chargebacks),
+    ("merchant_category", _category),
+    ("high_risk_country", _any_of(HIGH_RISK_COUNTRY, 8, "high-risk country")),
+    ("new_relationship", _any_of(NEW_RELATIONSHIP, 4, "first transaction with merchant/recipient")),
+    ("burst_pattern", _each_of(BURST_PATTERN, 6, 20, "card testing/burst pattern")),
+    ("off_hours", _any_of(("time_of_day",), 4, "outside normal spending hours")),
+)
+
+
+def rating_for(score: int) -> str:
+    for threshold, rating in RATINGS:
+        if score >= threshold:
+            return rating
+    return RATINGS[-1][1]
+
+
+def score_scenario(scenario: Scenario) -> dict:
+    """Score one scenario: total (0-100), rating, and the rules that fired, highest points first"""
+    signals = []
+    for name, rule in RULES:
+        fired = rule(scenario)
+        if fired is not None:
+            signals.append({"rule": name, "points": fired[0], "detail": fired[1]})
+    signals.sort(key=lambda signal: signal["points"], reverse=True)
+    score = min(100, sum(signal["points"] for signal in signals))
+    return {"scenario_id": scenario.id, "score": score, "rating": rating_for(score), "signals": signals}
+
+
+_catalog_scores: Dict[int, dict] = {}
+
+
+def score_catalog_scenario(scenario_id: int) -> Optional[dict]:
+    """
+    Score for a catalog scenario (scored once, then cached); None if the id is unknown.
+    Unknown ids are not cached, so a scenario ingested through another worker is found.
+    """
+    result = _catalog_scores.get(scenario_id)
+    if result is None:
+        scenario = get_scenario(scenario_id)
+        if scenario is None:
+            return None
+        result = _catalog_scores[scenario_id] = score_scenario(scenario)
+    return result
+
+
+def score(scenario: dict) -> dict:
+    """Score a scenario given as a dict (e.g. an inline request body)"""
+    return score_scenario(Scenario.from_dict(scenario))
+
+
+def describe(result: dict, limit: int = 5) -> str:
+    """One-line summary of a score for prompts"""
+    reasons = "; ".join(signal["detail"] for signal in result["signals"][:limit])
+    return f"{result['score']}/100 ({result['rating']}) - {reasons}" if reasons else f"{result['score']}/100 ({result['rating']})"
@@ -0,0 +1,276 @@
+"""
+Offline city gazetteer
+Major cities with coordinates, plus US state, Canadian province and country names/aliases,
+embedded so locations like "Boston, MA", "123 Oak Street, Boston, MA 02108" or
+"Tokyo, Japan" can be geocoded without a network call.
+Each row is "city|region|country|lat|lon"; region is the state/province code for US and
+Canadian cities and empty elsewhere. The first city listed for a country or region is used
+when a location names only the country or region.
+"""
+
+CITY_ROWS = """
+Washington|DC|US|38.9072|-77.0369
+New York|NY|US|40.7128|-74.0060
+Los Angeles|CA|US|34.0522|-118.2437
+Chicago|IL|US|41.8781|-87.6298
+Houston|TX|US|29.7604|-95.3698
+Phoenix|AZ|US|33.4484|-112.0740
+Philadelphia|PA|US|39.9526|-75.1652
+San Antonio|TX|US|29.4241|-98.4936
+San Diego|CA|US|32.7157|-117.1611
+Dallas|TX|US|32.7767|-96.7970
+San Jose|CA|US|37.3382|-121.8863
+Austin|TX|US|30.2672|-97.7431
+Jacksonville|FL|US|30.3322|-81.6557
+Fort Worth|TX|US|32.7555|-97.3308
+Columbus|OH|US|39.9612|-82.9988
+Charlotte|NC|US|35.2271|-80.8431
+San Francisco|CA|US|37.7749|-122.4194
+Indianapolis|IN|US|39.7684|-86.1581
+Seattle|WA|US|47.6062|-122.3321
+Denver|CO|US|39.7392|-104.9903
+Boston|MA|US|42.3601|-71.0589
+El Paso|TX|US|31.7619|-106.4850
+Nashville|TN|US|36.1627|-86.7816
+Detroit|MI|US|42.3314|-83.0458
+Oklahoma City|OK|US|35.4676|-97.5164
+Portland|OR|US|45.5152|-122.6784
+Las Vegas|NV|US|36.1699|-115.1398
+Memphis|TN|US|35.1495|-90.0490
+Louisville|KY|US|38.2527|-85.7585
+Baltimore|MD|US|39.2904|-76.6122
+Milwaukee|WI|US|43.0389|-87.9065
+Albuquerque|NM|US|35.0844|-106.6504
+Tucson|AZ|US|32.2226|-110.9747
+Fresno|CA|US|36.7378|-119.7871
+Sacramento|CA|US|38.5816|-121.4944
+Kansas City|MO|US|39.0997|-94.5786
+Atlanta|GA|US|33.7490|-84.3880
+Miami|FL|US|25.7617|-80.1918
+Raleigh|NC|US|35.7796|-78.6382
+Omaha|NE|US|41.2565|-95.9345
+Minneapolis|MN|US|44.9778|-93.2650
+Tampa|FL|US|27.9506|-82.4572
+Orlando|FL|US|28.5383|-81.3792
+Naples|FL|US|26.1420|-81.7948
+New Orleans|LA|US|29.9511|-90.0715
+Cleveland|OH|US|41.4993|-81.6944
+Cincinnati|OH|US|39.1031|-84.5120
+Pittsburgh|PA|US|40.4406|-79.9959
+St. Louis|MO|US|38.6270|-90.1994
+Salt Lake City|UT|US|40.7608|-111.8910
+Birmingham|AL|US|33.5186|-86.8104
+Honolulu|HI|US|21.3069|-157.8583
+Anchorage|AK|US|61.2181|-149.9003
+Boise|ID|US|43.6150|-116.2023
+Richmond|VA|US|37.5407|-77.4360
+Buffalo|NY|US|42.8864|-78.8784
+Newark|NJ|US|40.7357|-74.1724
+Hartford|CT|US|41.7658|-72.6734
+Providence|RI|US|41.8240|-71.4128
+Charleston|SC|US|32.7765|-79.9311
+Des Moines|IA|US|41.5868|-93.6250
+Madison|WI|US|43.0731|-89.4012
+Spokane|WA|US|47.6588|-117.4260
+Reno|NV|US|39.5296|-119.8138
+Little Rock|AR|US|34.7465|-92.2896
+Jackson|MS|US|32.2988|-90.1848
+Wichita|KS|US|37.6872|-97.3301
+Portland|ME|US|43.6591|-70.2568
+Burlington|VT|US|44.4759|-73.2121
+Manchester|NH|US|42.9956|-71.4548
+Wilmington|DE|US|39.7391|-75.5398
+Charleston|WV|US|38.3498|-81.6326
+Fargo|ND|US|46.8772|-96.7898
+Sioux Falls|SD|US|43.5446|-96.7311
+Billings|MT|US|45.7833|-108.5007
+Cheyenne|WY|US|41.1400|-104.8202
+Toronto|ON|CA|43.6532|-79.3832
+Montreal|QC|CA|45.5017|-73.5673
+Vancouver|BC|CA|49.2827|-123.1207
+Calgary|AB|CA|51.0447|-114.0719
+Ottawa|ON|CA|45.4215|-75.6972
+Edmonton|AB|CA|53.5461|-113.4938
+Winnipeg|MB|CA|49.8951|-97.1384
+Halifax|NS|CA|44.6488|-63.5752
+Mexico City||MX|19.4326|-99.1332
+Guadalajara||MX|20.6597|-103.3496
+Monterrey||MX|25.6866|-100.3161
+Cancun||MX|21.1619|-86.8515
+Tijuana||MX|32.5149|-117.0382
+Sao Paulo||BR|-23.5505|-46.6333
+Rio de Janeiro||BR|-22.9068|-43.1729
+Buenos Aires||AR|-34.6037|-58.3816
+Santiago||CL|-33.4489|-70.6693
+Lima||PE|-12.0464|-77.0428
+Bogota||CO|4.7110|-74.0721
+Caracas||VE|10.4806|-66.9036
+London||GB|51.5074|-0.1278
+Manchester||GB|53.4808|-2.2426
+Birmingham||GB|52.4862|-1.8904
+Paris||FR|48.8566|2.3522
+Berlin||DE|52.5200|13.4050
+Frankfurt||DE|50.1109|8.6821
+Munich||DE|48.1351|11.5820
+Madrid||ES|40.4168|-3.7038
+Barcelona||ES|41.3851|2.1734
+Rome||IT|41.9028|12.4964
+Milan||IT|45.4642|9.1900
+Amsterdam||NL|52.3676|4.9041
+Brussels||BE|50.8503|4.3517
+Vienna||AT|48.2082|16.3738
+Zurich||CH|47.3769|8.5417
+Stockholm||SE|59.3293|18.0686
+Oslo||NO|59.9139|10.7522
+Copenhagen||DK|55.6761|12.5683
+Helsinki||FI|60.1699|24.9384
+Dublin||IE|53.3498|-6.2603
+Lisbon||PT|38.7223|-9.1393
+Warsaw||PL|52.2297|21.0122
+Prague||CZ|50.0755|14.4378
+Budapest||HU|47.4979|19.0402
+Bucharest||RO|44.4268|26.1025
+Sofia||BG|42.6977|23.3219
+Athens||GR|37.9838|23.7275
+Kyiv||UA|50.4501|30.5234
+Moscow||RU|55.7558|37.6173
+Saint Petersburg||RU|59.9311|30.3609
+Tallinn||EE|59.4370|24.7536
+Riga||LV|56.9496|24.1052
+Vilnius||LT|54.6872|25.2797
+Nicosia||CY|35.1856|33.3823
+Istanbul||TR|41.0082|28.9784
+Abu Dhabi||AE|24.4539|54.3773
+Dubai||AE|25.2048|55.2708
+Doha||QA|25.2854|51.5310
+Riyadh||SA|24.7136|46.6753
+Tel Aviv||IL|32.0853|34.7818
+Cairo||EG|30.0444|31.2357
+Abuja||NG|9.0765|7.3986
+Lagos||NG|6.5244|3.3792
+Nairobi||KE|-1.2921|36.8219
+Johannesburg||ZA|-26.2041|28.0473
+Cape Town||ZA|-33.9249|18.4241
+Casablanca||MA|33.5731|-7.5898
+Accra||GH|5.6037|-0.1870
+Tokyo||JP|35.6762|139.6503
+Osaka||JP|34.6937|135.5023
+Seoul||KR|37.5665|126.9780
+Beijing||CN|39.9042|116.4074
+Shanghai||CN|31.2304|121.4737
+Hong Kong||HK|22.3193|114.1694
+Taipei||TW|25.0330|121.5654
+Singapore||SG|1.3521|103.8198
+Bangkok||TH|13.7563|100.5018
+Kuala Lumpur||MY|3.1390|101.6869
+Jakarta||ID|-6.2088|106.8456
+Manila||PH|14.5995|120.9842
+Hanoi||VN|21.0278|105.8342
+Ho Chi Minh City||VN|10.8231|106.6297
+New Delhi||IN|28.6139|77.2090
+Mumbai||IN|19.0760|72.8777
+Bangalore||IN|12.9716|77.5946
+Islamabad||PK|33.6844|73.0479
+Karachi||PK|24.8607|67.0011
+Lahore||PK|31.5204|74.3587
+Dhaka||BD|23.8103|90.4125
+Sydney||AU|-33.8688|151.2093
+Melbourne||AU|-37.8136|144.9631
+Auckland||NZ|-36.8485|174.7633
+"""
+
+# Country code -> names and common aliases
+COUNTRIES = {
+    "US": ("United States", "USA", "U.S.", "U.S.A.", "United States of America", "America"),
+    "CA": ("Canada",),
+    "MX": ("Mexico",),
+    "BR": ("Brazil",),
+    "AR": ("Argentina",),
+    "CL": ("Chile",),
+    "PE": ("Peru",),
+    "CO": ("Colombia",),
+    "VE": ("Venezuela",),
+    "GB": ("United Kingdom", "UK", "U.K.", "Great Britain", "England"),
+    "FR": ("France",),
+    "DE": ("Germany",),
+    "ES": ("Spain",),
+    "IT": ("Italy",),
+    "NL": ("Netherlands", "The Netherlands", "Holland"),
+    "BE": ("Belgium",),
+    "AT": ("Austria",),
+    "CH": ("Switzerland",),
+    "SE": ("Sweden",),
+    "NO": ("Norway",),
+    "DK": ("Denmark",),
+    "FI": ("Finland",),
+    "IE": ("Ireland",),
+    "PT": ("Portugal",),
+    "PL": ("Poland",),
+    "CZ": ("Czech Republic", "Czechia"),
+    "HU": ("Hungary",),
+    "RO": ("Romania",),
+    "BG": ("Bulgaria",),
+    "GR": ("Greece",),
+    "UA": ("Ukraine",),
+    "RU": ("Russia", "Russian Federation"),
+    "EE": ("Estonia",),
+    "LV": ("Latvia",),
+    "LT": ("Lithuania",),
+    "CY": ("Cyprus",),
+    "TR": ("Turkey", "Turkiye"),
+    "AE": ("United Arab Emirates", "UAE", "U.A.E."),
+    "QA": ("Qatar",),
+    "SA": ("Saudi Arabia",),
+    "IL": ("Israel",),
+    "EG": ("Egypt",),
+    "NG": ("Nigeria",),
+    "KE": ("Kenya",),
+    "ZA": ("South Africa",),
+    "MA": ("Morocco",),
+    "GH": ("Ghana",),
+    "JP": ("Japan",),
+    "KR": ("South Korea", "Korea"),
+    "CN": ("China",),
+    "HK": ("Hong Kong",),
+    "TW": ("Taiwan",),
+    "SG": ("Singapore",),
+    "TH": ("Thailand",),
+    "MY": ("Malaysia",),
+    "ID": ("Indonesia",),
+    "PH": ("Philippines",),
+    "VN": ("Vietnam", "Viet Nam"),
+    "IN": ("India",),
+    "PK": ("Pakistan",),
+    "BD": ("Bangladesh",),
+    "AU": ("Australia",),
+    "NZ": ("New Zealand",),
+}
+
+# (country, region code) -> region name
+REGIONS = {
+    ("US", "AL"): "Alabama", ("US", "AK"): "Alaska", ("US", "AZ"): "Arizona", ("US", "AR"): "Arkansas",
+    ("US", "CA"): "California", ("US", "CO"): "Colorado", ("US", "CT"): "Connecticut",
+    ("US", "DE"): "Delaware", ("US", "DC"): "District of Columbia", ("US", "FL"): "Florida",
+    ("US", "GA"): "Georgia", ("US", "HI"): "Hawaii", ("US", "ID"): "Idaho", ("US", "IL"): "Illinois",
+    ("US", "IN"): "Indiana", ("US", "IA"): "Iowa", ("US", "KS"): "Kansas", ("US", "KY"): "Kentucky",
+    ("US", "LA"): "Louisiana", ("US", "ME"): "Maine", ("US", "MD"): "Maryland",
+    ("US", "MA"): "Massachusetts", ("US", "MI"): "Michigan", ("US", "MN"): "Minnesota",
+    ("US", "MS"): "Mississippi", ("US", "MO"): "Missouri", ("US", "MT"): "Montana",
+    ("US", "NE"): "Nebraska", ("US", "NV"): "Nevada", ("US", "NH"): "New Hampshire",
+    ("US", "NJ"): "New Jersey", ("US", "NM"): "New Mexico", ("US", "NY"): "New York",
+    ("US", "NC"): "North Carolina", ("US", "ND"): "North Dakota", ("US", "OH"): "Ohio",
+    ("US", "OK"): "Oklahoma", ("US", "OR"): "Oregon", ("US", "PA"): "Pennsylvania",
+    ("US", "RI"): "Rhode Island", ("US", "SC"): "South Carolina", ("US", "SD"): "South Dakota",
+    ("US", "TN"): "Tennessee", ("US", "TX"): "Texas", ("US", "UT"): "Utah", ("US", "VT"): "Vermont",
+    ("US", "VA"): "Virginia", ("US", "WA"): "Washington", ("US", "WV"): "West Virginia",
+    ("US", "WI"): "Wisconsin", ("US", "WY"): "Wyoming",
+    ("CA", "ON"): "Ontario", ("CA", "QC"): "Quebec", ("CA", "BC"): "British Columbia",
+    ("CA", "AB"): "Alberta", ("CA", "MB"): "Manitoba", ("CA", "NS"): "Nova Scotia",
+}
+
+
+def cities():
+    """(city, region, country, lat, lon) tuples in table order"""
+    for line in CITY_ROWS.strip().splitlines():
+        city, region, country, lat, lon = line.split("|")
+        yield city, region, country, float(lat), float(lon)
@@ -0,0 +1,300 @@
+"""
+Geographic velocity engine
+Geocodes transaction locations against the embedded gazetteer and measures great-circle
+distance over elapsed time between consecutive physical transactions on the same card.
+A hop faster than GEO_MAX_SPEED_KMH across at least GEO_MIN_DISTANCE_KM is impossible travel.
+Distances and speeds are computed with one vectorized haversine over all hops at once.
+Transactions given as bare lat/lon are named after the nearest gazetteer city, found through
+a uniform lat/lon grid index.
+"Online - ..." locations are card-not-present and never count as travel.
+"""
+
+import os
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import gazetteer
+from domain import Scenario, get_scenario
+
+GEO_MAX_SPEED_KMH = float(os.getenv("GEO_MAX_SPEED_KMH", "900"))  # airliner cruising speed
+GEO_MIN_DISTANCE_KM = float(os.getenv("GEO_MIN_DISTANCE_KM", "100"))  # below this, geocoding noise dominates
+
+EARTH_RADIUS_KM = 6371.0088
+
+_ZIP_CODE = re.compile(r"\s+\d{5}(?:-\d{4})?$")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().replace(".", "").split())
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km; accepts scalars or equally shaped arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """
+    Uniform lat/lon grid over the gazetteer: nearest() only measures cities in the cells around
+    the query point, widening ring by ring until a match is certain (or max_km is exceeded).
+    """
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray, cell_degrees: float = 5.0):
+        self.lats = lats
+        self.lons = lons
+        self.cell_degrees = cell_degrees
+        self.columns = int(np.ceil(360 / cell_degrees))
+        buckets: Dict[tuple, list] = {}
+        for i, cell in enumerate(zip(*self._cell(lats, lons))):
+            buckets.setdefault(cell, []).append(i)
+        self.cells = {cell: np.array(members) for cell, members in buckets.items()}
+
+    def _cell(self, lat, lon):
+        row = np.floor((np.asarray(lat) + 90) / self.cell_degrees).astype(int)
+        column = np.floor((np.asarray(lon) + 180) / self.cell_degrees).astype(int) % self.columns
+        return row, column
+
+    def _ring(self, row: int, column: int, radius: int) -> List[np.ndarray]:
+        found = []
+        for r in range(row - radius, row + radius + 1):
+            for c in range(column - radius, column + radius + 1):
+                if max(abs(r - row), abs(c - column)) == radius:
+                    members = self.cells.get((r, c % self.columns))
+                    if members is not None:
+                        found.append(members)
+        return found
+
+    def nearest(self, lat: float, lon: float, max_km: float = 250.0) -> Optional[tuple]:
+        """(index, distance km) of the closest point within max_km, or None"""
+        row, column = (int(value) for value in self._cell(lat, lon))
+        # One cell is at least this many km wide (shrinking with latitude for longitude)
+        cell_km = self.cell_degrees * 111.2 * max(np.cos(np.radians(min(abs(lat) + self.cell_degrees, 89.0))), 0.01)
+        best = None
+        radius = 0
+        while radius * cell_km <= max_km + cell_km and radius <= self.columns:
+            candidates = self._ring(row, column, radius)
+            if candidates:
+                members = np.concatenate(candidates)
+                distances = haversine_km(lat, lon, self.lats[members], self.lons[members])
+                k = int(np.argmin(distances))
+                if best is None or distances[k] < best[1]:
+                    best = (int(members[k]), float(distances[k]))
+            # Anything in farther rings is at least radius * cell_km away
+            if best is not None and best[1] <= radius * cell_km:
+                break
+            radius += 1
+        return best if best is not None and best[1] <= max_km else None
+
+
+class Gazetteer:
+    def __init__(self, rows: Sequence[tuple]):
+        self.rows = list(rows)
+        self.lats = np.array([row[3] for row in self.rows])
+        self.lons = np.array([row[4] for row in self.rows])
+        self.index = GridIndex(self.lats, self.lons)
+
+        self._by_city: Dict[str, List[int]] = {}
+        self._default: Dict[tuple, int] = {}  # (country, region or "") -> first city listed
+        for i, (city, region, country, _, _) in enumerate(self.rows):
+            self._by_city.setdefault(_normalize(city), []).append(i)
+            self._default.setdefault((country, ""), i)
+            if region:
+                self._default.setdefault((country, region), i)
+
+        self._countries = {}
+        for code, names in gazetteer.COUNTRIES.items():
+            for name in (code,) + names:
+                self._countries.setdefault(_normalize(name), code)
+        self._regions = {}
+        for (country, code), name in gazetteer.REGIONS.items():
+            for alias in (code, name):
+                self._regions.setdefault(_normalize(alias), []).append((country, code))
+
+    def _place(self, i: int, precision: str) -> dict:
+        city, region, country, lat, lon = self.rows[i]
+        return {"name": f"{city}, {region or country}", "country": country, "lat": lat, "lon": lon,
+                "precision": precision}
+
+    def _qualifiers(self, text: str) -> List[tuple]:
+        """(country, region) readings of a qualifier like "MA", "Massachusetts", "Japan" or "CA" """
+        key = _normalize(text)
+        readings = list(self._regions.get(key, []))
+        if key in self._countries:
+            readings.append((self._countries[key], ""))
+        return readings
+
+    def geocode(self, location: str) -> Optional[dict]:
+        """
+        Resolve "City, ST", "City, Country", a street address ending in either, or a bare
+        city/region/country name. Returns name, country, lat, lon and precision
+        ("city", "region" or "country"), or None when unknown or online.
+        """
+        if not location or _normalize(location).startswith("online"):
+            return None
+        parts = [_ZIP_CODE.sub("", part).strip() for part in location.split(",") if part.strip()]
+        if not parts:
+            return None
+        city = _normalize(parts[-2]) if len(parts) >= 2 else _normalize(parts[-1])
+        readings = self._qualifiers(parts[-1]) if len(parts) >= 2 else []
+
+        candidates = self._by_city.get(city, [])
+        for country, region in readings:
+            for i in candidates:
+                if self.rows[i][2] == country and (not region or self.rows[i][1] == region):
+                    return self._place(i, "city")
+        if candidates and not readings:
+            return self._place(candidates[0], "city")
+
+        # "Ontario, Canada", "Texas", "Japan": fall back to the region's or country's first city
+        for country, region in self._qualifiers(city) + readings:
+            i = self._default.get((country, region))
+            if i is not None:
+                return self._place(i, "region" if region else "country")
+        return None
+
+    def reverse(self, lat: float, lon: float, max_km: float = 250.0) -> Optional[dict]:
+        """Nearest gazetteer city to a point, with its distance"""
+        found = self.index.nearest(lat, lon, max_km)
+        if found is None:
+            return None
+        i, distance = found
+        return {**self._place(i, "city"), "distance_km": round(distance, 1)}
+
+
+GAZETTEER = Gazetteer(gazetteer.cities())
+
+
+@lru_cache(maxsize=4096)
+def geocode(location: str) -> Optional[dict]:
+    return GAZETTEER.geocode(location)
+
+
+@lru_cache(maxsize=4096)
+def reverse_geocode(lat: float, lon: float, max_km: float = 250.0) -> Optional[dict]:
+    return GAZETTEER.reverse(lat, lon, max_km)
+
+
+def _point_name(lat: float, lon: float) -> str:
+    """"near Boston, MA" for a point within reach of a gazetteer city, else the coordinates"""
+    nearest = reverse_geocode(round(lat, 4), round(lon, 4))
+    return f"near {nearest['name']}" if nearest is not None else f"{lat}, {lon}"
+
+
+def hops(card_ids: np.ndarray, timestamps: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Consecutive-transaction hops per card, vectorized over the whole batch. Rows with NaN
+    coordinates (unresolved or online) are skipped. Returns from/to row indices, distance_km,
+    hours, speed_kmh and an impossible flag per hop.
+    """
+    located = np.flatnonzero(~(np.isnan(lats) | np.isnan(lons)))
+    codes = np.unique(np.asarray(card_ids)[located], return_inverse=True)[1].reshape(-1)
+    by_card_then_time = np.lexsort((timestamps[located], codes))
+    order = located[by_card_then_time]
+    sorted_codes = codes[by_card_then_time]
+    same_card = sorted_codes[1:] == sorted_codes[:-1]
+    start, end = order[:-1][same_card], order[1:][same_card]
+
+    distance = haversine_km(lats[start], lons[start], lats[end], lons[end])
+    hours = (timestamps[end] - timestamps[start]) / 3600.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed = np.where(hours > 0, distance / np.where(hours > 0, hours, 1), np.where(distance > 0, np.inf, 0.0))
+    impossible = (distance >= GEO_MIN_DISTANCE_KM) & (speed > GEO_MAX_SPEED_KMH)
+    return {"from": start, "to": end, "distance_km": distance, "hours": hours, "speed_kmh": speed,
+            "impossible": impossible}
+
+
+def _epoch(value) -> float:
+    """Epoch seconds from a number, an ISO timestamp ("Z" allowed) or a bare date (start of day, UTC)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def analyze(transactions: List[dict]) -> dict:
+    """
+    Geo-velocity over transactions with card_id, timestamp and either location or lat/lon.
+    Locations are geocoded once per distinct string; unnamed points are reverse geocoded.
+    """
+    lats = np.full(len(transactions), np.nan)
+    lons = np.full(len(transactions), np.nan)
+    places: List[Optional[dict]] = []
+    unresolved = set()
+    for i, transaction in enumerate(transactions):
+        place = None
+        if transaction.get("lat") is not None and transaction.get("lon") is not None:
+            lat, lon = float(transaction["lat"]), float(transaction["lon"])
+            place = {"name": transaction.get("location") or _point_name(lat, lon),
+                     "lat": lat, "lon": lon, "precision": "point"}
+        elif transaction.get("location"):
+            place = geocode(transaction["location"])
+            if place is None and not _normalize(transaction["location"]).startswith("online"):
+                unresolved.add(transaction["location"])
+        places.append(place)
+        if place is not None:
+            lats[i], lons[i] = place["lat"], place["lon"]
+
+    card_ids = np.array([str(transaction.get("card_id", "")) for transaction in transactions])
+    timestamps = np.array([_epoch(transaction["timestamp"]) for transaction in transactions], dtype=np.float64)
+    result = hops(card_ids, timestamps, lats, lons)
+
+    segments = [
+        {
+            "card_id": card_ids[start],
+            "from_location": places[start]["name"],
+            "to_location": places[end]["name"],
+            "from_timestamp": transactions[start]["timestamp"],
+            "to_timestamp": transactions[end]["timestamp"],
+            "distance_km": round(float(distance), 1),
+            "hours": round(float(hours), 2),
+            "speed_kmh": None if np.isinf(speed) else round(float(speed), 1),
+            "impossible": bool(impossible),
+        }
+        for start, end, distance, hours, speed, impossible in zip(
+            result["from"], result["to"], result["distance_km"], result["hours"], result["speed_kmh"],
+            result["impossible"]
+        )
+    ]
+    return {
+        "max_speed_kmh": GEO_MAX_SPEED_KMH,
+        "impossible_travel": any(segment["impossible"] for segment in segments),
+        "segments": segments,
+        "unresolved": sorted(unresolved),
+    }
+
+
+def scenario_transactions(scenario: Scenario) -> List[dict]:
+    """A scenario's history plus its flagged transaction, as geo-velocity input"""
+    card_id = scenario.account.account_number
+    history = [
+        {"card_id": card_id, "timestamp": t.date.isoformat(), "location": t.location}
+        for t in scenario.historical_transactions
+    ]
+    flagged = scenario.flagged_transaction
+    return history + [{"card_id": card_id, "timestamp": flagged.timestamp.isoformat(), "location": flagged.location}]
+
+
+_scenario_results: Dict[int, dict] = {}
+
+
+def scenario_geo_velocity(scenario_id: int) -> Optional[dict]:
+    """
+    Geo-velocity for a catalog scenario (computed once, then cached; unknown ids are not
+    cached). History rows carry only a date, taken as the start of that day (UTC), so
+    measured speeds are lower bounds.
+    """
+    result = _scenario_results.get(scenario_id)
+    if result is None:
+        scenario = get_scenario(scenario_id)
+        if scenario is None:
+            return None
+        result = _scenario_results[scenario_id] = {"scenario_id": scenario_id, **analyze(scenario_transactions(scenario))}
+    return result
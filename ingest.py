@@ -0,0 +1,232 @@
+"""
+Streaming NDJSON ingestion
+Fraud scenarios, customer profiles and dispute cases are loaded at runtime from NDJSON, one
+record per line. The body is consumed chunk by chunk through a generator pipeline (split lines
+-> validate -> batch) and each batch of INGEST_BATCH_SIZE records is committed to the record
+store, so memory is bounded by one batch and one line however large the upload. Ingested records
+are served by the existing get_*/find_* functions and catalog endpoints. Records are validated
+against the API models, and scenarios also against the typed domain model that fraud scoring
+parses them with. Records are insert-only: a line whose id is
+a built-in record, was ingested before, or repeats an earlier line of the upload is rejected, so
+scores, prompts and artifacts cached by id in any worker never go stale.
+
+Usage:
+    python ingest.py customers customers.ndjson
+    cat disputes.ndjson | python ingest.py disputes -
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+import domain
+from customer_profiles import CUSTOMER_REPOSITORY
+from dispute_cases import DISPUTE_REPOSITORY
+from fraud_scenarios import SCENARIO_REPOSITORY
+from models import CustomerDetail, DisputeDetail, FraudScenario
+from repository import Repository
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", str(1024 * 1024)))
+INGEST_MAX_ERRORS = int(os.getenv("INGEST_MAX_ERRORS", "20"))  # error details reported; all are counted
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: type  # API model each line must satisfy
+    parse: Optional[Callable[[dict], object]]  # typed domain constructor, catches bad dates and amounts
+    repository: Repository
+
+
+DATASETS = {
+    "scenarios": Dataset(FraudScenario, domain.Scenario.from_dict, SCENARIO_REPOSITORY),
+    "customers": Dataset(CustomerDetail, None, CUSTOMER_REPOSITORY),
+    "disputes": Dataset(DisputeDetail, None, DISPUTE_REPOSITORY),
+}
+
+
+class LineSplitter:
+    """
+    Splits byte chunks into numbered lines, holding at most one partial line. A line longer
+    than max_line_bytes is dropped as it streams in and reported as None.
+    """
+
+    def __init__(self, max_line_bytes: int = INGEST_MAX_LINE_BYTES):
+        self.max_line_bytes = max_line_bytes
+        self.buffer = bytearray()
+        self.line_no = 0
+        self.oversized = False
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[int, Optional[bytes]]]:
+        self.buffer += chunk
+        start = 0
+        while True:
+            end = self.buffer.find(b"\n", start)
+            if end < 0:
+                break
+            self.line_no += 1
+            yield self.line_no, None if self.oversized else bytes(self.buffer[start:end])
+            self.oversized = False
+            start = end + 1
+        del self.buffer[:start]
+        if len(self.buffer) > self.max_line_bytes:
+            self.oversized = True
+            self.buffer.clear()
+
+    def close(self) -> Iterator[Tuple[int, Optional[bytes]]]:
+        if self.buffer or self.oversized:
+            self.line_no += 1
+            yield self.line_no, None if self.oversized else bytes(self.buffer)
+        self.buffer.clear()
+        self.oversized = False
+
+
+def split_lines(chunks) -> Iterator[Tuple[int, Optional[bytes]]]:
+    splitter = LineSplitter()
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.close()
+
+
+def _error_text(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        first = error.errors()[0]
+        location = ".".join(str(part) for part in first["loc"])
+        return f"{location}: {first['msg']}" if location else first["msg"]
+    if isinstance(error, KeyError):
+        return f"missing field {error}"
+    return str(error)
+
+
+class Ingestion:
+    """Validates streamed lines for one dataset and hands back full batches to commit"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.dataset = DATASETS[name]
+        self.batch: List[tuple] = []
+        self.lines = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+        self.pending = {}  # key -> line number, for records validated but not yet written
+        self.started = time.perf_counter()
+
+    def _reject(self, line_no: int, message: str):
+        self.rejected += 1
+        if len(self.errors) < INGEST_MAX_ERRORS:
+            self.errors.append({"line": line_no, "error": message})
+
+    def validate(self, line_no: int, line: Optional[bytes]) -> Optional[tuple]:
+        """(key, record) for a valid line; None for blank or rejected lines"""
+        if line is not None and not line.strip():
+            return None
+        self.lines += 1
+        if line is None:
+            self._reject(line_no, f"line exceeds {INGEST_MAX_LINE_BYTES} bytes")
+            return None
+        try:
+            model: BaseModel = self.dataset.model.model_validate_json(line)
+            record = model.model_dump()
+            if self.dataset.parse is not None:
+                self.dataset.parse(record)
+        except (ValidationError, KeyError, ValueError, TypeError, AttributeError) as e:
+            self._reject(line_no, _error_text(e))
+            return None
+        key = record[self.dataset.repository.primary_key]
+        if key in self.dataset.repository:
+            self._reject(line_no, f"{key!r} is a built-in record and cannot be replaced")
+            return None
+        if key in self.pending:
+            self._reject(line_no, f"{key!r} repeats line {self.pending[key]}")
+            return None
+        self.pending[key] = line_no
+        return key, record
+
+    def batches(self, lines) -> Iterator[List[tuple]]:
+        """Full batches of (key, record) from a stream of numbered lines"""
+        for line_no, line in lines:
+            valid = self.validate(line_no, line)
+            if valid is not None:
+                self.batch.append(valid)
+                if len(self.batch) >= INGEST_BATCH_SIZE:
+                    batch, self.batch = self.batch, []
+                    yield batch
+
+    def remainder(self) -> List[tuple]:
+        batch, self.batch = self.batch, []
+        return batch
+
+    def write(self, batch: List[tuple]):
+        skipped = set(self.dataset.repository.store.insert_many(batch))
+        self.accepted += len(batch) - len(skipped)
+        for key, _ in batch:
+            line_no = self.pending.pop(key)
+            if key in skipped:
+                self._reject(line_no, f"{key!r} already exists and cannot be replaced")
+
+    def report(self) -> dict:
+        return {
+            "dataset": self.name,
+            "lines": self.lines,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 1),
+        }
+
+
+def ingest_chunks(name: str, chunks) -> dict:
+    """Ingest an iterable of NDJSON byte chunks (a file read piece by piece, stdin, ...)"""
+    ingestion = Ingestion(name)
+    for batch in ingestion.batches(split_lines(chunks)):
+        ingestion.write(batch)
+    ingestion.write(ingestion.remainder())
+    return ingestion.report()
+
+
+async def ingest_stream(name: str, chunks) -> dict:
+    """Ingest an async iterable of NDJSON byte chunks (a request body); commits run off the event loop"""
+    ingestion = Ingestion(name)
+    splitter = LineSplitter()
+    async for chunk in chunks:
+        for batch in ingestion.batches(splitter.feed(chunk)):
+            await run_in_threadpool(ingestion.write, batch)
+    for batch in ingestion.batches(splitter.close()):
+        await run_in_threadpool(ingestion.write, batch)
+    await run_in_threadpool(ingestion.write, ingestion.remainder())
+    return ingestion.report()
+
+
+def _read_chunks(stream, size: int = 1024 * 1024):
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest NDJSON records into the record store")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("path", help="NDJSON file, or - for stdin")
+    args = parser.parse_args()
+
+    if args.path == "-":
+        report = ingest_chunks(args.dataset, _read_chunks(sys.stdin.buffer))
+    else:
+        with open(args.path, "rb") as source:
+            report = ingest_chunks(args.dataset, _read_chunks(source))
+    print(json.dumps(report, indent=2))
+    return 1 if report["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
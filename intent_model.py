@@ -0,0 +1,255 @@
+"""
+Local intent and sentiment classifier for the virtual agent
+Messages are turned into hashed n-gram features (word unigrams and bigrams plus character
+trigrams inside words, CRC32-hashed into INTENT_MODEL_FEATURES buckets), and a linear
+softmax model per head (intent, sentiment) scores them. Training runs offline from a labelled
+JSONL corpus ({"text", "intent", "sentiment"} per line): multinomial logistic regression with
+L2, then one temperature per head fitted on held-out folds so confidences are calibrated, and
+the lowest confidence at which the held-out predictions reach INTENT_MODEL_TARGET_PRECISION
+(saved with the head as its min_confidence: below it the caller should not trust the label).
+The model file stores only the non-zero weight rows and loads in a few milliseconds;
+prediction is a sum of a handful of rows and a softmax, all on CPU.
+
+Usage:
+    python intent_model.py train intent_corpus.jsonl -o intent_model.npz
+    python intent_model.py predict "please freeze my card"
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INTENT_MODEL_PATH = os.getenv(
+    "INTENT_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model.npz")
+)
+INTENT_MODEL_FEATURES = 2 ** 18
+INTENT_MODEL_TARGET_PRECISION = float(os.getenv("INTENT_MODEL_TARGET_PRECISION", "0.95"))
+
+HEADS = ("intent", "sentiment")
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def features(text: str, buckets: int = INTENT_MODEL_FEATURES) -> Tuple[np.ndarray, np.ndarray]:
+    """(bucket indices, L2-normalized weights) of a message's hashed n-grams"""
+    words = _TOKEN.findall(text.lower())
+    grams = [f"w:{word}" for word in words]
+    grams += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices, counts = np.unique(
+        np.fromiter((zlib.crc32(gram.encode()) % buckets for gram in grams), dtype=np.int64, count=len(grams)),
+        return_counts=True
+    )
+    values = np.log1p(counts).astype(np.float32)
+    return indices, values / np.linalg.norm(values)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+class Head:
+    """One linear softmax classifier over the shared hashed features"""
+
+    def __init__(self, classes: List[str], rows: np.ndarray, weights: np.ndarray, bias: np.ndarray,
+                 temperature: float, min_confidence: float = 1.0):
+        self.classes = classes
+        self.rows = rows  # sorted bucket ids that have weights
+        self.weights = weights  # (len(rows), len(classes))
+        self.bias = bias
+        self.temperature = temperature
+        self.min_confidence = min_confidence  # held-out precision reaches the target at or above this
+
+    def predict(self, indices: np.ndarray, values: np.ndarray) -> Tuple[str, float, Dict[str, float]]:
+        """(label, calibrated confidence, probability per class)"""
+        positions = np.searchsorted(self.rows, indices)
+        positions = np.minimum(positions, len(self.rows) - 1)
+        known = self.rows[positions] == indices
+        logits = self.bias + values[known] @ self.weights[positions[known]]
+        probabilities = _softmax(logits / self.temperature)
+        best = int(np.argmax(probabilities))
+        return self.classes[best], float(probabilities[best]), dict(zip(self.classes, probabilities.tolist()))
+
+
+class IntentModel:
+    def __init__(self, heads: Dict[str, Head], buckets: int = INTENT_MODEL_FEATURES):
+        self.heads = heads
+        self.buckets = buckets
+
+    def predict(self, text: str) -> Dict[str, Tuple[str, float]]:
+        """{head: (label, confidence)} for every head"""
+        indices, values = features(text, self.buckets)
+        return {name: head.predict(indices, values)[:2] for name, head in self.heads.items()}
+
+    def probabilities(self, text: str) -> Dict[str, Dict[str, float]]:
+        """{head: {label: calibrated probability}} for every head"""
+        indices, values = features(text, self.buckets)
+        return {name: head.predict(indices, values)[2] for name, head in self.heads.items()}
+
+    def save(self, path: str):
+        arrays = {"buckets": np.array(self.buckets)}
+        for name, head in self.heads.items():
+            arrays[f"{name}_classes"] = np.array(head.classes)
+            arrays[f"{name}_rows"] = head.rows
+            arrays[f"{name}_weights"] = head.weights.astype(np.float32)
+            arrays[f"{name}_bias"] = head.bias.astype(np.float32)
+            arrays[f"{name}_temperature"] = np.array(head.temperature)
+            arrays[f"{name}_min_confidence"] = np.array(head.min_confidence)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str = INTENT_MODEL_PATH) -> "IntentModel":
+        with np.load(path) as data:
+            heads = {
+                name: Head(
+                    classes=data[f"{name}_classes"].tolist(),
+                    rows=data[f"{name}_rows"],
+                    weights=data[f"{name}_weights"],
+                    bias=data[f"{name}_bias"],
+                    temperature=float(data[f"{name}_temperature"]),
+                    min_confidence=float(data[f"{name}_min_confidence"]) if f"{name}_min_confidence" in data else 1.0
+                )
+                for name in HEADS
+            }
+            return cls(heads, int(data["buckets"]))
+
+
+def load_model(path: str = INTENT_MODEL_PATH) -> Optional[IntentModel]:
+    """The trained model, or None when no model file has been built"""
+    return IntentModel.load(path) if os.path.exists(path) else None
+
+
+# Training
+
+def _fit(X: np.ndarray, y: np.ndarray, classes: int, l2: float = 1e-3, epochs: int = 400,
+         learning_rate: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+    """Multinomial logistic regression by full-batch gradient descent with momentum"""
+    weights = np.zeros((X.shape[1], classes))
+    bias = np.zeros(classes)
+    target = np.eye(classes)[y]
+    velocity_w, velocity_b = np.zeros_like(weights), np.zeros_like(bias)
+    for _ in range(epochs):
+        error = (_softmax(X @ weights + bias) - target) / len(X)
+        velocity_w = 0.9 * velocity_w - learning_rate * (X.T @ error + l2 * weights)
+        velocity_b = 0.9 * velocity_b - learning_rate * error.sum(axis=0)
+        weights += velocity_w
+        bias += velocity_b
+    return weights, bias
+
+
+def _fit_temperature(logits: np.ndarray, y: np.ndarray) -> float:
+    """Temperature minimizing held-out negative log-likelihood"""
+    grid = np.exp(np.linspace(np.log(0.05), np.log(5.0), 120))
+    losses = [-np.log(_softmax(logits / t)[np.arange(len(y)), y] + 1e-12).mean() for t in grid]
+    return float(grid[int(np.argmin(losses))])
+
+
+def _expected_calibration_error(probabilities: np.ndarray, y: np.ndarray, bins: int = 10) -> float:
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == y
+    edges = np.linspace(0, 1, bins + 1)
+    error = 0.0
+    for low, high in zip(edges[:-1], edges[1:]):
+        in_bin = (confidence > low) & (confidence <= high)
+        if in_bin.any():
+            error += in_bin.mean() * abs(correct[in_bin].mean() - confidence[in_bin].mean())
+    return float(error)
+
+
+def _min_confidence(probabilities: np.ndarray, y: np.ndarray, precision: float) -> Tuple[float, float]:
+    """(lowest confidence whose predictions at or above it reach precision, share of examples covered)"""
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == y
+    order = np.argsort(-confidence)
+    running = np.cumsum(correct[order]) / np.arange(1, len(y) + 1)
+    reached = np.nonzero(running >= precision)[0]
+    if not len(reached):
+        return 1.0, 0.0
+    last = int(reached[-1])
+    return float(confidence[order][last]), (last + 1) / len(y)
+
+
+def train(examples: List[dict], folds: int = 5, seed: int = 13, buckets: int = INTENT_MODEL_FEATURES) -> Tuple[IntentModel, dict]:
+    """Train both heads on every example; the temperature and the report come from k-fold held-out predictions"""
+    hashed = [features(example["text"], buckets) for example in examples]
+    columns = np.unique(np.concatenate([indices for indices, _ in hashed]))
+    X = np.zeros((len(examples), len(columns)))
+    for row, (indices, values) in enumerate(hashed):
+        X[row, np.searchsorted(columns, indices)] = values
+
+    order = np.random.default_rng(seed).permutation(len(examples))
+    heads, report = {}, {"examples": len(examples), "features": int(len(columns))}
+    for name in HEADS:
+        classes = sorted({example[name] for example in examples})
+        y = np.array([classes.index(example[name]) for example in examples])
+
+        held_out_logits = np.zeros((len(examples), len(classes)))
+        for fold in range(folds):
+            test = order[fold::folds]
+            fit = np.setdiff1d(order, test)
+            weights, bias = _fit(X[fit], y[fit], len(classes))
+            held_out_logits[test] = X[test] @ weights + bias
+        temperature = _fit_temperature(held_out_logits, y)
+        held_out = _softmax(held_out_logits / temperature)
+        min_confidence, coverage = _min_confidence(held_out, y, INTENT_MODEL_TARGET_PRECISION)
+
+        weights, bias = _fit(X, y, len(classes))
+        used = np.abs(weights).max(axis=1) > 1e-6
+        heads[name] = Head(
+            classes, columns[used], weights[used].astype(np.float32), bias.astype(np.float32),
+            temperature, min_confidence
+        )
+        report[name] = {
+            "classes": len(classes),
+            "held_out_accuracy": round(float((held_out.argmax(axis=1) == y).mean()), 3),
+            "expected_calibration_error": round(_expected_calibration_error(held_out, y), 3),
+            "temperature": round(temperature, 3),
+            "min_confidence": round(min_confidence, 3),
+            "held_out_coverage": round(coverage, 3),
+        }
+    return IntentModel(heads, buckets), report
+
+
+def read_corpus(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as corpus:
+        return [json.loads(line) for line in corpus if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or query the virtual agent intent classifier")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_command = commands.add_parser("train", help="Train from a labelled JSONL corpus")
+    train_command.add_argument("corpus")
+    train_command.add_argument("-o", "--output", default=INTENT_MODEL_PATH)
+    predict_command = commands.add_parser("predict", help="Classify a message with the saved model")
+    predict_command.add_argument("text")
+    predict_command.add_argument("--model", default=INTENT_MODEL_PATH)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        model, report = train(read_corpus(args.corpus))
+        model.save(args.output)
+        print(json.dumps(report, indent=2))
+    else:
+        model = load_model(args.model)
+        if model is None:
+            print(f"No model at {args.model}; run: python intent_model.py train <corpus.jsonl>", file=sys.stderr)
+            return 1
+        print(json.dumps(model.predict(args.text), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
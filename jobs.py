@@ -0,0 +1,418 @@
+"""
+Offline dispute triage jobs
+A job runs the dispute forensic analysis over every case matching a filter (claim type, status,
+transaction date). Jobs and their items are persisted in a SQLite queue: the API only enqueues
+jobs and reports progress, and `python jobs.py worker` processes them outside the request-serving
+workers. Each item is committed as soon as it finishes, so the queue is its own checkpoint; items
+held by a worker that stopped are handed out again once their lease expires, and a restarted
+worker resumes where the last one left off. Workers pace completions to requests- and
+tokens-per-minute limits and all back off together when OpenAI answers 429.
+Finished analyses also go into the artifact store, so /api/analyze-dispute serves them directly.
+
+Usage:
+    python jobs.py submit --status "Under Investigation"
+    python jobs.py worker --concurrency 4      # keep polling the queue
+    python jobs.py worker --drain              # exit once the queue is empty
+    python jobs.py status <job_id>
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from analysis_prompts import analysis_artifacts, dispute_analysis_completion, dispute_artifact_key
+
+JOB_QUEUE_PATH = os.getenv(
+    "JOB_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3")
+)
+JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", "4"))
+JOBS_REQUESTS_PER_MINUTE = int(os.getenv("JOBS_REQUESTS_PER_MINUTE", "60"))
+JOBS_TOKENS_PER_MINUTE = int(os.getenv("JOBS_TOKENS_PER_MINUTE", "90000"))
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "900"))
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "2"))
+JOBS_RATE_LIMIT_BACKOFF = float(os.getenv("JOBS_RATE_LIMIT_BACKOFF", "20"))
+JOBS_RETRY_BACKOFF = float(os.getenv("JOBS_RETRY_BACKOFF", "30"))  # doubled after each failed attempt
+
+logger = logging.getLogger(__name__)
+
+DISPUTE_TRIAGE = "dispute-triage"
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(value).isoformat(timespec="seconds") if value else None
+
+
+class JobQueue:
+    """SQLite-backed job and item queue shared by the API workers and the job workers on a host"""
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, filters TEXT NOT NULL, "
+                "bypass_cache INTEGER NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_items ("
+                "job_id TEXT NOT NULL, item_key TEXT NOT NULL, position INTEGER NOT NULL, "
+                "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+                "leased_until REAL, worker TEXT, content TEXT, model TEXT, cache_status TEXT, "
+                "error TEXT, updated_at REAL, PRIMARY KEY (job_id, item_key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status, leased_until)")
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._connection().execute(sql, params)
+
+    def submit(self, kind: str, filters: dict, item_keys: List[str], bypass_cache: bool = False) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, kind, filters, bypass_cache, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, kind, json.dumps(filters), int(bypass_cache), now)
+                )
+                conn.executemany(
+                    "INSERT INTO job_items (job_id, item_key, position, updated_at) VALUES (?, ?, ?, ?)",
+                    [(job_id, item_key, position, now) for position, item_key in enumerate(item_keys)]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self, worker: str, lease_seconds: float = JOBS_LEASE_SECONDS) -> Optional[dict]:
+        """
+        Lease the oldest pending item (or one whose lease expired) to worker.
+        A single UPDATE, so concurrent workers in other processes never get the same item.
+        """
+        now = time.time()
+        row = self._execute(
+            "UPDATE job_items SET status = 'running', attempts = attempts + 1, leased_until = ?, "
+            "worker = ?, updated_at = ? "
+            "WHERE rowid = (SELECT job_items.rowid FROM job_items JOIN jobs USING (job_id) "
+            "WHERE (status = 'pending' AND (leased_until IS NULL OR leased_until <= ?)) "
+            "OR (status = 'running' AND leased_until < ?) "
+            "ORDER BY jobs.created_at, position LIMIT 1) "
+            "RETURNING job_id, item_key, attempts, "
+            "(SELECT kind FROM jobs WHERE jobs.job_id = job_items.job_id), "
+            "(SELECT bypass_cache FROM jobs WHERE jobs.job_id = job_items.job_id)",
+            (now + lease_seconds, worker, now, now, now)
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, item_key, attempts, kind, bypass_cache = row
+        return {"job_id": job_id, "item_key": item_key, "attempts": attempts, "kind": kind,
+                "bypass_cache": bool(bypass_cache)}
+
+    def complete(self, item: dict, content: str, model: str, cache_status: Optional[str]):
+        self._execute(
+            "UPDATE job_items SET status = 'completed', content = ?, model = ?, cache_status = ?, "
+            "error = NULL, leased_until = NULL, updated_at = ? WHERE job_id = ? AND item_key = ?",
+            (content, model, cache_status, time.time(), item["job_id"], item["item_key"])
+        )
+
+    def fail(self, item: dict, error: str, retry: bool = True, max_attempts: int = JOBS_MAX_ATTEMPTS,
+             backoff: float = JOBS_RETRY_BACKOFF):
+        """
+        Record an error; the item goes back to pending unless it is out of attempts or not retryable.
+        A retried item cannot be claimed for backoff * 2^(attempts - 1) seconds (kept in leased_until).
+        """
+        now = time.time()
+        if retry and item["attempts"] < max_attempts:
+            status, not_before = "pending", now + backoff * 2 ** (item["attempts"] - 1)
+        else:
+            status, not_before = "failed", None
+        self._execute(
+            "UPDATE job_items SET status = ?, error = ?, leased_until = ?, updated_at = ? "
+            "WHERE job_id = ? AND item_key = ?",
+            (status, error, not_before, now, item["job_id"], item["item_key"])
+        )
+
+    def release(self, item: dict):
+        """Return a leased item to the queue without spending an attempt (e.g. after a 429)"""
+        self._execute(
+            "UPDATE job_items SET status = 'pending', attempts = attempts - 1, leased_until = NULL, "
+            "updated_at = ? WHERE job_id = ? AND item_key = ?",
+            (time.time(), item["job_id"], item["item_key"])
+        )
+
+    def get(self, job_id: str, include_items: bool = True) -> Optional[dict]:
+        job = self._execute(
+            "SELECT kind, filters, bypass_cache, created_at FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if job is None:
+            return None
+        rows = self._execute(
+            "SELECT item_key, status, attempts, content, cache_status, error, updated_at "
+            "FROM job_items WHERE job_id = ? ORDER BY position", (job_id,)
+        ).fetchall()
+
+        counts = {"pending": 0, "running": 0, "completed": 0, "failed": 0}
+        for row in rows:
+            counts[row[1]] += 1
+        if counts["pending"] + counts["running"] == 0:
+            if rows and counts["failed"] == len(rows):
+                status = "failed"
+            else:
+                status = "completed_with_errors" if counts["failed"] else "completed"
+        elif counts["pending"] == len(rows):
+            status = "queued"
+        else:
+            status = "running"
+
+        return {
+            "job_id": job_id,
+            "kind": job[0],
+            "filters": json.loads(job[1]),
+            "bypass_cache": bool(job[2]),
+            "status": status,
+            "created_at": _timestamp(job[3]),
+            "updated_at": _timestamp(max([row[6] for row in rows], default=job[3])),
+            "total": len(rows),
+            **counts,
+            "items": [
+                {
+                    "item_key": row[0],
+                    "status": row[1],
+                    "attempts": row[2],
+                    "analysis": row[3],
+                    "cache": row[4],
+                    "error": row[5],
+                    "updated_at": _timestamp(row[6])
+                }
+                for row in rows
+            ] if include_items else []
+        }
+
+
+class RateLimiter:
+    """
+    Requests- and tokens-per-minute pacing for one worker process (token buckets refilled
+    continuously), plus a shared pause that every task honours after a 429.
+    """
+
+    def __init__(self, requests_per_minute: int = JOBS_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = JOBS_TOKENS_PER_MINUTE):
+        self.limits = {"requests": float(requests_per_minute), "tokens": float(tokens_per_minute)}
+        self.available = dict(self.limits)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        for name, per_minute in self.limits.items():
+            self.available[name] = min(per_minute, self.available[name] + (now - self.updated) * per_minute / 60)
+        self.updated = now
+
+    async def acquire(self, tokens: int):
+        """Wait until one request of `tokens` prompt tokens fits both budgets (and any pause is over)"""
+        tokens = min(tokens, self.limits["tokens"])
+        async with self._lock:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                    continue
+                self._refill()
+                if self.available["requests"] >= 1 and self.available["tokens"] >= tokens:
+                    self.available["requests"] -= 1
+                    self.available["tokens"] -= tokens
+                    return
+                wait = max(
+                    (1 - self.available["requests"]) * 60 / self.limits["requests"],
+                    (tokens - self.available["tokens"]) * 60 / self.limits["tokens"]
+                )
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def _retry_after(error) -> float:
+    """Seconds to back off after a 429, from the response headers when OpenAI sends them"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[header]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return JOBS_RATE_LIMIT_BACKOFF
+
+
+async def process_item(api_key: str, queue: JobQueue, limiter: RateLimiter, item: dict):
+    """Run one dispute analysis (artifact first, then a paced completion) and checkpoint the result"""
+    import openai
+    from fastapi import HTTPException
+
+    from dispute_cases import get_dispute_case
+    from llm_gateway import chat_completion
+    from token_budget import message_tokens
+
+    dispute = get_dispute_case(item["item_key"])
+    if dispute is None:
+        queue.fail(item, "Dispute case not found", retry=False)
+        return
+
+    artifact_key = dispute_artifact_key(item["item_key"])
+    artifact = None if item["bypass_cache"] else analysis_artifacts.get(artifact_key)
+    if artifact is not None:
+        queue.complete(item, artifact.content, artifact.model, artifact.cache_status)
+        return
+
+    try:
+        completion_args = dispute_analysis_completion(dispute)
+    except HTTPException as e:  # over the prompt budget: retrying will not help
+        queue.fail(item, e.detail, retry=False)
+        return
+
+    await limiter.acquire(message_tokens(completion_args["messages"]))
+    try:
+        completion = await chat_completion(api_key, **completion_args, use_cache=True,
+                                           bypass_cache=item["bypass_cache"], usage_label=DISPUTE_TRIAGE)
+    except openai.RateLimitError as e:
+        limiter.pause(_retry_after(e))
+        queue.release(item)
+        return
+    except Exception as e:
+        queue.fail(item, str(e))
+        return
+
+    try:
+        analysis_artifacts.put(artifact_key, completion)
+    except sqlite3.Error as e:  # the artifact is only a cache; the paid completion is still the result
+        logger.warning("Could not store artifact %s: %s", artifact_key, e)
+    queue.complete(item, completion.content, completion.model, completion.cache_status)
+
+
+async def run_worker(api_key: str, concurrency: int = JOBS_CONCURRENCY, drain: bool = False,
+                     queue: JobQueue = None, limiter: RateLimiter = None) -> int:
+    """
+    Process queued items with `concurrency` tasks until stopped (or, with drain, until the
+    queue is empty); returns the number of items processed.
+    """
+    queue = queue or JobQueue()
+    limiter = limiter or RateLimiter()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+
+    async def loop():
+        nonlocal processed
+        while True:
+            item = queue.claim(worker)
+            if item is None:
+                if drain:
+                    return
+                await asyncio.sleep(JOBS_POLL_INTERVAL)
+                continue
+            await process_item(api_key, queue, limiter, item)
+            processed += 1
+
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return processed
+
+
+def submit_dispute_triage(queue: JobQueue, customer_claim: str = None, status: str = None,
+                          transaction_date: str = None, bypass_cache: bool = False) -> Optional[str]:
+    """Enqueue a triage job over the matching dispute cases; None when nothing matches"""
+    from dispute_cases import find_disputes
+
+    filters = {"customer_claim": customer_claim, "status": status, "transaction_date": transaction_date}
+    case_ids = [case["case_id"] for case in find_disputes(**filters)]
+    if not case_ids:
+        return None
+    filters = {name: value for name, value in filters.items() if value is not None}
+    return queue.submit(DISPUTE_TRIAGE, filters, case_ids, bypass_cache)
+
+
+def _print_status(job: Dict):
+    print(f"Job {job['job_id']} ({job['kind']}): {job['status']}")
+    print(f"  {job['completed']}/{job['total']} completed, {job['failed']} failed, "
+          f"{job['running']} running, {job['pending']} pending")
+    for item in job["items"]:
+        if item["status"] == "failed":
+            print(f"  {item['item_key']}: {item['error']}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="enqueue a dispute triage job")
+    submit.add_argument("--customer-claim")
+    submit.add_argument("--status")
+    submit.add_argument("--transaction-date")
+    submit.add_argument("--bypass-cache", action="store_true", help="ignore stored analyses")
+
+    worker = commands.add_parser("worker", help="process queued job items")
+    worker.add_argument("--concurrency", type=int, default=JOBS_CONCURRENCY, help="items in flight")
+    worker.add_argument("--drain", action="store_true", help="exit once the queue is empty")
+
+    status = commands.add_parser("status", help="show a job's progress")
+    status.add_argument("job_id")
+
+    args = parser.parse_args()
+    queue = JobQueue()
+
+    if args.command == "submit":
+        job_id = submit_dispute_triage(queue, args.customer_claim, args.status, args.transaction_date,
+                                       args.bypass_cache)
+        if job_id is None:
+            sys.exit("No dispute cases match the filter")
+        print(job_id)
+        return
+
+    if args.command == "status":
+        job = queue.get(args.job_id)
+        if job is None:
+            sys.exit("Job not found")
+        _print_status(job)
+        return
+
+    import llm_gateway
+
+    api_key = llm_gateway.get_openai_api_key()
+    if not api_key:
+        sys.exit("OPENAI_API_KEY is not configured")
+
+    async def run():
+        llm_gateway.open_client(api_key)
+        try:
+            return await run_worker(api_key, args.concurrency, args.drain, queue)
+        finally:
+            await llm_gateway.close_client()
+
+    started = time.perf_counter()
+    processed = asyncio.run(run())
+    print(f"Processed {processed} item(s) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main_cli()
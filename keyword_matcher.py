@@ -0,0 +1,82 @@
+"""
+Compiled multi-label keyword matcher
+Every keyword of every table (sentiment, intent, off-topic) goes into one regex compiled once
+at import, so classifying a message is a single left-to-right scan. The alternation is laid
+out as a character trie ("lo(?:ck|st)" rather than "lock|lost"), so at each position the
+engine follows one branch instead of trying every keyword. Keywords match on word boundaries
+("charge" does not fire inside "recharge") and allow common inflections ("charges",
+"activated", "thanking"). Each keyword carries every label of the keywords it contains, so a
+longer phrase ("lost my card") still counts as its shorter parts ("lost") even though the
+scan reports only the longest match at a position.
+"""
+
+import re
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+# Optional inflection after a keyword: balance[s], charge[d], activate[d], thank[ing]
+_INFLECTION = r"(?:s|es|d|ed|ing)?"
+
+
+def _boundary_pattern(keyword: str) -> str:
+    return r"\b" + re.escape(keyword) + _INFLECTION + r"\b"
+
+
+def trie_pattern(words) -> str:
+    """Regex source matching exactly the given words, factored into a character trie (longest match first)"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ending here is tried after every longer continuation (greedy "?")
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    def __init__(self, tables: Dict[str, Sequence[Tuple[str, Sequence[str]]]]):
+        """
+        tables maps a table name to (label, keywords) pairs in priority order, e.g.
+        {"intent": [("check_balance", ["balance", "how much"]), ...], ...}
+        """
+        self.priority: Dict[str, List[str]] = {
+            table: [label for label, _ in entries] for table, entries in tables.items()
+        }
+        direct: Dict[str, set] = {}
+        for table, entries in tables.items():
+            for label, keywords in entries:
+                for keyword in keywords:
+                    direct.setdefault(keyword.lower(), set()).add((table, label))
+
+        # A phrase also carries the labels of every keyword inside it, on word boundaries
+        self._labels: Dict[str, FrozenSet[Tuple[str, str]]] = {}
+        for keyword, labels in direct.items():
+            found = set(labels)
+            for other, other_labels in direct.items():
+                if other != keyword and len(other) < len(keyword) and re.search(_boundary_pattern(other), keyword):
+                    found |= other_labels
+            self._labels[keyword] = frozenset(found)
+
+        self.pattern = re.compile(r"\b(" + trie_pattern(direct) + r")" + _INFLECTION + r"\b")
+
+    def scan(self, message: str) -> FrozenSet[Tuple[str, str]]:
+        """Every (table, label) whose keywords occur in message, in one pass"""
+        found = set()
+        for keyword in self.pattern.findall(message.lower()):
+            found |= self._labels[keyword]
+        return frozenset(found)
+
+    def first(self, found: FrozenSet[Tuple[str, str]], table: str) -> Optional[str]:
+        """Highest-priority label of table among the matches, or None"""
+        for label in self.priority[table]:
+            if (table, label) in found:
+                return label
+        return None
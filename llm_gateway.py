@@ -0,0 +1,293 @@
+"""
+Async LLM gateway shared by the analysis endpoints and the virtual agent
+Owns one long-lived openai.AsyncOpenAI client per worker so completions never block
+the uvicorn event loop and reuse pooled keep-alive (HTTP/2 where available) connections.
+Deterministic analysis prompts can opt into the content-addressed response cache,
+and any completion can be streamed token by token.
+"""
+
+import importlib.util
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+import openai
+from fastapi import HTTPException
+
+from prompt_encoding import DEFAULT_MODEL
+from response_cache import cache_key, create_cache
+from token_budget import record_completion
+
+# Connection pool configuration (per gunicorn worker)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "600"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+
+# Centralized OpenAI API Key - REPLACE WITH YOUR KEY
+OPENAI_API_KEY = "your-api-key-here"
+
+_client = None
+_client_api_key = None
+_cache = None
+_cache_ready = False
+
+_pool_stats = {
+    "requests": 0,
+    "errors": 0,
+    "in_flight": 0,
+    "peak_in_flight": 0,
+    "in_flight_over_limit": 0
+}
+
+
+@dataclass
+class CompletionResult:
+    content: str
+    model: str
+    usage: dict = field(default_factory=dict)
+    cache_status: Optional[str] = None  # HIT, MISS or BYPASS when the cache was consulted
+
+
+def get_openai_api_key():
+    return OPENAI_API_KEY if OPENAI_API_KEY != "your-api-key-here" else os.getenv("OPENAI_API_KEY")
+
+
+def require_openai_api_key() -> str:
+    api_key = get_openai_api_key()
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured on server")
+    return api_key
+
+
+def get_cache():
+    """Return the configured response cache (created on first use), or None if disabled"""
+    global _cache, _cache_ready
+    if not _cache_ready:
+        _cache = create_cache()
+        _cache_ready = True
+    return _cache
+
+
+def _build_client(api_key: str) -> openai.AsyncOpenAI:
+    http_client = httpx.AsyncClient(
+        http2=LLM_HTTP2,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=10.0)
+    )
+    return openai.AsyncOpenAI(api_key=api_key, http_client=http_client)
+
+
+def open_client(api_key: str) -> openai.AsyncOpenAI:
+    """Create the worker's pooled client (called from app startup)"""
+    global _client, _client_api_key
+    if _client is None or _client_api_key != api_key:
+        _client = _build_client(api_key)
+        _client_api_key = api_key
+    return _client
+
+
+async def close_client():
+    """Close the pooled client and its connections (called from app shutdown)"""
+    global _client, _client_api_key
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _client_api_key = None
+
+
+def get_client(api_key: str) -> openai.AsyncOpenAI:
+    """Return the pooled client, creating it lazily if the key was not available at startup"""
+    if _client is None or _client_api_key != api_key:
+        return open_client(api_key)
+    return _client
+
+
+def get_pool_metrics() -> dict:
+    """
+    Snapshot of completion concurrency against the pool limit. in_flight_over_limit counts calls
+    started while more than LLM_MAX_CONNECTIONS were already in flight, and saturation is
+    in_flight / LLM_MAX_CONNECTIONS. Over HTTP/2 several requests share one connection, so
+    neither means a call actually queued for a connection; they only show load relative to the limit.
+    """
+    return {
+        **_pool_stats,
+        "max_connections": LLM_MAX_CONNECTIONS,
+        "max_keepalive_connections": LLM_MAX_KEEPALIVE_CONNECTIONS,
+        "saturation": round(_pool_stats["in_flight"] / LLM_MAX_CONNECTIONS, 4),
+        "peak_saturation": round(_pool_stats["peak_in_flight"] / LLM_MAX_CONNECTIONS, 4),
+        "http2": LLM_HTTP2,
+        "client_open": _client is not None
+    }
+
+
+@contextmanager
+def _track_request():
+    """Count one completion against the pool metrics for as long as it is in flight"""
+    _pool_stats["requests"] += 1
+    _pool_stats["in_flight"] += 1
+    _pool_stats["peak_in_flight"] = max(_pool_stats["peak_in_flight"], _pool_stats["in_flight"])
+    if _pool_stats["in_flight"] > LLM_MAX_CONNECTIONS:
+        _pool_stats["in_flight_over_limit"] += 1
+    try:
+        yield
+    except Exception:
+        _pool_stats["errors"] += 1
+        raise
+    finally:
+        _pool_stats["in_flight"] -= 1
+
+
+async def _create_completion(api_key: str, params: dict) -> CompletionResult:
+    client = get_client(api_key)
+    with _track_request():
+        response = await client.chat.completions.create(**params)
+
+    usage = {}
+    if response.usage is not None:
+        usage = {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "total_tokens": response.usage.total_tokens
+        }
+    return CompletionResult(content=response.choices[0].message.content, model=response.model, usage=usage)
+
+
+def _completion_params(messages, model, temperature, max_tokens) -> dict:
+    params = {"model": model, "messages": messages}
+    if temperature is not None:
+        params["temperature"] = temperature
+    if max_tokens is not None:
+        params["max_tokens"] = max_tokens
+    return params
+
+
+async def chat_completion(api_key: str, messages: list, model: str = DEFAULT_MODEL,
+                          temperature: float = None, max_tokens: int = None,
+                          use_cache: bool = False, bypass_cache: bool = False,
+                          usage_label: str = None) -> CompletionResult:
+    """
+    Run a chat completion on the pooled client.
+    With use_cache, identical (model, messages, temperature, max_tokens) calls are served from
+    the response cache; bypass_cache forces a fresh completion and refreshes the cached entry.
+    usage_label attributes the token usage to an endpoint in the token usage metrics.
+    """
+    result = await _cached_completion(api_key, messages, model, temperature, max_tokens, use_cache, bypass_cache)
+    if usage_label:
+        record_completion(usage_label, result)
+    return result
+
+
+async def _cached_completion(api_key, messages, model, temperature, max_tokens,
+                             use_cache, bypass_cache) -> CompletionResult:
+    params = _completion_params(messages, model, temperature, max_tokens)
+
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        return await _create_completion(api_key, params)
+
+    key = cache_key(model, messages, temperature, max_tokens)
+    if not bypass_cache:
+        cached = await cache.aget(key)
+        if cached is not None:
+            return CompletionResult(**cached, cache_status="HIT")
+
+    result = await _create_completion(api_key, params)
+    await cache.aset(key, {"content": result.content, "model": result.model, "usage": result.usage})
+    result.cache_status = "BYPASS" if bypass_cache else "MISS"
+    return result
+
+
+class CompletionStream:
+    """
+    Async iterator over content deltas of one completion.
+    cache_status is known before iteration starts; result holds the full CompletionResult
+    once the stream is exhausted. Cache hits replay the stored text as a single delta.
+    """
+
+    def __init__(self, api_key: str, params: dict, cache=None, key: str = None,
+                 cached: dict = None, cache_status: str = None, usage_label: str = None):
+        self.api_key = api_key
+        self.params = params
+        self.cache = cache
+        self.key = key
+        self.cached = cached
+        self.cache_status = cache_status
+        self.usage_label = usage_label
+        self.result = None
+
+    @classmethod
+    def replay(cls, result: CompletionResult) -> "CompletionStream":
+        """Stream an already available completion (e.g. a precomputed artifact) as one delta"""
+        cached = {"content": result.content, "model": result.model, "usage": result.usage}
+        return cls(None, None, cached=cached, cache_status=result.cache_status)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        if self.cached is not None:
+            self.result = CompletionResult(**self.cached, cache_status=self.cache_status)
+            self._record_usage()
+            yield self.result.content
+            return
+
+        client = get_client(self.api_key)
+        parts = []
+        model = self.params["model"]
+        usage = {}
+        with _track_request():
+            stream = await client.chat.completions.create(
+                **self.params, stream=True, stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                model = chunk.model or model
+                if getattr(chunk, "usage", None) is not None:
+                    usage = {
+                        "prompt_tokens": chunk.usage.prompt_tokens,
+                        "completion_tokens": chunk.usage.completion_tokens,
+                        "total_tokens": chunk.usage.total_tokens
+                    }
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        self.result = CompletionResult(content="".join(parts), model=model, usage=usage,
+                                       cache_status=self.cache_status)
+        self._record_usage()
+        if self.cache is not None:
+            await self.cache.aset(self.key, {"content": self.result.content, "model": model, "usage": usage})
+
+    def _record_usage(self):
+        if self.usage_label:
+            record_completion(self.usage_label, self.result)
+
+
+async def stream_chat_completion(api_key: str, messages: list, model: str = DEFAULT_MODEL,
+                           temperature: float = None, max_tokens: int = None,
+                           use_cache: bool = False, bypass_cache: bool = False,
+                           usage_label: str = None) -> CompletionStream:
+    """Streaming counterpart of chat_completion with the same caching semantics"""
+    params = _completion_params(messages, model, temperature, max_tokens)
+
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        return CompletionStream(api_key, params, usage_label=usage_label)
+
+    key = cache_key(model, messages, temperature, max_tokens)
+    if not bypass_cache:
+        cached = await cache.aget(key)
+        if cached is not None:
+            return CompletionStream(api_key, params, cached=cached, cache_status="HIT", usage_label=usage_label)
+    return CompletionStream(api_key, params, cache=cache, key=key,
+                            cache_status="BYPASS" if bypass_cache else "MISS", usage_label=usage_label)
@@ -13,32 +13,86 @@ FastAPI backend providing AI-powered financial analysis endpoints:
 Last updated: 2024-12-31
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import openai
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+import asyncio
 import json
 import os
+import sqlite3
+import time
 from datetime import datetime
-from fraud_scenarios import get_fraud_scenarios
-from merchant_data import get_all_merchants, get_merchant_data
-from customer_profiles import get_all_customers, get_customer_profile
-from dispute_cases import get_all_disputes, get_dispute_case
+from functools import partial
+from typing import Optional
+from fraud_scenarios import get_fraud_scenario
+from merchant_data import get_merchant_data
+from merchant_stats import merchant_stats
+from merchant_anomalies import merchant_anomalies
+from token_budget import get_token_usage, record_completion
+from customer_profiles import get_customer_profile, find_customers
+from dispute_cases import get_dispute_case, find_disputes
+import catalog
+import fraud_scoring
+import geo_velocity
+import ingest
+import transaction_scoring
+from fast_json import FastJSONResponse, FAST_JSON_RESPONSES
 import random
-from virtual_agent import get_capabilities, authenticate_user, process_chat
+from virtual_agent import get_capabilities, authenticate_user, process_chat, get_session
+import llm_gateway
+import response_templates
+from llm_gateway import chat_completion, stream_chat_completion, CompletionStream, get_openai_api_key, require_openai_api_key
+from analysis_prompts import (
+    analysis_artifacts, prompt_budget,
+    fraud_artifact_key, merchant_artifact_key, customer_artifact_key, dispute_artifact_key,
+    fraud_analysis_completion, merchant_narrative_completion, customer_upgrade_completion,
+    dispute_analysis_completion
+)
+from jobs import JobQueue, submit_dispute_triage
+from batch import BATCH_CONCURRENCY, BATCH_ITEM_TIMEOUT, BATCH_MAX_ITEMS, run_bounded
 
 from models import (
-    FraudAnalysisRequest, FraudAnalysisResponse,
+    FraudAnalysisRequest, FraudAnalysisResponse, FraudBatchRequest, FraudScoreRequest, FraudScoreResponse,
+    GeoVelocityRequest, GeoVelocityResponse, IngestResponse,
     MerchantNarrativeRequest, MerchantNarrativeResponse, MerchantListResponse,
     CustomerUpgradeRequest, CustomerUpgradeResponse, CustomerListResponse,
     DisputeAnalysisRequest, DisputeAnalysisResponse, DisputeListResponse,
+    DisputeTriageJobRequest, JobResponse,
     ScenariosResponse, HeartbeatResponse, RootResponse,
     TestConnectionResponse, TestPromptRequest, TestPromptResponse,
     AuthenticationRequest, AuthenticationResponse,
     VirtualAgentChatRequest, VirtualAgentChatResponse, ChatMessage,
-    CapabilitiesResponse
+    CapabilitiesResponse, ChatSessionResponse, FastPathMetricsResponse, LLMPoolMetricsResponse, AnalysisArtifactsResponse,
+    MerchantDetail, CustomerDetail, DisputeDetail, MerchantStatsResponse, MerchantAnomaliesResponse,
+    TokenUsageResponse
 )
 
-app = FastAPI(title="Mastercard Fraud Analysis API")
+# Pre-generate all analyses in the background when the app starts (see warmup.py)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Serialize the catalog and open the pooled LLM client once per worker; close it on shutdown"""
+    catalog.build()
+    api_key = get_openai_api_key()
+    warmup_task = None
+    if api_key:
+        llm_gateway.open_client(api_key)
+        if WARMUP_ON_STARTUP:
+            from warmup import run_warmup_once_per_host
+            warmup_task = asyncio.create_task(run_warmup_once_per_host(api_key))
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await llm_gateway.close_client()
+
+app = FastAPI(
+    title="Mastercard Fraud Analysis API",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if FAST_JSON_RESPONSES else JSONResponse
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -51,84 +105,292 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "ETag"],
 )
 
-# Centralized OpenAI API Key - REPLACE WITH YOUR KEY
-OPENAI_API_KEY = "your-api-key-here"
-
-def require_openai_api_key() -> str:
-    api_key = OPENAI_API_KEY if OPENAI_API_KEY != "your-api-key-here" else os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured on server")
-    return api_key
+job_queue = JobQueue()
+
+async def generate_analysis(api_key: str, endpoint: str, item_key: str, build_completion,
+                            bypass_cache: bool = False):
+    """Serve a precomputed artifact when one exists, otherwise run the (cached) completion live"""
+    if not bypass_cache:
+        completion = await analysis_artifacts.aget(item_key)
+        if completion is not None:
+            record_completion(endpoint, completion)
+            return completion
+    return await chat_completion(api_key, **build_completion(), use_cache=True, bypass_cache=bypass_cache,
+                                 usage_label=endpoint)
+
+async def stream_analysis_completion(api_key: str, endpoint: str, item_key: str, build_completion,
+                               bypass_cache: bool = False):
+    """Streaming counterpart of generate_analysis"""
+    if not bypass_cache:
+        completion = await analysis_artifacts.aget(item_key)
+        if completion is not None:
+            record_completion(endpoint, completion)
+            return CompletionStream.replay(completion)
+    return await stream_chat_completion(api_key, **build_completion(), use_cache=True, bypass_cache=bypass_cache,
+                                  usage_label=endpoint)
+
+def set_cache_header(response: Response, completion):
+    """Report whether an analysis was served from the LLM response cache"""
+    if completion.cache_status:
+        response.headers["X-Cache"] = completion.cache_status
+
+def sse_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+def stream_analysis(stream, build_response, leading_events=()) -> StreamingResponse:
+    """
+    Forward completion deltas as server-sent events.
+    Each delta is a `token` event; the last event is `done` carrying the same JSON body
+    as the non-streaming endpoint (or `error` if the completion fails mid-stream).
+    leading_events are (event, data) pairs sent before the first token.
+    """
+    async def events():
+        for event, data in leading_events:
+            yield sse_event(event, data)
+        try:
+            async for delta in stream:
+                yield sse_event("token", json.dumps({"content": delta}))
+        except Exception as e:
+            yield sse_event("error", json.dumps({"detail": str(e)}))
+            return
+        yield sse_event("done", build_response(stream.result.content).model_dump_json())
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if stream.cache_status:
+        headers["X-Cache"] = stream.cache_status
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
 
 @app.get("/api/scenarios", response_model=ScenariosResponse)
-async def get_scenarios():
-    scenarios = get_fraud_scenarios()
-    return ScenariosResponse(scenarios=scenarios, total=len(scenarios))
+async def get_scenarios(request: Request):
+    return await run_in_threadpool(catalog.list_response, request, "scenarios")
+
+@app.get("/api/scenarios/{scenario_id}/geo-velocity", response_model=GeoVelocityResponse)
+async def get_scenario_geo_velocity(scenario_id: int):
+    """Haversine travel speed between a scenario's consecutive physical transactions"""
+    result = geo_velocity.scenario_geo_velocity(scenario_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    return result
 
-@app.post("/api/analyze-fraud", response_model=FraudAnalysisResponse)
-async def analyze_fraud(request: FraudAnalysisRequest):
-    api_key = require_openai_api_key()
+@app.post("/api/geo-velocity", response_model=GeoVelocityResponse)
+async def check_geo_velocity(request: GeoVelocityRequest):
+    """Flag impossible travel across submitted transactions (grouped by card_id, ordered by timestamp)"""
+    try:
+        return geo_velocity.analyze([t.model_dump() for t in request.transactions])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid timestamp: {e}")
+
+@app.post("/api/score-fraud", response_model=FraudScoreResponse)
+async def score_fraud(request: FraudScoreRequest):
+    """Deterministic local risk score (0-100) and rating for a catalog or inline scenario; no LLM call"""
+    if request.scenario is not None:
+        try:
+            return fraud_scoring.score(request.scenario.model_dump())
+        except ValueError as e:  # malformed timestamp or amount in the inline scenario
+            raise HTTPException(status_code=422, detail=f"Invalid scenario: {e}")
+    if request.scenario_id is None:
+        raise HTTPException(status_code=422, detail="Provide scenario_id or scenario")
+    result = fraud_scoring.score_catalog_scenario(request.scenario_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    return result
+
+@app.post("/api/score-transactions")
+async def score_transactions(request: Request, format: Optional[str] = None, min_score: int = 0):
+    """
+    Score an uploaded batch of transactions (CSV, NDJSON or Parquet request body; the format comes
+    from ?format= or the Content-Type). Features are computed over the whole batch, so the body is
+    read in full, chunk by chunk up to TRANSACTION_SCORING_MAX_BYTES (413 beyond). Parsing and
+    scoring run off the event loop; results stream back as NDJSON in input order, only those
+    scoring at least min_score, then a summary line.
+    """
+    fmt = format or transaction_scoring.format_for(request.headers.get("content-type"))
+    data = bytearray()
+    async for chunk in request.stream():
+        data += chunk
+        if len(data) > transaction_scoring.TRANSACTION_SCORING_MAX_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload larger than {transaction_scoring.TRANSACTION_SCORING_MAX_BYTES} bytes"
+            )
+    data = bytes(data)
+    started = time.perf_counter()
     
-    scenarios = get_fraud_scenarios()
+    def load_and_score():
+        batch = transaction_scoring.load(data, fmt)
+        return batch, transaction_scoring.score_batch(batch)
     
-    if request.scenario_id < 0 or request.scenario_id >= len(scenarios):
-        raise HTTPException(status_code=404, detail="Scenario not found")
+    try:
+        batch, scored = await run_in_threadpool(load_and_score)
+    except ImportError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except OverflowError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
-    scenario = scenarios[request.scenario_id]
+    return StreamingResponse(
+        transaction_scoring.iter_results(batch, scored, min_score, started),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/api/analyze-fraud", response_model=FraudAnalysisResponse)
+async def analyze_fraud(request: FraudAnalysisRequest, response: Response):
+    api_key = require_openai_api_key()
     
-    prompt = create_fraud_analysis_prompt(scenario, request.audience)
+    scenario = find_fraud_scenario(request.scenario_id)
+    local_score = fraud_scoring.score_catalog_scenario(request.scenario_id) if request.local_score else None
     
     try:
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a fraud analysis expert for Mastercard. Analyze transaction data and explain fraud risks clearly."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800
+        completion = await generate_analysis(
+            api_key,
+            "analyze-fraud",
+            fraud_artifact_key(request.scenario_id, request.audience, scored=request.local_score),
+            lambda: fraud_analysis_completion(scenario, request.audience, local_score=local_score),
+            request.bypass_cache
         )
+        set_cache_header(response, completion)
         
-        analysis = response.choices[0].message.content
+        analysis = completion.content
         
         return FraudAnalysisResponse(
             scenario=scenario,
             analysis=analysis,
-            audience=request.audience
+            audience=request.audience,
+            local_score=local_score
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
 
-def create_fraud_analysis_prompt(scenario: dict, audience: str) -> str:
-    audience_instructions = {
-        "Risk Analyst": "Provide a detailed technical analysis with specific fraud indicators, risk scores, and model reasoning. Use industry terminology.",
-        "Executive Summary": "Provide a concise, high-level summary focusing on business impact and key risk factors. Keep it brief and actionable.",
-        "Customer-friendly": "Explain in simple, non-technical language that a cardholder would understand. Be empathetic and clear."
-    }
+@app.post("/api/analyze-fraud/stream")
+async def analyze_fraud_stream(request: FraudAnalysisRequest):
+    """Stream a fraud analysis as server-sent events"""
+    api_key = require_openai_api_key()
     
-    instruction = audience_instructions.get(audience, audience_instructions["Risk Analyst"])
+    scenario = find_fraud_scenario(request.scenario_id)
+    local_score = fraud_scoring.score_catalog_scenario(request.scenario_id) if request.local_score else None
     
-    scenario_json = json.dumps(scenario, indent=2)
+    stream = await stream_analysis_completion(
+        api_key,
+        "analyze-fraud",
+        fraud_artifact_key(request.scenario_id, request.audience, scored=request.local_score),
+        lambda: fraud_analysis_completion(scenario, request.audience, local_score=local_score),
+        request.bypass_cache
+    )
+    return stream_analysis(stream, lambda analysis: FraudAnalysisResponse(
+        scenario=scenario,
+        analysis=analysis,
+        audience=request.audience,
+        local_score=local_score
+    ), leading_events=[("score", json.dumps(local_score))] if local_score else ())
+
+@app.post("/api/analyze-fraud/batch")
+async def analyze_fraud_batch(request: FraudBatchRequest):
+    """
+    Analyze every (scenario, audience) pair with bounded concurrency and a per-item timeout.
+    Streams NDJSON: a "result" line per item as soon as it finishes (failures included),
+    then a final "summary" line.
+    """
+    api_key = require_openai_api_key()
     
-    prompt = f"""Analyze this transaction that was flagged for potential fraud:
-
-{scenario_json}
-
-Audience: {audience}
-Instructions: {instruction}
-
-Please provide:
-1. A risk score assessment (Low/Medium/High/Critical)
-2. Key fraud indicators identified
-3. Explanation of why this transaction was flagged
-4. Recommended action
-
-Format your response appropriately for the {audience} audience."""
+    item_count = (len(request.scenario_ids) + len(request.scenarios)) * len(request.audiences)
+    if not item_count:
+        raise HTTPException(status_code=422, detail="Provide scenario_ids and/or scenarios, and at least one audience")
+    if item_count > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch has {item_count} items; the limit is {BATCH_MAX_ITEMS}")
+    
+    # Each distinct id is looked up once, off the event loop: ingested ids live in SQLite
+    catalog = await run_in_threadpool(
+        lambda: {scenario_id: get_fraud_scenario(scenario_id) for scenario_id in dict.fromkeys(request.scenario_ids)}
+    )
+    items = [
+        {"scenario_id": scenario_id, "scenario": catalog[scenario_id], "audience": audience, "inline": False}
+        for scenario_id in request.scenario_ids for audience in request.audiences
+    ] + [
+        {"scenario_id": scenario.id, "scenario": scenario.model_dump(), "audience": audience, "inline": True}
+        for scenario in request.scenarios for audience in request.audiences
+    ]
+    
+    async def analyze(item):
+        if item["scenario"] is None:
+            raise HTTPException(status_code=404, detail=f"Scenario {item['scenario_id']} not found")
+        if item["inline"]:
+            return await chat_completion(
+                api_key,
+                **fraud_analysis_completion(item["scenario"], item["audience"], catalog_scenario=False),
+                use_cache=True,
+                bypass_cache=request.bypass_cache,
+                usage_label="analyze-fraud"
+            )
+        return await generate_analysis(
+            api_key,
+            "analyze-fraud",
+            fraud_artifact_key(item["scenario_id"], item["audience"]),
+            lambda: fraud_analysis_completion(item["scenario"], item["audience"]),
+            request.bypass_cache
+        )
+    
+    jobs = [partial(analyze, item) for item in items]
+    concurrency = request.concurrency or BATCH_CONCURRENCY
+    timeout = request.timeout_seconds or BATCH_ITEM_TIMEOUT
     
-    return prompt
+    async def lines():
+        started = time.perf_counter()
+        succeeded = 0
+        async for outcome in run_bounded(jobs, concurrency, timeout):
+            item = items[outcome.index]
+            line = {
+                "type": "result",
+                "index": outcome.index,
+                "scenario_id": item["scenario_id"],
+                "audience": item["audience"],
+                "elapsed_ms": outcome.elapsed_ms
+            }
+            if outcome.ok:
+                succeeded += 1
+                line.update(status="ok", analysis=outcome.result.content, cache=outcome.result.cache_status)
+            else:
+                error = outcome.error
+                line.update(
+                    status="error",
+                    status_code=getattr(error, "status_code", 504 if isinstance(error, TimeoutError) else 500),
+                    error=getattr(error, "detail", None) or str(error)
+                )
+            yield json.dumps(line) + "\n"
+        yield json.dumps({
+            "type": "summary",
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def find_fraud_scenario(scenario_id: int) -> dict:
+    scenario = get_fraud_scenario(scenario_id)
+    if scenario is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    return scenario
+
+@app.post("/api/ingest/{dataset}", response_model=IngestResponse)
+async def ingest_records(dataset: str, request: Request):
+    """
+    Load NDJSON records (scenarios, customers or disputes) from a streamed request body into the
+    record store. Valid lines are committed in batches; invalid lines are counted and reported
+    without failing the upload.
+    """
+    if dataset not in ingest.DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset; use one of {', '.join(ingest.DATASETS)}")
+    try:
+        return await ingest.ingest_stream(dataset, request.stream())
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Record store unavailable: {e}")
 
 @app.get("/", response_model=RootResponse)
 async def root():
@@ -152,20 +414,20 @@ async def test_connection():
     api_key = require_openai_api_key()
     
     try:
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        completion = await chat_completion(
+            api_key,
             messages=[
                 {"role": "user", "content": "Say 'Connection successful!' if you can read this."}
             ],
-            max_tokens=50
+            max_tokens=50,
+            usage_label="test-connection"
         )
         
         return TestConnectionResponse(
             success=True,
             message="API connection successful",
-            response=response.choices[0].message.content,
-            model=response.model
+            response=completion.content,
+            model=completion.model
         )
     except Exception as e:
         return TestConnectionResponse(
@@ -174,6 +436,29 @@ async def test_connection():
             error=str(e)
         )
 
+@app.get("/api/llm/pool-metrics", response_model=LLMPoolMetricsResponse)
+async def llm_pool_metrics():
+    """Connection pool usage for this worker's LLM client"""
+    return LLMPoolMetricsResponse(**llm_gateway.get_pool_metrics())
+
+@app.get("/api/token-usage", response_model=TokenUsageResponse)
+async def token_usage():
+    """Per-endpoint prompt budgets, local token estimates and API-reported token usage for this worker"""
+    return TokenUsageResponse(**get_token_usage())
+
+@app.get("/api/analysis-artifacts", response_model=AnalysisArtifactsResponse)
+async def get_analysis_artifacts():
+    """Coverage of the precomputed analysis artifacts for the current dataset and prompt version"""
+    from warmup import analysis_jobs
+    expected = {item_key for item_key, _ in analysis_jobs()}
+    available = (await run_in_threadpool(analysis_artifacts.keys)) & expected
+    return AnalysisArtifactsResponse(
+        version=analysis_artifacts.version,
+        template_version=analysis_artifacts.template_version,
+        available=len(available),
+        total=len(expected)
+    )
+
 @app.post("/api/test-prompt", response_model=TestPromptResponse)
 async def test_prompt(request: TestPromptRequest):
     api_key = require_openai_api_key()
@@ -181,44 +466,55 @@ async def test_prompt(request: TestPromptRequest):
     prompt = request.prompt
     
     try:
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
+        completion_args = prompt_budget.fit("test-prompt", None, prompt, lambda prompt: {
+            "messages": [
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=500
-        )
+            "max_tokens": 500
+        })
+        completion = await chat_completion(api_key, **completion_args, usage_label="test-prompt")
         
         return TestPromptResponse(
             success=True,
-            response=response.choices[0].message.content,
-            model=response.model,
-            usage={
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens
-            }
+            response=completion.content,
+            model=completion.model,
+            usage=completion.usage
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/merchants", response_model=MerchantListResponse)
-async def get_merchants():
+async def get_merchants(request: Request):
     """Get list of all merchant personas"""
-    merchants = get_all_merchants()
-    return MerchantListResponse(merchants=merchants)
+    return catalog.list_response(request, "merchants")
 
-@app.get("/api/merchants/{merchant_id}")
-async def get_merchant(merchant_id: str):
+@app.get("/api/merchants/{merchant_id}", response_model=MerchantDetail)
+async def get_merchant(merchant_id: str, request: Request):
     """Get full merchant data including 12 months of KPIs"""
-    merchant = get_merchant_data(merchant_id)
-    if not merchant:
+    return catalog.item_response(request, "merchants", merchant_id, "Merchant not found")
+
+@app.get("/api/merchants/{merchant_id}/stats", response_model=MerchantStatsResponse)
+async def get_merchant_stats(merchant_id: str, window: int = 3):
+    """Growth rates, z-scores, rolling windows and metric correlations from the columnar KPI store"""
+    if window < 1:
+        raise HTTPException(status_code=422, detail="window must be at least 1")
+    stats = merchant_stats(merchant_id, window)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Merchant not found")
+    return MerchantStatsResponse(**stats)
+
+@app.get("/api/merchants/{merchant_id}/anomalies", response_model=MerchantAnomaliesResponse)
+async def get_merchant_anomalies(merchant_id: str):
+    """Ranked KPI anomalies (robust z-score, trend residual and changepoint findings)"""
+    anomalies = merchant_anomalies(merchant_id)
+    if anomalies is None:
         raise HTTPException(status_code=404, detail="Merchant not found")
-    return merchant
+    return MerchantAnomaliesResponse(**anomalies)
 
 @app.post("/api/generate-merchant-narrative", response_model=MerchantNarrativeResponse)
-async def generate_merchant_narrative(request: MerchantNarrativeRequest):
+async def generate_merchant_narrative(request: MerchantNarrativeRequest, response: Response):
     """Generate AI narrative report for a merchant"""
     api_key = require_openai_api_key()
     
@@ -229,85 +525,68 @@ async def generate_merchant_narrative(request: MerchantNarrativeRequest):
         raise HTTPException(status_code=404, detail="Merchant not found")
     
     try:
-        # Build the prompt with merchant data
-        prompt = build_merchant_narrative_prompt(merchant)
-        
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a Senior Strategic Fintech Consultant acting as a Virtual CFO."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000,
-            temperature=0.7
+        completion = await generate_analysis(
+            api_key,
+            "merchant-narrative",
+            merchant_artifact_key(merchant_id),
+            lambda: merchant_narrative_completion(merchant_id, merchant),
+            request.bypass_cache
         )
+        set_cache_header(response, completion)
         
-        narrative = response.choices[0].message.content
+        narrative = completion.content
         
         return MerchantNarrativeResponse(
             success=True,
             narrative=narrative,
             merchant_name=merchant["name"]
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def build_merchant_narrative_prompt(merchant):
-    """Build the master prompt for merchant narrative generation"""
-    
-    # Convert monthly data to JSON string
-    monthly_data_json = json.dumps(merchant["monthly_data"], indent=2)
+@app.post("/api/generate-merchant-narrative/stream")
+async def generate_merchant_narrative_stream(request: MerchantNarrativeRequest):
+    """Stream a merchant narrative as server-sent events"""
+    api_key = require_openai_api_key()
     
-    prompt = f"""You are provided with a JSON dataset containing 12 months of KPI data for a specific merchant. Your task is to act as their 'Virtual CFO' and generate a highly structured, actionable 'Merchant Growth & Health Narrative.'
-
-**Merchant Profile:**
-- Name: {merchant["name"]}
-- Business Type: {merchant["business_type"]}
-- Location: {merchant["location"]}
-- Known Business Challenge: {merchant["problem_statement"]}
-
-**12-Month KPI Data:**
-{monthly_data_json}
-
-**Your Task:**
-Generate a comprehensive strategic report with the following sections:
-
-1. **Executive Scorecard**: A 2-sentence summary of the business's current state (e.g., 'Scaling Rapidly,' 'Efficiency Recovery Phase,' or 'Churn Risk Alert').
-
-2. **The "Why" Behind the Numbers**: Explain one non-obvious correlation in the data (e.g., how a change in Average Ticket Size relates to transaction volume, or how Saturday revenue patterns affect overall performance).
-
-3. **Anomaly Detection**: Identify the most significant outlier in the last 90 days (last 3 months of data) and hypothesize a business reason for it (e.g., a sudden spike in chargebacks, terminal latency issues, or seasonal patterns).
-
-4. **Strategic Roadmap**: Provide 3 hyper-specific, actionable recommendations. Do NOT use generic advice like 'increase sales.' Instead, use the data to suggest concrete actions like:
-   - "Implement a tiered loyalty program to capture the top 10% of high-frequency shoppers"
-   - "Address terminal latency during peak hours to reduce walk-away losses"
-   - "Investigate the correlation between refund rates and product descriptions"
-
-5. **Risk Assessment**: Flag any brewing issues in Chargeback rates, Refund rates, Terminal Downtime, or Customer Retention that require immediate attention.
-
-**Tone**: Professional, encouraging, and data-driven. Avoid fluff. Be specific and reference actual numbers from the data.
-
-Format your response with clear section headers using **bold** for section titles."""
+    merchant = get_merchant_data(request.merchant_id)
+    if not merchant:
+        raise HTTPException(status_code=404, detail="Merchant not found")
     
-    return prompt
+    stream = await stream_analysis_completion(
+        api_key,
+        "merchant-narrative",
+        merchant_artifact_key(request.merchant_id),
+        lambda: merchant_narrative_completion(request.merchant_id, merchant),
+        request.bypass_cache
+    )
+    return stream_analysis(stream, lambda narrative: MerchantNarrativeResponse(
+        success=True,
+        narrative=narrative,
+        merchant_name=merchant["name"]
+    ))
 
 @app.get("/api/customers", response_model=CustomerListResponse)
-async def get_customers():
+async def get_customers(request: Request):
     """Get list of all customer profiles"""
-    customers = get_all_customers()
+    return await run_in_threadpool(catalog.list_response, request, "customers")
+
+@app.get("/api/customers/search", response_model=CustomerListResponse)
+async def search_customers(card_type: Optional[str] = None, location: Optional[str] = None,
+                           credit_score_band: Optional[str] = None):
+    """Filter customers by card type, location and/or credit score band using the repository indexes"""
+    customers = find_customers(card_type=card_type, location=location, credit_score_band=credit_score_band)
     return CustomerListResponse(customers=customers)
 
-@app.get("/api/customers/{customer_id}")
-async def get_customer(customer_id: str):
+@app.get("/api/customers/{customer_id}", response_model=CustomerDetail)
+async def get_customer(customer_id: str, request: Request):
     """Get full customer profile"""
-    customer = get_customer_profile(customer_id)
-    if not customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
-    return customer
+    return await run_in_threadpool(catalog.item_response, request, "customers", customer_id, "Customer not found")
 
 @app.post("/api/analyze-customer-upgrade", response_model=CustomerUpgradeResponse)
-async def analyze_customer_upgrade(request: CustomerUpgradeRequest):
+async def analyze_customer_upgrade(request: CustomerUpgradeRequest, response: Response):
     """Generate AI upgrade recommendations for a customer"""
     api_key = require_openai_api_key()
     
@@ -320,20 +599,16 @@ async def analyze_customer_upgrade(request: CustomerUpgradeRequest):
         raise HTTPException(status_code=404, detail="Customer not found")
     
     try:
-        prompt = build_customer_upgrade_prompt(customer, output_mode, format_mode)
-        
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are Mastercard AI – Internal Product Strategy Assistant. You analyze credit card customers to identify upgrade opportunities that increase revenue, retention, and cardholder satisfaction."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1500,
-            temperature=0.7
+        completion = await generate_analysis(
+            api_key,
+            "customer-upgrade",
+            customer_artifact_key(customer_id, output_mode, format_mode),
+            lambda: customer_upgrade_completion(customer, output_mode, format_mode),
+            request.bypass_cache
         )
+        set_cache_header(response, completion)
         
-        recommendation = response.choices[0].message.content
+        recommendation = completion.content
         
         return CustomerUpgradeResponse(
             success=True,
@@ -342,89 +617,54 @@ async def analyze_customer_upgrade(request: CustomerUpgradeRequest):
             output_mode=output_mode,
             format_mode=format_mode
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def build_customer_upgrade_prompt(customer, output_mode, format_mode):
-    """Build the prompt for customer upgrade recommendations"""
-    
-    customer_json = json.dumps(customer, indent=2)
+@app.post("/api/analyze-customer-upgrade/stream")
+async def analyze_customer_upgrade_stream(request: CustomerUpgradeRequest):
+    """Stream customer upgrade recommendations as server-sent events"""
+    api_key = require_openai_api_key()
     
-    prompt = f"""SYSTEM:
-You are Mastercard AI – Internal Product Strategy Assistant.
-You analyze fictitious credit card customers to identify upgrade opportunities that increase revenue, retention, and cardholder satisfaction.
-You NEVER reference Mastercard confidential data. All examples are generic / public-safe.
-Respond using professional, concise wording suitable for an internal Mastercard strategy review.
-
-USER INPUT:
-CUSTOMER_PROFILE:
-{customer_json}
-
-OUTPUT_MODE: "{output_mode}"
-FORMAT: "{format_mode}"
-
-TASK:
-Based on CUSTOMER_PROFILE, determine:
-
-1. Their spending patterns
-2. Their probable financial behavior
-3. Which upgrade(s) would fit:
-   - Premium card tier (cashback, travel rewards, concierge)
-   - Fraud-protection or subscription-management add-ons
-   - Credit limit increase or BNPL offers
-4. Why the upgrade makes sense (business justification + customer value)
-5. A 1-to-3 sentence pitch that could be emailed or shown in-app (OPTIONAL, only if OUTPUT_MODE is "Customer-friendly")
-
-"""
-
-    if format_mode == "JSON":
-        prompt += """
-Please provide your response in the following JSON structure:
-{{
-  "recommended_upgrades": [
-    {{
-      "offer": "Upgrade name",
-      "reasoning": "Why this fits the customer's behavior",
-      "business_value": "Revenue/retention impact for Mastercard",
-      "customer_value_statement": "Customer-facing benefit statement"
-    }}
-  ]
-}}
-"""
-    else:
-        prompt += """
-Please provide a narrative response with clear sections:
-- **Spending Analysis**
-- **Recommended Upgrades**
-- **Business Justification**
-- **Customer Pitch** (if Customer-friendly mode)
-"""
-
-    if output_mode == "Executive":
-        prompt += "\nTone: Concise, strategic, business-focused. Highlight ROI and retention metrics."
-    elif output_mode == "Analyst":
-        prompt += "\nTone: Detailed, data-driven, analytical. Include specific numbers and behavioral patterns."
-    elif output_mode == "Customer-friendly":
-        prompt += "\nTone: Warm, benefit-focused, easy to understand. Emphasize value to the customer."
+    customer = get_customer_profile(request.customer_id)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
     
-    return prompt
+    stream = await stream_analysis_completion(
+        api_key,
+        "customer-upgrade",
+        customer_artifact_key(request.customer_id, request.output_mode, request.format_mode),
+        lambda: customer_upgrade_completion(customer, request.output_mode, request.format_mode),
+        request.bypass_cache
+    )
+    return stream_analysis(stream, lambda recommendation: CustomerUpgradeResponse(
+        success=True,
+        customer_name=customer["name"],
+        recommendation=recommendation,
+        output_mode=request.output_mode,
+        format_mode=request.format_mode
+    ))
 
 @app.get("/api/disputes", response_model=DisputeListResponse)
-async def get_disputes():
+async def get_disputes(request: Request):
     """Get list of all dispute cases"""
-    disputes = get_all_disputes()
+    return await run_in_threadpool(catalog.list_response, request, "disputes")
+
+@app.get("/api/disputes/search", response_model=DisputeListResponse)
+async def search_disputes(customer_claim: Optional[str] = None, status: Optional[str] = None,
+                          transaction_date: Optional[str] = None):
+    """Filter dispute cases by claim type, status and/or transaction date using the repository indexes"""
+    disputes = find_disputes(customer_claim=customer_claim, status=status, transaction_date=transaction_date)
     return DisputeListResponse(disputes=disputes)
 
-@app.get("/api/disputes/{case_id}")
-async def get_dispute(case_id: str):
+@app.get("/api/disputes/{case_id}", response_model=DisputeDetail)
+async def get_dispute(case_id: str, request: Request):
     """Get full dispute case details"""
-    dispute = get_dispute_case(case_id)
-    if not dispute:
-        raise HTTPException(status_code=404, detail="Dispute case not found")
-    return dispute
+    return await run_in_threadpool(catalog.item_response, request, "disputes", case_id, "Dispute case not found")
 
 @app.post("/api/analyze-dispute", response_model=DisputeAnalysisResponse)
-async def analyze_dispute(request: DisputeAnalysisRequest):
+async def analyze_dispute(request: DisputeAnalysisRequest, response: Response):
     """Run forensic analysis on a dispute case to detect first-party fraud"""
     api_key = require_openai_api_key()
     
@@ -435,86 +675,74 @@ async def analyze_dispute(request: DisputeAnalysisRequest):
         raise HTTPException(status_code=404, detail="Dispute case not found")
     
     try:
-        prompt = build_dispute_analysis_prompt(dispute)
-        
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are the 'Mastercard First-Party Trust AI,' a specialized forensic agent designed to identify 'Friendly Fraud' (First-Party Misuse). Your goal is to analyze transaction disputes by cross-referencing customer claims against merchant telemetry and carrier evidence."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1500,
-            temperature=0.7
+        completion = await generate_analysis(
+            api_key,
+            "analyze-dispute",
+            dispute_artifact_key(case_id),
+            lambda: dispute_analysis_completion(dispute),
+            request.bypass_cache
         )
+        set_cache_header(response, completion)
         
-        analysis = response.choices[0].message.content
+        analysis = completion.content
         
         return DisputeAnalysisResponse(
             success=True,
             case_id=case_id,
             analysis=analysis
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def build_dispute_analysis_prompt(dispute):
-    """Build the forensic analysis prompt for dispute investigation"""
-    
-    dispute_json = json.dumps(dispute, indent=2)
+@app.post("/api/jobs", response_model=JobResponse, status_code=202)
+async def create_job(request: DisputeTriageJobRequest):
+    """
+    Queue a dispute triage job over the cases matching the filter (all cases if none is given).
+    Items are processed by `python jobs.py worker`, not by the API workers; poll /api/jobs/{job_id}.
+    """
+    job_id = await run_in_threadpool(
+        submit_dispute_triage,
+        job_queue,
+        customer_claim=request.customer_claim,
+        status=request.status,
+        transaction_date=request.transaction_date,
+        bypass_cache=request.bypass_cache
+    )
+    if job_id is None:
+        raise HTTPException(status_code=404, detail="No dispute cases match the filter")
+    return await run_in_threadpool(job_queue.get, job_id, include_items=False)
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, include_items: bool = False):
+    """Progress of a queued job; include_items adds each item's analysis or error once it is done"""
+    job = await run_in_threadpool(job_queue.get, job_id, include_items)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/analyze-dispute/stream")
+async def analyze_dispute_stream(request: DisputeAnalysisRequest):
+    """Stream a dispute forensic analysis as server-sent events"""
+    api_key = require_openai_api_key()
     
-    prompt = f"""You are analyzing a chargeback dispute to determine if it is legitimate or 'Friendly Fraud' (first-party misuse).
-
-DISPUTE CASE:
-{dispute_json}
-
-INSTRUCTIONS:
-
-1. **Analyze Inconsistencies**: Compare the 'Customer Dispute Reason' against the 'Merchant Evidence Bundle.' Look for contradictions, impossible claims, or suspicious patterns.
-
-2. **Assign a Trust Score** (0-100):
-   - 0-20: High-confidence fraud (customer is lying)
-   - 21-40: Likely fraud (strong evidence against customer)
-   - 41-60: Uncertain (conflicting evidence)
-   - 61-80: Likely legitimate (customer claim seems valid)
-   - 81-100: High-confidence legitimate (strong evidence supports customer)
-
-3. **Draft an Evidence Summary**: Write a concise, professional summary to be sent to the issuing bank. This should be objective and evidence-based.
-
-4. **Highlight Smoking Guns**: Explicitly point out specific data points that prove or disprove the customer's claim. Examples:
-   - GPS coordinates matching home address
-   - Signature matching cardholder name
-   - Device activation logs
-   - Social media posts
-   - Usage patterns
-   - Access logs
-
-5. **Provide a Recommendation**: 
-   - "Deny Chargeback" (if fraud detected)
-   - "Approve Chargeback" (if legitimate)
-   - "Request Additional Evidence" (if uncertain)
-
-**TONE**: Objective, evidence-based, and authoritative. Act like a forensic investigator presenting findings to a judge.
-
-**FORMAT YOUR RESPONSE AS**:
-
-**AI Dispute Analysis: [CASE_ID]**
-**Trust Score**: [0-100]/100 ([Risk Level])
-
-**Evidence Summary**:
-[Your analysis of what the evidence shows]
-
-**Key Inconsistencies** (or **Supporting Evidence** if legitimate):
-[Bullet points of specific contradictions or confirmations]
-
-**Smoking Gun Evidence**:
-[The most damning or exonerating piece of evidence]
-
-**Recommendation**:
-[Your final recommendation with brief justification]
-"""
+    dispute = get_dispute_case(request.case_id)
+    if not dispute:
+        raise HTTPException(status_code=404, detail="Dispute case not found")
     
-    return prompt
+    stream = await stream_analysis_completion(
+        api_key,
+        "analyze-dispute",
+        dispute_artifact_key(request.case_id),
+        lambda: dispute_analysis_completion(dispute),
+        request.bypass_cache
+    )
+    return stream_analysis(stream, lambda analysis: DisputeAnalysisResponse(
+        success=True,
+        case_id=request.case_id,
+        analysis=analysis
+    ))
 
 
 # Virtual Agent Endpoints
@@ -531,6 +759,18 @@ def authenticate_virtual_agent(request: AuthenticationRequest):
 
 
 @app.post("/api/virtual-agent/chat", response_model=VirtualAgentChatResponse)
-def virtual_agent_chat(request: VirtualAgentChatRequest):
+async def virtual_agent_chat(request: VirtualAgentChatRequest):
     """Process chat message with sentiment detection and intent recognition"""
-    return process_chat(request)
+    return await process_chat(request)
+
+
+@app.get("/api/virtual-agent/sessions/{session_id}", response_model=ChatSessionResponse)
+async def get_virtual_agent_session(session_id: str):
+    """Server-side conversation state: recent turns, off-topic count and sentiment trajectory"""
+    return await get_session(session_id)
+
+
+@app.get("/api/virtual-agent/fast-path", response_model=FastPathMetricsResponse)
+def get_virtual_agent_fast_path():
+    """How many chat turns this worker answered from templates instead of a completion, per intent"""
+    return FastPathMetricsResponse(**response_templates.get_fast_path_metrics())
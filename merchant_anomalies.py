@@ -0,0 +1,236 @@
+"""
+Deterministic anomaly detection over the merchant KPI series
+Three detectors run over the columnar store from merchant_stats:
+  - robust z-score (median / MAD) on the raw values
+  - seasonal decomposition (moving-average trend + per-period seasonal means); the residual is
+    scored with the same robust z-score, so a point that breaks the trend is caught even when its
+    raw value is ordinary
+  - changepoint detection: the single best mean-shift split of each series
+Findings are ranked by score per metric and across metrics, and computed once per merchant.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import merchant_stats
+from merchant_stats import METRICS, MerchantKPIStore
+
+OUTLIER_THRESHOLD = 3.5      # Iglewicz-Hoaglin cut-off for modified z-scores
+CHANGEPOINT_THRESHOLD = 3.0  # t-statistic of the mean shift
+SEASONAL_PERIOD = 12
+RECENT_MONTHS = 3            # "last 90 days"
+RESIDUAL_NOISE_FLOOR = 0.02  # residuals under ~2% of the typical level are treated as noise
+MIN_SEGMENT = 3
+
+# MAD of a normal sample is 0.6745 sigma; mean absolute deviation is 0.7979 sigma
+_MAD_SCALE = 0.6745
+_MEAN_AD_SCALE = 0.7979
+
+
+def robust_z_scores(values: np.ndarray, min_scale=0.0) -> np.ndarray:
+    """
+    Modified z-scores along the month axis; falls back to mean absolute deviation when MAD is 0.
+    min_scale floors the robust sigma so near-constant series don't turn rounding noise into outliers.
+    """
+    median = np.median(values, axis=-2, keepdims=True)
+    deviation = np.abs(values - median)
+    mad = np.median(deviation, axis=-2, keepdims=True)
+    mean_ad = np.mean(deviation, axis=-2, keepdims=True)
+    sigma = np.where(mad > 0, mad / _MAD_SCALE, mean_ad / _MEAN_AD_SCALE)
+    sigma = np.maximum(sigma, min_scale)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = (values - median) / sigma
+    return np.nan_to_num(scores, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def decompose(values: np.ndarray, period: int = SEASONAL_PERIOD):
+    """
+    Split (month, metric) values into trend, seasonal and residual components.
+    The seasonal term needs two full periods; shorter series get a 3-month trend and no seasonal term.
+    """
+    months = values.shape[-2]
+    seasonal_ready = months >= 2 * period
+    trend = _centered_mean(values, period if seasonal_ready else 3)
+    detrended = values - trend
+    seasonal = np.zeros_like(values)
+    if seasonal_ready:
+        phase = np.arange(months) % period
+        for p in range(period):
+            seasonal[..., phase == p, :] = detrended[..., phase == p, :].mean(axis=-2, keepdims=True)
+        seasonal -= seasonal[..., :period, :].mean(axis=-2, keepdims=True)
+    return trend, seasonal, detrended - seasonal
+
+
+def changepoints(values: np.ndarray, min_segment: int = MIN_SEGMENT):
+    """
+    Best single mean-shift split per metric via cumulative sums.
+    Returns (split index, t-statistic, mean before, mean after), one entry per metric;
+    index -1 when the series is too short to split.
+    """
+    months = values.shape[-2]
+    metrics = values.shape[-1]
+    if months < 2 * min_segment:
+        empty = np.zeros(metrics)
+        return np.full(metrics, -1), empty, empty, empty
+
+    splits = np.arange(min_segment, months - min_segment + 1)
+    cumulative = np.cumsum(values, axis=-2)
+    cumulative_squares = np.cumsum(values * values, axis=-2)
+    total, total_squares = cumulative[-1], cumulative_squares[-1]
+
+    left_n = splits[:, None].astype(float)
+    right_n = months - left_n
+    left_sum = cumulative[splits - 1]
+    right_sum = total - left_sum
+    left_mean, right_mean = left_sum / left_n, right_sum / right_n
+    left_ss = cumulative_squares[splits - 1] - left_n * left_mean ** 2
+    right_ss = (total_squares - cumulative_squares[splits - 1]) - right_n * right_mean ** 2
+    pooled = np.sqrt(np.maximum(left_ss + right_ss, 0.0) / (months - 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        statistic = np.abs(left_mean - right_mean) / pooled * np.sqrt(left_n * right_n / months)
+    statistic = np.nan_to_num(statistic, nan=0.0, posinf=0.0)
+
+    best = np.argmax(statistic, axis=0)
+    columns = np.arange(metrics)
+    return splits[best], statistic[best, columns], left_mean[best, columns], right_mean[best, columns]
+
+
+def _centered_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Centered moving average; the edges extend the slope of the nearest full windows"""
+    months = values.shape[-2]
+    if months < window:
+        return np.repeat(values.mean(axis=-2, keepdims=True), months, axis=-2)
+    zeros = np.zeros(values[..., :1, :].shape)
+    cumulative = np.concatenate([zeros, np.cumsum(values, axis=-2)], axis=-2)
+    inner = (cumulative[..., window:, :] - cumulative[..., :-window, :]) / window
+    lead = (window - 1) // 2
+    trail = months - inner.shape[-2] - lead
+    if inner.shape[-2] < 2:
+        return np.repeat(inner, months, axis=-2)
+    head_slope = inner[..., 1:2, :] - inner[..., :1, :]
+    tail_slope = inner[..., -1:, :] - inner[..., -2:-1, :]
+    head = inner[..., :1, :] - head_slope * np.arange(lead, 0, -1)[:, None]
+    tail = inner[..., -1:, :] + tail_slope * np.arange(1, trail + 1)[:, None]
+    return np.concatenate([head, inner, tail], axis=-2)
+
+
+def _round(value, digits: int = 4) -> float:
+    return round(float(value), digits)
+
+
+def detect(series: np.ndarray, months: List[str]) -> dict:
+    """Ranked findings for one merchant's (month, metric) block"""
+    count = len(months)
+    raw_z = robust_z_scores(series)
+    _, _, residual = decompose(series)
+    median = np.median(series, axis=0)
+    residual_z = robust_z_scores(residual, RESIDUAL_NOISE_FLOOR * np.abs(median))
+    split, shift_score, before, after = changepoints(series)
+
+    by_metric = {}
+    for k, metric in enumerate(METRICS):
+        findings = []
+        for t in range(count):
+            score = max(abs(raw_z[t, k]), abs(residual_z[t, k]))
+            if score < OUTLIER_THRESHOLD:
+                continue
+            findings.append({
+                "metric": metric,
+                "kind": "outlier",
+                "month": months[t],
+                "value": _round(series[t, k]),
+                "baseline": _round(median[k]),
+                "robust_z": _round(raw_z[t, k], 2),
+                "residual_z": _round(residual_z[t, k], 2),
+                "score": _round(score, 2),
+                "recent": t >= count - RECENT_MONTHS
+            })
+        if split[k] >= 0 and shift_score[k] >= CHANGEPOINT_THRESHOLD:
+            t = int(split[k])
+            findings.append({
+                "metric": metric,
+                "kind": "changepoint",
+                "month": months[t],
+                "value": _round(after[k]),
+                "baseline": _round(before[k]),
+                "shift_pct": _round((after[k] - before[k]) / abs(before[k]) * 100, 2) if before[k] else None,
+                "score": _round(shift_score[k], 2),
+                "recent": t >= count - RECENT_MONTHS
+            })
+        findings.sort(key=lambda finding: finding["score"], reverse=True)
+        by_metric[metric] = findings
+
+    ranked = sorted((f for findings in by_metric.values() for f in findings),
+                    key=lambda finding: finding["score"], reverse=True)
+    return {"months": months, "by_metric": by_metric, "findings": ranked}
+
+
+_anomalies: Dict[str, dict] = {}
+
+
+def build(store: Optional[MerchantKPIStore] = None):
+    """Precompute findings for every merchant in the store (the shared KPI store by default)"""
+    store = store or merchant_stats.MERCHANT_KPIS
+    _anomalies.clear()
+    for i, merchant_id in enumerate(store.merchant_ids):
+        _anomalies[merchant_id] = detect(store.series(merchant_id), store.months[i])
+
+
+def merchant_anomalies(merchant_id: str) -> Optional[dict]:
+    """Precomputed findings for one merchant; None if the merchant is unknown"""
+    if not _anomalies:
+        build()
+    result = _anomalies.get(merchant_id)
+    if result is None:
+        return None
+    return {
+        "merchant_id": merchant_id,
+        "outlier_threshold": OUTLIER_THRESHOLD,
+        "changepoint_threshold": CHANGEPOINT_THRESHOLD,
+        **result
+    }
+
+
+def _number(value) -> str:
+    return f"{value:,.2f}".rstrip("0").rstrip(".")
+
+
+def describe(finding: dict) -> str:
+    """One-line, exact-number description of a finding for prompts"""
+    recent = ", last 90 days" if finding["recent"] else ""
+    if finding["kind"] == "changepoint":
+        shift = f"{finding['shift_pct']:+.1f}%, " if finding["shift_pct"] is not None else ""
+        return (f"{finding['metric']}: level shift from {finding['month']}, mean {_number(finding['baseline'])} -> "
+                f"{_number(finding['value'])} ({shift}score {finding['score']}{recent})")
+    return (f"{finding['metric']} in {finding['month']}: {_number(finding['value'])} vs median "
+            f"{_number(finding['baseline'])} (score {finding['score']}{recent})")
+
+
+def prompt_facts(merchant_id: str, max_findings: int = 8) -> str:
+    """Summary statistics, strongest correlations and ranked anomalies as compact prompt text"""
+    summary = merchant_stats.metric_summary(merchant_id) or {}
+    lines = ["Metric summary (first -> latest, change, range, mean, last 3 months):"]
+    for metric, stats in summary.items():
+        change = f"{stats['change_pct']:+.1f}%" if stats["change_pct"] is not None else "n/a"
+        recent = " / ".join(_number(value) for value in stats["recent"])
+        lines.append(
+            f"- {metric}: {_number(stats['first'])} -> {_number(stats['latest'])} ({change}); "
+            f"min {_number(stats['min'])} ({stats['min_month']}), max {_number(stats['max'])} ({stats['max_month']}); "
+            f"mean {_number(stats['mean'])}; last 3: {recent}"
+        )
+
+    pairs = merchant_stats.top_correlations(merchant_id)
+    lines.append("")
+    lines.append("Strongest metric correlations (Pearson r):")
+    lines.extend(f"- {a} vs {b}: {r:+.2f}" for a, b, r in pairs)
+    if not pairs:
+        lines.append("- none above 0.5")
+
+    findings = (merchant_anomalies(merchant_id) or {}).get("findings", [])[:max_findings]
+    lines.append("")
+    lines.append("Detected anomalies, ranked by score:")
+    lines.extend(f"- {describe(finding)}" for finding in findings)
+    if not findings:
+        lines.append("- none above threshold")
+    return "\n".join(lines)
@@ -0,0 +1,191 @@
+"""
+Columnar merchant KPI store
+Monthly KPIs are held in one float array shaped (merchant, month, metric) instead of lists of
+per-month dicts. Growth, z-scores, rolling windows and correlations are computed with array
+operations across every merchant at once; merchants with fewer months are NaN-padded.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from merchant_data import MERCHANTS
+
+METRICS = (
+    "revenue",
+    "transaction_count",
+    "avg_ticket_size",
+    "chargeback_rate",
+    "refund_rate",
+    "saturday_revenue_pct",
+    "repeat_customer_rate",
+    "active_logins",
+    "terminal_latency_ms",
+)
+
+
+class MerchantKPIStore:
+    def __init__(self, merchant_ids: List[str], months: List[List[str]], values: np.ndarray):
+        """values is (merchant, month, metric) in METRICS order, NaN where a merchant has no month"""
+        self.merchant_ids = list(merchant_ids)
+        self.months = months
+        self.values = values
+        self._index = {merchant_id: i for i, merchant_id in enumerate(self.merchant_ids)}
+
+    @classmethod
+    def from_merchants(cls, merchants: Dict[str, dict]) -> "MerchantKPIStore":
+        merchant_ids = list(merchants)
+        months = [[month["month"] for month in merchants[m]["monthly_data"]] for m in merchant_ids]
+        width = max((len(labels) for labels in months), default=0)
+        values = np.full((len(merchant_ids), width, len(METRICS)), np.nan)
+        for i, merchant_id in enumerate(merchant_ids):
+            rows = merchants[merchant_id]["monthly_data"]
+            if rows:
+                values[i, :len(rows)] = [[row.get(metric, np.nan) for metric in METRICS] for row in rows]
+        return cls(merchant_ids, months, values)
+
+    def __contains__(self, merchant_id) -> bool:
+        return merchant_id in self._index
+
+    def series(self, merchant_id: str) -> np.ndarray:
+        """(month, metric) block for one merchant, trimmed to its own months"""
+        i = self._index[merchant_id]
+        return self.values[i, :len(self.months[i])]
+
+
+def growth_rates(values: np.ndarray) -> np.ndarray:
+    """Month-over-month change in percent along the month axis; the first month is NaN"""
+    previous = values[..., :-1, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (values[..., 1:, :] - previous) / np.abs(previous) * 100
+    change[~np.isfinite(change)] = np.nan
+    pad = np.full(values[..., :1, :].shape, np.nan)
+    return np.concatenate([pad, change], axis=-2)
+
+
+def period_growth(values: np.ndarray) -> np.ndarray:
+    """Percent change from the first to the last month of each series"""
+    first = values[..., 0, :]
+    last = _last_valid(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (last - first) / np.abs(first) * 100
+    change[~np.isfinite(change)] = np.nan
+    return change
+
+
+def z_scores(values: np.ndarray) -> np.ndarray:
+    """Each month's distance from the series mean in standard deviations"""
+    mean = np.nanmean(values, axis=-2, keepdims=True)
+    std = np.nanstd(values, axis=-2, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = (values - mean) / std
+    scores[~np.isfinite(scores)] = np.nan
+    return scores
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` months; NaN until a full window is available"""
+    return _rolling_sums(values, window)[0] / window
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing population standard deviation over `window` months"""
+    total, squares = _rolling_sums(values, window)
+    mean = total / window
+    return np.sqrt(np.maximum(squares / window - mean * mean, 0.0))
+
+
+def correlations(values: np.ndarray) -> np.ndarray:
+    """Pearson correlation between every pair of metrics, shaped (..., metric, metric)"""
+    centered = values - np.nanmean(values, axis=-2, keepdims=True)
+    centered = np.nan_to_num(centered)
+    count = np.sum(~np.isnan(values), axis=-2)[..., :, None]
+    covariance = np.einsum("...ti,...tj->...ij", centered, centered) / np.maximum(count, 1)
+    scale = np.sqrt(np.diagonal(covariance, axis1=-2, axis2=-1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = covariance / (scale[..., :, None] * scale[..., None, :])
+    result[~np.isfinite(result)] = np.nan
+    return np.clip(result, -1.0, 1.0)
+
+
+def _rolling_sums(values: np.ndarray, window: int):
+    zeros = np.zeros(values[..., :1, :].shape)
+    cumulative = np.concatenate([zeros, np.cumsum(values, axis=-2)], axis=-2)
+    cumulative_squares = np.concatenate([zeros, np.cumsum(values * values, axis=-2)], axis=-2)
+    total = cumulative[..., window:, :] - cumulative[..., :-window, :]
+    squares = cumulative_squares[..., window:, :] - cumulative_squares[..., :-window, :]
+    pad = np.full(values[..., :window - 1, :].shape, np.nan)
+    return np.concatenate([pad, total], axis=-2), np.concatenate([pad, squares], axis=-2)
+
+
+def _last_valid(values: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(values)
+    last_index = valid.shape[-2] - 1 - np.argmax(valid[..., ::-1, :], axis=-2)
+    return np.take_along_axis(values, last_index[..., None, :], axis=-2)[..., 0, :]
+
+
+def _rounded(array: np.ndarray, digits: int = 4) -> List[Optional[float]]:
+    return [None if np.isnan(value) else round(float(value), digits) for value in array]
+
+
+def _by_metric(block: np.ndarray) -> Dict[str, List[Optional[float]]]:
+    return {metric: _rounded(block[:, k]) for k, metric in enumerate(METRICS)}
+
+
+def merchant_stats(merchant_id: str, window: int = 3) -> Optional[dict]:
+    """Vectorized KPI analytics for one merchant; None if the merchant is unknown"""
+    if merchant_id not in MERCHANT_KPIS:
+        return None
+    series = MERCHANT_KPIS.series(merchant_id)
+    window = max(1, min(window, len(series)))
+    correlation = correlations(series)
+    return {
+        "merchant_id": merchant_id,
+        "months": MERCHANT_KPIS.months[MERCHANT_KPIS._index[merchant_id]],
+        "window": window,
+        "latest": dict(zip(METRICS, _rounded(series[-1]))),
+        "period_growth_pct": dict(zip(METRICS, _rounded(period_growth(series)))),
+        "growth_pct": _by_metric(growth_rates(series)),
+        "z_scores": _by_metric(z_scores(series)),
+        "rolling_mean": _by_metric(rolling_mean(series, window)),
+        "rolling_std": _by_metric(rolling_std(series, window)),
+        "correlations": {metric: dict(zip(METRICS, _rounded(correlation[k]))) for k, metric in enumerate(METRICS)},
+    }
+
+
+def metric_summary(merchant_id: str, recent: int = 3) -> Optional[Dict[str, dict]]:
+    """First/latest/min/max/mean, period change and the last `recent` values for each metric"""
+    if merchant_id not in MERCHANT_KPIS:
+        return None
+    series = MERCHANT_KPIS.series(merchant_id)
+    months = MERCHANT_KPIS.months[MERCHANT_KPIS._index[merchant_id]]
+    lowest, highest = np.argmin(series, axis=0), np.argmax(series, axis=0)
+    means, changes = series.mean(axis=0), period_growth(series)
+    return {
+        metric: {
+            "first": float(series[0, k]),
+            "latest": float(series[-1, k]),
+            "min": float(series[lowest[k], k]),
+            "min_month": months[lowest[k]],
+            "max": float(series[highest[k], k]),
+            "max_month": months[highest[k]],
+            "mean": float(means[k]),
+            "change_pct": None if np.isnan(changes[k]) else float(changes[k]),
+            "recent": [float(value) for value in series[-recent:, k]]
+        }
+        for k, metric in enumerate(METRICS)
+    }
+
+
+def top_correlations(merchant_id: str, limit: int = 3, minimum: float = 0.5) -> List[tuple]:
+    """Strongest distinct metric pairs as (metric, metric, r), by absolute correlation"""
+    if merchant_id not in MERCHANT_KPIS:
+        return []
+    matrix = correlations(MERCHANT_KPIS.series(merchant_id))
+    upper = np.triu_indices(len(METRICS), k=1)
+    pairs = [(METRICS[i], METRICS[j], float(matrix[i, j])) for i, j in zip(*upper) if not np.isnan(matrix[i, j])]
+    pairs = [pair for pair in pairs if abs(pair[2]) >= minimum]
+    return sorted(pairs, key=lambda pair: abs(pair[2]), reverse=True)[:limit]
+
+
+MERCHANT_KPIS = MerchantKPIStore.from_merchants(MERCHANTS)
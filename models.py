@@ -3,29 +3,194 @@ Pydantic models for API request/response serialization
 Following C# best practices with strongly-typed models
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
 
+# Catalog Models
+# Typed shapes for the static datasets. Declared fields serialize through pydantic-core's
+# typed fast path instead of Any inference; extra="allow" keeps free-form keys intact.
+class CatalogModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+class ScenarioAccount(CatalogModel):
+    account_number: str
+    cardholder_name: str
+    account_age_days: int
+    address: str
+    typical_monthly_spend: float
+    past_chargebacks: int
+
+
+class ScenarioTransaction(CatalogModel):
+    amount: float
+    merchant: str
+    mcc: str
+    mcc_description: str
+    location: str
+    timestamp: str
+    device_id: str
+    card_present: bool
+    ip_address: str
+    transaction_id: str
+
+
+class HistoricalTransaction(CatalogModel):
+    date: str
+    amount: float
+    merchant: str
+    location: str
+
+
+class FraudScenario(CatalogModel):
+    id: int
+    case_name: str
+    account: ScenarioAccount
+    flagged_transaction: ScenarioTransaction
+    fraud_indicators: Dict[str, Any]
+    historical_transactions: List[HistoricalTransaction]
+
+
+class MerchantSummary(CatalogModel):
+    id: str
+    name: str
+    business_type: str
+    location: str
+    problem_statement: str
+
+
+class MerchantKPIMonth(CatalogModel):
+    month: str
+    revenue: int
+    transaction_count: int
+    avg_ticket_size: Union[int, float]
+    chargeback_rate: float
+    refund_rate: float
+    saturday_revenue_pct: int
+    repeat_customer_rate: int
+    active_logins: int
+    terminal_latency_ms: int
+    top_mcc: str
+
+
+class MerchantDetail(CatalogModel):
+    name: str
+    business_type: str
+    location: str
+    problem_statement: str
+    monthly_data: List[MerchantKPIMonth]
+
+
+class CustomerSummary(CatalogModel):
+    customer_id: str
+    name: str
+    age: int
+    occupation: str
+    monthly_spend: int
+    card_type: str
+    location: str
+    credit_utilization: int
+
+
+class CustomerDetail(CatalogModel):
+    customer_id: str
+    name: str
+    age: int
+    occupation: str
+    monthly_spend: int
+    spend_categories: Dict[str, int]
+    credit_utilization: int
+    payment_behavior: str
+    chargebacks_last_12mo: int
+    income_band: str
+    card_type: str
+    location: str
+    account_age_months: int
+    credit_score_band: str
+
+
+class DisputeSummary(CatalogModel):
+    case_id: str
+    status: str
+    customer_claim: str
+    transaction_amount: str
+    item: str
+    transaction_date: str
+
+
+class DisputeDetails(CatalogModel):
+    customer_claim: str
+    transaction_amount: str
+    transaction_date: str
+    item: str
+    customer_statement: str
+
+
+class DisputeDetail(CatalogModel):
+    case_id: str
+    status: str
+    dispute_details: DisputeDetails
+    merchant_evidence: Dict[str, Any]
+
+
 # Request Models
 class FraudAnalysisRequest(BaseModel):
     scenario_id: int
     audience: str
+    bypass_cache: bool = False
+    local_score: bool = False  # score locally and have the LLM write only the narrative
+
+
+class FraudScoreRequest(BaseModel):
+    scenario_id: Optional[int] = None
+    scenario: Optional[FraudScenario] = None  # inline scenario, scored as given
+
+
+class GeoTransaction(BaseModel):
+    card_id: str
+    timestamp: Union[str, float]  # ISO 8601 (date-only means start of day, UTC) or epoch seconds
+    location: Optional[str] = None  # "City, ST", "City, Country" or a street address
+    lat: Optional[float] = Field(default=None, ge=-90, le=90)
+    lon: Optional[float] = Field(default=None, ge=-180, le=180)
+
+
+class GeoVelocityRequest(BaseModel):
+    transactions: List[GeoTransaction] = Field(min_length=1)
+
+
+class FraudBatchRequest(BaseModel):
+    scenario_ids: List[int] = Field(default_factory=list)
+    scenarios: List[FraudScenario] = Field(default_factory=list)  # inline scenarios, analyzed as given
+    audiences: List[str] = Field(default_factory=lambda: ["Risk Analyst"])
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    timeout_seconds: Optional[float] = Field(default=None, gt=0)
+    bypass_cache: bool = False
 
 
 class MerchantNarrativeRequest(BaseModel):
     merchant_id: str
+    bypass_cache: bool = False
 
 
 class CustomerUpgradeRequest(BaseModel):
     customer_id: str
     output_mode: str = "Executive"
     format_mode: str = "JSON"
+    bypass_cache: bool = False
 
 
 class DisputeAnalysisRequest(BaseModel):
     case_id: str
+    bypass_cache: bool = False
+
+
+class DisputeTriageJobRequest(BaseModel):
+    customer_claim: Optional[str] = None
+    status: Optional[str] = None
+    transaction_date: Optional[str] = None
+    bypass_cache: bool = False
 
 
 class TestPromptRequest(BaseModel):
@@ -34,18 +199,66 @@ class TestPromptRequest(BaseModel):
 
 # Response Models
 class ScenariosResponse(BaseModel):
-    scenarios: List[Dict[str, Any]]
+    scenarios: List[FraudScenario]
     total: int
 
 
+class ScoreSignal(BaseModel):
+    rule: str
+    points: int
+    detail: str
+
+
+class FraudScoreResponse(BaseModel):
+    scenario_id: int
+    score: int
+    rating: str
+    signals: List[ScoreSignal]
+
+
+class GeoSegment(BaseModel):
+    card_id: str
+    from_location: str
+    to_location: str
+    from_timestamp: Union[str, float]
+    to_timestamp: Union[str, float]
+    distance_km: float
+    hours: float
+    speed_kmh: Optional[float] = None  # None when both transactions share a timestamp
+    impossible: bool
+
+
+class GeoVelocityResponse(BaseModel):
+    scenario_id: Optional[int] = None
+    max_speed_kmh: float
+    impossible_travel: bool
+    segments: List[GeoSegment]
+    unresolved: List[str]
+
+
 class FraudAnalysisResponse(BaseModel):
-    scenario: Dict[str, Any]
+    scenario: FraudScenario
     analysis: str
     audience: str
+    local_score: Optional[FraudScoreResponse] = None
+
+
+class IngestError(BaseModel):
+    line: int
+    error: str
+
+
+class IngestResponse(BaseModel):
+    dataset: str
+    lines: int
+    accepted: int
+    rejected: int
+    errors: List[IngestError]  # the first INGEST_MAX_ERRORS rejections
+    elapsed_ms: float
 
 
 class MerchantListResponse(BaseModel):
-    merchants: List[Dict[str, Any]]
+    merchants: List[MerchantSummary]
 
 
 class MerchantNarrativeResponse(BaseModel):
@@ -55,7 +268,7 @@ class MerchantNarrativeResponse(BaseModel):
 
 
 class CustomerListResponse(BaseModel):
-    customers: List[Dict[str, Any]]
+    customers: List[CustomerSummary]
 
 
 class CustomerUpgradeResponse(BaseModel):
@@ -67,7 +280,7 @@ class CustomerUpgradeResponse(BaseModel):
 
 
 class DisputeListResponse(BaseModel):
-    disputes: List[Dict[str, Any]]
+    disputes: List[DisputeSummary]
 
 
 class DisputeAnalysisResponse(BaseModel):
@@ -103,6 +316,106 @@ class TestPromptResponse(BaseModel):
     usage: Dict[str, int]
 
 
+class LLMPoolMetricsResponse(BaseModel):
+    requests: int
+    errors: int
+    in_flight: int
+    peak_in_flight: int
+    in_flight_over_limit: int
+    max_connections: int
+    max_keepalive_connections: int
+    saturation: float
+    peak_saturation: float
+    http2: bool
+    client_open: bool
+
+
+class EndpointTokenUsage(BaseModel):
+    prompts: int
+    prompt_tokens_estimated: int
+    reduced_prompts: int
+    rejected_prompts: int
+    api_calls: int
+    cached_responses: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+
+class TokenUsageResponse(BaseModel):
+    tokenizer: str
+    budgets: Dict[str, int]
+    endpoints: Dict[str, EndpointTokenUsage]
+
+
+class AnalysisArtifactsResponse(BaseModel):
+    version: str
+    template_version: str
+    available: int
+    total: int
+
+
+class MerchantStatsResponse(BaseModel):
+    merchant_id: str
+    months: List[str]
+    window: int
+    latest: Dict[str, Optional[float]]
+    period_growth_pct: Dict[str, Optional[float]]
+    growth_pct: Dict[str, List[Optional[float]]]
+    z_scores: Dict[str, List[Optional[float]]]
+    rolling_mean: Dict[str, List[Optional[float]]]
+    rolling_std: Dict[str, List[Optional[float]]]
+    correlations: Dict[str, Dict[str, Optional[float]]]
+
+
+class AnomalyFinding(BaseModel):
+    metric: str
+    kind: str  # "outlier" or "changepoint"
+    month: str
+    value: float
+    baseline: float
+    score: float
+    recent: bool
+    robust_z: Optional[float] = None
+    residual_z: Optional[float] = None
+    shift_pct: Optional[float] = None
+
+
+class MerchantAnomaliesResponse(BaseModel):
+    merchant_id: str
+    months: List[str]
+    outlier_threshold: float
+    changepoint_threshold: float
+    findings: List[AnomalyFinding]
+    by_metric: Dict[str, List[AnomalyFinding]]
+
+
+class JobItem(BaseModel):
+    item_key: str
+    status: str  # "pending", "running", "completed" or "failed"
+    attempts: int
+    analysis: Optional[str] = None
+    cache: Optional[str] = None
+    error: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    filters: Dict[str, str]
+    bypass_cache: bool
+    status: str  # "queued", "running", "completed", "completed_with_errors" or "failed"
+    created_at: str
+    updated_at: str
+    total: int
+    pending: int
+    running: int
+    completed: int
+    failed: int
+    items: List[JobItem]
+
+
 class ErrorResponse(BaseModel):
     detail: str
 
@@ -126,11 +439,14 @@ class ChatMessage(BaseModel):
     content: str
     timestamp: Optional[str] = None
     sentiment: Optional[str] = None  # 'positive', 'neutral', 'negative', 'frustrated'
+    intent: Optional[str] = None  # the intent the agent's response reported for this turn
 
 
 class VirtualAgentChatRequest(BaseModel):
     message: str
-    conversation_history: List[ChatMessage] = []
+    session_id: Optional[str] = None  # from the previous response; replaces conversation_history
+    conversation_history: List[ChatMessage] = []  # only read when no session_id is given
+    start_session: bool = False  # without session_id: keep this conversation (seeded with conversation_history) server-side
     authenticated: bool = False
 
 
@@ -141,6 +457,28 @@ class VirtualAgentChatResponse(BaseModel):
     suggested_actions: List[str] = []
     transfer_to_agent: bool = False
     off_topic_count: int = 0
+    session_id: Optional[str] = None
+    intent_confidence: Optional[float] = None  # the model's probability for the reported intent; None when no model decided it
+
+
+class FastPathMetricsResponse(BaseModel):
+    enabled: bool
+    template_responses: int
+    llm_responses: int
+    hit_rate: float
+    by_intent: Dict[str, Dict[str, int]]
+    fallbacks: Dict[str, int]
+
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    created_at: str
+    last_active: Optional[str] = None
+    turn_count: int
+    off_topic_count: int
+    sentiment_counts: Dict[str, int]
+    sentiment_trajectory: List[str]  # sentiment of each buffered user message, oldest first
+    turns: List[ChatMessage]  # the last SESSION_MAX_TURNS messages
 
 
 class CapabilitiesResponse(BaseModel):
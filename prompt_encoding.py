@@ -0,0 +1,155 @@
+"""
+Prompt encoding layer
+Serializes the records embedded in prompts more compactly than json.dumps(indent=2):
+  - pretty:   the original indented JSON (baseline)
+  - minified: JSON without whitespace
+  - tabular:  minified, with lists of same-shaped records sent as one header row plus value rows
+  - compact:  tabular, leaving out fields (and table columns) that are null, zero or empty
+Set PROMPT_ENCODING to pick the encoding the prompt builders use (tabular by default).
+Token counts use the tiktoken encoding of the model the prompt is sent to (cl100k_base for
+gpt-3.5-turbo, o200k_base for gpt-4o) when tiktoken and its encoding files are available, and
+a BPE-like approximation otherwise.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+ENCODINGS = ("pretty", "minified", "tabular", "compact")
+PROMPT_ENCODING = os.getenv("PROMPT_ENCODING", "tabular")
+if PROMPT_ENCODING not in ENCODINGS:
+    raise ValueError(f"PROMPT_ENCODING must be one of {', '.join(ENCODINGS)}")
+
+DEFAULT_MODEL = "gpt-3.5-turbo"  # the analysis endpoints' model, and the LLM gateway's default
+
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "")  # empty: each model's own encoding
+FALLBACK_ENCODING = "o200k_base"  # models tiktoken does not know
+
+# Words (with their leading space), runs of up to 3 digits, and single punctuation marks:
+# close to how the GPT tokenizers split JSON and English
+_APPROXIMATE_TOKEN = re.compile(r" ?[A-Za-z]+| ?\d{1,3}|\s+|[^\sA-Za-z\d]")
+
+_TABLE_LEGEND = 'Record lists are {"columns":[...],"rows":[[...]]}.'
+_ELISION_LEGEND = "Null/zero/empty fields are omitted."
+
+
+def _is_empty(value) -> bool:
+    if value is None or isinstance(value, bool):
+        return value is None
+    if isinstance(value, (int, float)):
+        return value == 0
+    return isinstance(value, (str, list, dict)) and len(value) == 0
+
+
+def _is_table(value) -> bool:
+    return (isinstance(value, list) and len(value) >= 2 and all(isinstance(item, dict) for item in value)
+            and all(item.keys() == value[0].keys() for item in value))
+
+
+class _Encoder:
+    """One pass over the data; remembers which transformations applied so the legend stays minimal"""
+
+    def __init__(self, tables: bool, elide: bool):
+        self.tables = tables
+        self.elide = elide
+        self.used_tables = False
+        self.elided = False
+
+    def convert(self, value):
+        if isinstance(value, dict):
+            converted = {key: self.convert(item) for key, item in value.items()}
+            if self.elide:
+                kept = {key: item for key, item in converted.items() if not _is_empty(item)}
+                self.elided = self.elided or len(kept) < len(converted)
+                converted = kept
+            return converted
+        if isinstance(value, list):
+            if self.tables and _is_table(value):
+                return self._table(value)
+            return [self.convert(item) for item in value]
+        return value
+
+    def _table(self, records):
+        columns = list(records[0])
+        if self.elide:
+            # Drop a column only when it is empty in every row, so rows stay aligned
+            kept = [key for key in columns if not all(_is_empty(record[key]) for record in records)]
+            self.elided = self.elided or len(kept) < len(columns)
+            columns = kept
+        self.used_tables = True
+        return {"columns": columns, "rows": [[self.convert(record[key]) for key in columns] for record in records]}
+
+
+def _encode(data, encoding: str):
+    if encoding == "pretty":
+        return json.dumps(data, indent=2), ""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown prompt encoding '{encoding}'")
+    encoder = _Encoder(tables=encoding in ("tabular", "compact"), elide=encoding == "compact")
+    text = json.dumps(encoder.convert(data), ensure_ascii=False, separators=(",", ":"))
+    notes = []
+    if encoder.used_tables:
+        notes.append(_TABLE_LEGEND)
+    if encoder.elided:
+        notes.append(_ELISION_LEGEND)
+    return text, " ".join(notes)
+
+
+def encode(data, encoding: str = None) -> str:
+    """Serialize data for embedding in a prompt"""
+    return _encode(data, encoding or PROMPT_ENCODING)[0]
+
+
+def embed(data, encoding: str = None) -> str:
+    """Encoded data preceded by a one-line legend when the encoding needs explaining"""
+    text, note = _encode(data, encoding or PROMPT_ENCODING)
+    return f"{note}\n{text}" if note else text
+
+
+def encoding_name(model: str = DEFAULT_MODEL) -> str:
+    """tiktoken encoding for a model: TOKENIZER_ENCODING if set, else tiktoken's own mapping"""
+    if TOKENIZER_ENCODING:
+        return TOKENIZER_ENCODING
+    if tiktoken is not None:
+        try:
+            return tiktoken.encoding_name_for_model(model)
+        except KeyError:
+            pass
+    return FALLBACK_ENCODING
+
+
+@lru_cache(maxsize=None)
+def _tokenizer(encoding: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(encoding)
+    except Exception:  # encoding files not cached and no network
+        return None
+
+
+def tokenizer_name(model: str = DEFAULT_MODEL) -> str:
+    encoding = encoding_name(model)
+    return encoding if _tokenizer(encoding) is not None else "approximate"
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    tokenizer = _tokenizer(encoding_name(model))
+    if tokenizer is not None:
+        return len(tokenizer.encode(text))
+    return len(_APPROXIMATE_TOKEN.findall(text))
+
+
+def encoding_report(data) -> dict:
+    """Characters and tokens for every encoding of data, legend included"""
+    report = {}
+    for encoding in ENCODINGS:
+        text = embed(data, encoding)
+        report[encoding] = {"chars": len(text), "tokens": count_tokens(text)}
+    return report
@@ -0,0 +1,144 @@
+"""
+SQLite record store for ingested datasets
+One table per dataset holding each record as JSON next to its normalized secondary-index
+columns (each with a SQL index), so ingested records are looked up and filtered on disk
+instead of being held in memory. The file is shared by every worker. Records are insert-only:
+a stored key is never replaced, so anything cached by record id in any worker stays valid.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+INGEST_STORE_PATH = os.getenv(
+    "INGEST_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingested.sqlite3")
+)
+RECORD_PAGE_SIZE = int(os.getenv("RECORD_PAGE_SIZE", "500"))  # rows read per query when streaming a table
+
+
+def _normalize(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+class RecordStore:
+    def __init__(self, path: str = INGEST_STORE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._tables: List["StoredTable"] = []
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for table in self._tables:
+                table.create(conn)
+            self._conn = conn
+        return self._conn
+
+    def table(self, name: str, indexes: Dict[str, Callable[[dict], object]] = None) -> "StoredTable":
+        table = StoredTable(self, name, indexes or {})
+        self._tables.append(table)
+        if self._conn is not None:
+            with self._lock:
+                table.create(self._conn)
+        return table
+
+    def execute(self, sql: str, parameters=()) -> list:
+        try:
+            with self._lock:
+                return self._connection().execute(sql, parameters).fetchall()
+        except sqlite3.Error:
+            return []
+
+
+class StoredTable:
+    """The Repository-shaped view of one dataset in the store"""
+
+    def __init__(self, store: RecordStore, name: str, indexes: Dict[str, Callable[[dict], object]]):
+        for identifier in (name, *indexes):
+            if not identifier.isidentifier():
+                raise ValueError(f"Invalid table or index name '{identifier}'")
+        self.store = store
+        self.name = name
+        self._extractors = indexes
+
+    def create(self, conn: sqlite3.Connection):
+        columns = "".join(f", {name}" for name in self._extractors)
+        # No declared type on key: integer ids stay integers, string ids stay strings
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.name} (key PRIMARY KEY, body TEXT NOT NULL{columns})")
+        for name in self._extractors:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.name}_{name} ON {self.name} ({name})")
+
+    def insert_many(self, keyed_records: Iterable[tuple]) -> List:
+        """
+        Insert (key, record) pairs in one transaction. Stored records are never replaced: keys
+        already in the table (or repeated in the batch) are skipped and returned.
+        """
+        rows = [
+            (key, json.dumps(record, ensure_ascii=False, separators=(",", ":")),
+             *(_normalize(extract(record)) for extract in self._extractors.values()))
+            for key, record in keyed_records
+        ]
+        if not rows:
+            return []
+        columns = ", ".join(["key", "body", *self._extractors])
+        placeholders = ", ".join("?" * (2 + len(self._extractors)))
+        sql = f"INSERT INTO {self.name} ({columns}) VALUES ({placeholders}) ON CONFLICT(key) DO NOTHING"
+        skipped = []
+        with self.store._lock:
+            conn = self.store._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    if conn.execute(sql, row).rowcount == 0:
+                        skipped.append(row[0])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return skipped
+
+    def get(self, key) -> Optional[dict]:
+        rows = self.store.execute(f"SELECT body FROM {self.name} WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def all(self, page_size: int = RECORD_PAGE_SIZE) -> Iterator[dict]:
+        """Every record in insertion order, read a page at a time (keyset on rowid)"""
+        last = 0
+        while True:
+            rows = self.store.execute(
+                f"SELECT rowid, body FROM {self.name} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last, page_size)
+            )
+            for last, body in rows:
+                yield json.loads(body)
+            if len(rows) < page_size:
+                return
+
+    def version(self) -> Tuple[int, Optional[int]]:
+        """(row count, last rowid): identifies the table contents, since rows are insert-only"""
+        rows = self.store.execute(f"SELECT COUNT(*), MAX(rowid) FROM {self.name}")
+        return tuple(rows[0]) if rows else (0, None)
+
+    def find(self, **filters) -> List[dict]:
+        """Records matching every given filter (case-insensitive exact match on indexed columns)"""
+        for name in filters:
+            if name not in self._extractors:
+                raise KeyError(f"No index on '{name}'")
+        where = " AND ".join(f"{name} = ?" for name in filters) or "1"
+        rows = self.store.execute(
+            f"SELECT body FROM {self.name} WHERE {where} ORDER BY rowid",
+            tuple(_normalize(value) for value in filters.values())
+        )
+        return [json.loads(body) for (body,) in rows]
+
+    def __len__(self):
+        rows = self.store.execute(f"SELECT COUNT(*) FROM {self.name}")
+        return rows[0][0] if rows else 0
+
+
+RECORD_STORE = RecordStore()
@@ -0,0 +1,86 @@
+"""
+In-memory repository with hash indexes
+A primary-key index gives O(1) get(); secondary indexes map a field value to the matching
+primary keys (an insertion-ordered dict used as a set) so filtered lists are answered from
+index buckets instead of full scans. An optional store (a record_store.StoredTable) holds
+records ingested at runtime; lookups fall through to it after the in-memory records.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+def _normalize(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+class Repository:
+    def __init__(self, records: Iterable[dict], primary_key: str,
+                 indexes: Dict[str, Callable[[dict], object]] = None, store=None):
+        """
+        primary_key names the unique id field; indexes maps a filter name to a function
+        extracting that value from a record (so nested fields can be indexed too).
+        store, when given, must be indexed on the same filter names.
+        """
+        self.primary_key = primary_key
+        self.store = store
+        self._extractors = indexes or {}
+        self._records = {}
+        self._indexes = {name: {} for name in self._extractors}
+        for record in records:
+            self.add(record)
+
+    def add(self, record: dict):
+        """Insert or replace a record and update every index"""
+        key = record[self.primary_key]
+        if key in self._records:
+            self.remove(key)
+        self._records[key] = record
+        for name, extract in self._extractors.items():
+            self._indexes[name].setdefault(_normalize(extract(record)), {})[key] = None
+
+    def remove(self, key):
+        record = self._records.pop(key, None)
+        if record is None:
+            return
+        for name, extract in self._extractors.items():
+            bucket = self._indexes[name].get(_normalize(extract(record)))
+            if bucket is not None:
+                bucket.pop(key, None)
+
+    def get(self, key) -> Optional[dict]:
+        record = self._records.get(key)
+        if record is None and self.store is not None:
+            return self.store.get(key)
+        return record
+
+    def all(self) -> List[dict]:
+        records = list(self._records.values())
+        if self.store is not None:
+            records.extend(self.store.all())
+        return records
+
+    def __contains__(self, key) -> bool:
+        """Whether key is one of the in-memory records (the store is not consulted)"""
+        return key in self._records
+
+    def find(self, **filters) -> List[dict]:
+        """Records matching every given (indexed) filter; None values are ignored"""
+        active = {name: value for name, value in filters.items() if value is not None}
+        if not active:
+            return self.all()
+
+        buckets = []
+        for name, value in active.items():
+            if name not in self._indexes:
+                raise KeyError(f"No index on '{name}'")
+            buckets.append(self._indexes[name].get(_normalize(value), {}))
+        buckets.sort(key=len)
+
+        smallest, rest = buckets[0], buckets[1:]
+        matches = [self._records[key] for key in smallest if all(key in bucket for bucket in rest)]
+        if self.store is not None:
+            matches.extend(self.store.find(**active))
+        return matches
+
+    def __len__(self):
+        return len(self._records) + (len(self.store) if self.store is not None else 0)
@@ -0,0 +1,162 @@
+"""
+Content-addressed cache for LLM completions
+Keys are a SHA-256 of (model, messages, temperature, max_tokens); values are the completion
+text plus model and usage. Backends: in-process LRU with TTL, SQLite shared by all gunicorn
+workers on the host, or both tiered. The async aget/aset used by the gateway run SQLite I/O
+in the threadpool so a lookup never blocks the event loop.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "tiered")  # memory, sqlite, tiered, none
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+)
+
+
+def cache_key(model: str, messages: list, temperature: float = None, max_tokens: int = None) -> str:
+    """Stable hash of everything that determines a completion"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryLRUCache:
+    """In-process LRU with per-entry TTL"""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: dict):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def aget(self, key: str) -> Optional[dict]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: dict):
+        self.set(key, value)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SQLiteCache:
+    """On-disk cache in a SQLite file (WAL mode) visible to every worker process on the host"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM llm_cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: dict):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time() + self.ttl)
+                )
+        except sqlite3.Error:
+            pass
+
+    async def aget(self, key: str) -> Optional[dict]:
+        return await run_in_threadpool(self.get, key)
+
+    async def aset(self, key: str, value: dict):
+        await run_in_threadpool(self.set, key, value)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+
+class TieredCache:
+    """Memory LRU in front of a shared tier; shared hits are promoted into memory"""
+
+    def __init__(self, near, far):
+        self.near = near
+        self.far = far
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self.near.get(key)
+        if value is None:
+            value = self.far.get(key)
+            if value is not None:
+                self.near.set(key, value)
+        return value
+
+    def set(self, key: str, value: dict):
+        self.near.set(key, value)
+        self.far.set(key, value)
+
+    async def aget(self, key: str) -> Optional[dict]:
+        value = await self.near.aget(key)
+        if value is None:
+            value = await self.far.aget(key)
+            if value is not None:
+                await self.near.aset(key, value)
+        return value
+
+    async def aset(self, key: str, value: dict):
+        await self.near.aset(key, value)
+        await self.far.aset(key, value)
+
+    def clear(self):
+        self.near.clear()
+        self.far.clear()
+
+
+def create_cache(backend: str = LLM_CACHE_BACKEND):
+    """Build the configured cache backend, or None when caching is disabled"""
+    if backend == "memory":
+        return MemoryLRUCache()
+    if backend == "sqlite":
+        return SQLiteCache()
+    if backend == "tiered":
+        return TieredCache(MemoryLRUCache(), SQLiteCache())
+    return None
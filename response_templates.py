@@ -0,0 +1,154 @@
+"""
+Templated virtual agent replies
+Turns whose answer is fixed by the account data are answered from templates instead of a
+completion, but only when the message is phrased as an explicit request: a balance lookup,
+a freeze/unfreeze command that changed the card this turn, a lost card report, or its
+confirmation right after the agent asked for one. Each reply has a few interchangeable
+phrasings, and a frustrated or negative customer (or anyone reporting a lost card) hears an
+empathy opener first. A turn goes to the LLM instead when its intent has no template, the
+message is a question or a negation ("is my card frozen?", "do not freeze my card") or
+otherwise not an explicit request, it is long enough to carry more than the bare request, or
+the intent model is unsure. Per-intent template and LLM counts, and why turns fell back, are
+kept for /api/virtual-agent/fast-path.
+"""
+
+import os
+import random
+from typing import Dict, Optional, Tuple
+
+from utterances import BALANCE_REQUEST, CARD_COMMAND, CONFIRMATION, LOST_CARD_REPORT, NEGATION, QUESTION
+
+VIRTUAL_AGENT_TEMPLATES = os.getenv("VIRTUAL_AGENT_TEMPLATES", "true").lower() == "true"
+TEMPLATE_MAX_WORDS = int(os.getenv("TEMPLATE_MAX_WORDS", "16"))
+TEMPLATE_MIN_CONFIDENCE = float(os.getenv("TEMPLATE_MIN_CONFIDENCE", "0.85"))
+
+TEMPLATES = {
+    "check_balance": [
+        "Your current balance is {balance}. Your minimum payment of {minimum_payment} is due on {next_payment_date}.",
+        "You have a balance of {balance} on your card ending in {card_last4}. The next minimum payment is {minimum_payment}, due {next_payment_date}.",
+        "Your balance is {balance}, with a minimum payment of {minimum_payment} due on {next_payment_date}.",
+    ],
+    "freeze": [
+        "Done. Your card ending in {card_last4} is now frozen, so no new purchases will go through. You can unfreeze it any time.",
+        "Your card ending in {card_last4} has been frozen. Just let me know when you'd like to unfreeze it.",
+        "I've frozen your card ending in {card_last4}. New transactions will be declined until you unfreeze it.",
+    ],
+    "unfreeze": [
+        "Your card ending in {card_last4} is unfrozen and ready to use.",
+        "Done. Your card ending in {card_last4} is active again and ready to use.",
+        "I've unfrozen your card ending in {card_last4}. You can use it right away.",
+    ],
+    "lost_card": [
+        "To report your card ending in {card_last4} as lost or stolen, please type \"confirm\".",
+        "I can block your card ending in {card_last4} right away. Please type \"confirm\" to report it as lost or stolen.",
+        "Please type \"confirm\" and I'll report your card ending in {card_last4} as lost or stolen.",
+    ],
+    "lost_card_confirmed": [
+        "Your card ending in {card_last4} has been reported as lost or stolen and can no longer be used. A new card will arrive within {replacement_days}.",
+        "Thank you for confirming. Your card ending in {card_last4} is now blocked, and your replacement card will arrive within {replacement_days}.",
+        "Your card ending in {card_last4} is reported and blocked. Your new card is on its way and will arrive within {replacement_days}.",
+    ],
+}
+
+EMPATHY = {
+    "frustrated": [
+        "I'm really sorry for the frustration, and I'll sort this out for you now.",
+        "I understand how frustrating this is. Let me take care of it right away.",
+        "I'm sorry you're dealing with this. Let's get it fixed.",
+    ],
+    "negative": [
+        "I'm sorry to hear that.",
+        "I'm sorry about the trouble.",
+        "I understand, and I'm here to help.",
+    ],
+}
+
+# Intents some template can answer; other intents always go to the LLM
+TEMPLATE_INTENTS = {"check_balance", "freeze_card", "lost_card"}
+
+# Intents that always get an empathy opener, whatever the detected sentiment
+EMPATHETIC_KEYS = {"lost_card"}
+
+_choice = random.Random().choice
+
+_by_intent: Dict[str, Dict[str, int]] = {}  # intent -> {"template": n, "llm": n}
+_fallbacks: Dict[str, int] = {}  # reason a turn went to the LLM -> n
+
+
+def template_key(intent: str, message: str, new_status: Optional[str], previous_intent: Optional[str]) -> Optional[str]:
+    """
+    The template answering this turn, or None unless the message is an explicit request.
+    new_status is the card status this turn set (None if unchanged) and previous_intent the
+    intent of the turn before.
+    """
+    text = message.lower().strip()
+    if intent == "check_balance":
+        return "check_balance" if BALANCE_REQUEST.match(text) else None
+    if intent == "freeze_card":
+        if new_status not in ("frozen", "active") or not CARD_COMMAND.match(text):
+            return None
+        return "freeze" if new_status == "frozen" else "unfreeze"
+    if intent == "lost_card":
+        if new_status == "lost_stolen" and previous_intent == "lost_card" and CONFIRMATION.match(text):
+            return "lost_card_confirmed"
+        return "lost_card" if LOST_CARD_REPORT.match(text) and not NEGATION.search(text) else None
+    return None
+
+
+def render(key: str, sentiment: str, facts: dict) -> str:
+    """One phrasing of the template, after an empathy opener when the sentiment (or the intent) calls for one"""
+    reply = _choice(TEMPLATES[key]).format(**facts)
+    if sentiment not in EMPATHY and key in EMPATHETIC_KEYS:
+        sentiment = "negative"
+    if sentiment in EMPATHY:
+        reply = f"{_choice(EMPATHY[sentiment])} {reply}"
+    return reply
+
+
+def _fallback_reason(intent: str, key: Optional[str], message: str, confidence: Optional[float]) -> Optional[str]:
+    if not VIRTUAL_AGENT_TEMPLATES:
+        return "disabled"
+    if key is None:
+        if intent not in TEMPLATE_INTENTS:
+            return "free_form"
+        text = message.lower()
+        if NEGATION.search(text):
+            return "negation"
+        if QUESTION.search(text):
+            return "question"
+        return "not_command"
+    if len(message.split()) > TEMPLATE_MAX_WORDS:
+        return "long_message"
+    if confidence is not None and confidence < TEMPLATE_MIN_CONFIDENCE:
+        return "low_confidence"
+    return None
+
+
+def reply(intent: str, sentiment: str, confidence: Optional[float], message: str, new_status: Optional[str],
+          previous_intent: Optional[str], facts: dict) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (templated reply, None) for a deterministic turn, or (None, fallback reason) when the turn
+    needs the LLM. confidence is the intent model's (None: no model, or decided by a rule).
+    """
+    key = template_key(intent, message, new_status, previous_intent)
+    reason = _fallback_reason(intent, key, message, confidence)
+    counts = _by_intent.setdefault(intent, {"template": 0, "llm": 0})
+    if reason is not None:
+        counts["llm"] += 1
+        _fallbacks[reason] = _fallbacks.get(reason, 0) + 1
+        return None, reason
+    counts["template"] += 1
+    return render(key, sentiment, facts), None
+
+
+def get_fast_path_metrics() -> dict:
+    template = sum(counts["template"] for counts in _by_intent.values())
+    llm = sum(counts["llm"] for counts in _by_intent.values())
+    return {
+        "enabled": VIRTUAL_AGENT_TEMPLATES,
+        "template_responses": template,
+        "llm_responses": llm,
+        "hit_rate": round(template / (template + llm), 4) if template + llm else 0.0,
+        "by_intent": {intent: dict(counts) for intent, counts in sorted(_by_intent.items())},
+        "fallbacks": dict(sorted(_fallbacks.items()))
+    }
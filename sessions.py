@@ -0,0 +1,137 @@
+"""
+Server-side virtual agent conversations
+A session keeps the last SESSION_MAX_TURNS messages in a capped list and its running totals
+(turns, off-topic messages, per-sentiment counts) in a hash, both in the shared state store.
+Each chat turn reads one bounded list and one hash and appends to them in one atomic write, so
+its cost does not grow with the length of the conversation and the client sends only the new
+message. A session can be seeded with a transcript the client kept so far. Idle sessions expire
+after SESSION_TTL_SECONDS.
+"""
+
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+from state_store import STATE_STORE, StateStore
+
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+
+SENTIMENT_PREFIX = "sentiment:"
+
+
+@dataclass
+class Session:
+    session_id: str
+    created_at: str
+    last_active: Optional[str] = None
+    turn_count: int = 0
+    off_topic_count: int = 0
+    sentiment_counts: Dict[str, int] = field(default_factory=dict)
+    turns: List[dict] = field(default_factory=list)  # newest last, at most SESSION_MAX_TURNS
+
+    @property
+    def sentiment_trajectory(self) -> List[str]:
+        """Sentiment of each buffered user message, oldest first"""
+        return [turn["sentiment"] for turn in self.turns if turn["role"] == "user" and turn.get("sentiment")]
+
+    @property
+    def last_intent(self) -> Optional[str]:
+        """Intent of the latest buffered user message, if recorded"""
+        return next((turn["intent"] for turn in reversed(self.turns) if turn["role"] == "user" and turn.get("intent")), None)
+
+    def history(self, limit: int) -> List[str]:
+        """The last `limit` messages as "role: content" lines for the prompt"""
+        return [f"{turn['role']}: {turn['content']}" for turn in self.turns[-limit:]] if limit else []
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ChatSessions:
+    def __init__(self, store: StateStore = STATE_STORE, max_turns: int = SESSION_MAX_TURNS,
+                 ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.store = store
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _keys(session_id: str):
+        return f"session:{session_id}", f"session:{session_id}:turns"
+
+    def start(self, history: Sequence[dict] = ()) -> Session:
+        """
+        A new session, seeded with history (earlier {"role", "content", "sentiment", "intent"} messages,
+        oldest first) when the client kept the conversation so far
+        """
+        session = Session(session_id=uuid.uuid4().hex, created_at=_now())
+        meta_key, turns_key = self._keys(session.session_id)
+        turns = [
+            {key: turn[key] for key in ("role", "content", "timestamp", "sentiment", "intent") if turn.get(key) is not None}
+            for turn in history
+        ]
+        user_sentiments = [turn.get("sentiment") for turn in turns if turn["role"] == "user"]
+        meta = {
+            "created_at": session.created_at,
+            "turn_count": len(user_sentiments),
+            "off_topic_count": sum(1 for turn in turns if turn.get("sentiment") == "off_topic"),
+        }
+        for sentiment in filter(None, user_sentiments):
+            name = SENTIMENT_PREFIX + sentiment
+            meta[name] = meta.get(name, 0) + 1
+        operations = [("hset", (meta_key, meta))]
+        operations += [("push_capped", (turns_key, turn, self.max_turns)) for turn in turns[-self.max_turns:]]
+        operations += [("expire", (key, self.ttl_seconds)) for key in (meta_key, turns_key)]
+        self.store.write_many(operations)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """The session's counters and buffered turns, or None if unknown or expired"""
+        meta_key, turns_key = self._keys(session_id)
+        meta = self.store.hgetall(meta_key)
+        if "created_at" not in meta:
+            return None
+        return Session(
+            session_id=session_id,
+            created_at=meta["created_at"],
+            last_active=meta.get("last_active"),
+            turn_count=int(meta.get("turn_count", 0)),
+            off_topic_count=int(meta.get("off_topic_count", 0)),
+            sentiment_counts={
+                name[len(SENTIMENT_PREFIX):]: int(count)
+                for name, count in meta.items() if name.startswith(SENTIMENT_PREFIX)
+            },
+            turns=self.store.lrange(turns_key, -self.max_turns, -1)
+        )
+
+    def record_turn(self, session: Session, message: str, sentiment: str, off_topic: bool, response: str,
+                    intent: Optional[str] = None):
+        """Append the user message (with its intent) and the agent's reply and update the running totals"""
+        meta_key, turns_key = self._keys(session.session_id)
+        now = _now()
+        sentiment = "off_topic" if off_topic else sentiment
+        operations = [
+            ("push_capped", (turns_key, {
+                "role": "user", "content": message, "timestamp": now, "sentiment": sentiment, "intent": intent
+            }, self.max_turns)),
+            ("push_capped", (turns_key, {"role": "assistant", "content": response, "timestamp": now}, self.max_turns)),
+            ("hincrby", (meta_key, "turn_count")),
+            ("hincrby", (meta_key, SENTIMENT_PREFIX + sentiment)),
+        ]
+        if off_topic:
+            operations.append(("hincrby", (meta_key, "off_topic_count")))
+        operations += [
+            ("hset", (meta_key, {"last_active": now})),
+            ("expire", (meta_key, self.ttl_seconds)),
+            ("expire", (turns_key, self.ttl_seconds)),
+        ]
+        self.store.write_many(operations)
+
+    def end(self, session_id: str):
+        self.store.delete(*self._keys(session_id))
+
+
+CHAT_SESSIONS = ChatSessions()
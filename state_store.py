@@ -0,0 +1,481 @@
+"""
+Shared state for the virtual agent
+Card status and conversation sessions live behind one small Redis-shaped interface (hashes,
+atomic counters, capped lists, expiry) so every gunicorn worker sees the same state:
+- MemoryStateStore: in-process dicts; a single worker or tests only
+- SQLiteStateStore: a WAL SQLite file shared by every worker on the host (the default)
+- RedisStateStore: a redis-py client for multi-host deployments, or LocalRedis, an in-process
+  stand-in speaking the same commands
+Every operation is a single key lookup or one atomic write, and write_many applies several
+writes in one transaction (SQLite) or MULTI/EXEC pipeline (Redis); values are JSON-encoded.
+Expired keys are dropped when read, and the memory and SQLite stores also sweep every expired
+key on a write at most once per STATE_PURGE_INTERVAL seconds, so abandoned sessions do not
+accumulate (Redis expires keys itself). Select with STATE_BACKEND=memory|sqlite|redis.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite").lower()
+STATE_STORE_PATH = os.getenv(
+    "STATE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "state.sqlite3")
+)
+REDIS_URL = os.getenv("REDIS_URL", "")  # empty with STATE_BACKEND=redis: use the LocalRedis stand-in
+STATE_PURGE_INTERVAL = float(os.getenv("STATE_PURGE_INTERVAL", "60"))
+
+
+def _encode(value) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _decode(text):
+    return None if text is None else json.loads(text)
+
+
+class StateStore(ABC):
+    """Operations the virtual agent needs; each backend makes every call atomic"""
+
+    _last_purge = 0.0
+
+    @abstractmethod
+    def hget(self, key: str, field: str) -> Any:
+        ...
+
+    @abstractmethod
+    def hgetall(self, key: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def hset(self, key: str, mapping: Dict[str, Any]):
+        """Set several fields of a hash at once"""
+
+    @abstractmethod
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        ...
+
+    @abstractmethod
+    def push_capped(self, key: str, value, maxlen: int):
+        """Append to a list, keeping only its last maxlen items"""
+
+    @abstractmethod
+    def lrange(self, key: str, start: int = 0, stop: int = -1) -> List[Any]:
+        """Items start..stop inclusive; negative indexes count from the end, as in Redis"""
+
+    @abstractmethod
+    def expire(self, key: str, seconds: float):
+        ...
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        ...
+
+    @abstractmethod
+    def write_many(self, operations: Sequence[Tuple[str, tuple]]):
+        """
+        Apply writes given as (method name, arguments) pairs, e.g. ("hincrby", (key, field)),
+        atomically and in one round trip. Results (of hincrby) are discarded.
+        """
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Drop every expired key; returns the number of keys removed"""
+
+    def _purge_due(self) -> bool:
+        """True at most once per STATE_PURGE_INTERVAL; callers purge when it is"""
+        now = time.time()
+        if now - self._last_purge < STATE_PURGE_INTERVAL:
+            return False
+        self._last_purge = now
+        return True
+
+
+def _slice(items: list, start: int, stop: int) -> list:
+    start = max(len(items) + start, 0) if start < 0 else start
+    stop = len(items) + stop if stop < 0 else stop
+    return items[start:stop + 1]
+
+
+class MemoryStateStore(StateStore):
+    def __init__(self):
+        self._hashes: Dict[str, dict] = {}
+        self._lists: Dict[str, deque] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _live(self, key: str):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._hashes.pop(key, None)
+            self._lists.pop(key, None)
+            self._expires.pop(key, None)
+
+    def _written(self):
+        """Called under the lock after every write"""
+        if self._purge_due():
+            self.purge_expired()
+
+    def purge_expired(self):
+        with self._lock:
+            now = time.time()
+            expired = [key for key, expires in self._expires.items() if expires <= now]
+            for key in expired:
+                self._hashes.pop(key, None)
+                self._lists.pop(key, None)
+                self._expires.pop(key, None)
+            return len(expired)
+
+    def hget(self, key, field):
+        with self._lock:
+            self._live(key)
+            return self._hashes.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        with self._lock:
+            self._live(key)
+            return dict(self._hashes.get(key, {}))
+
+    def hset(self, key, mapping):
+        with self._lock:
+            self._live(key)
+            self._hashes.setdefault(key, {}).update(mapping)
+            self._written()
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            self._live(key)
+            fields = self._hashes.setdefault(key, {})
+            fields[field] = fields.get(field, 0) + amount
+            self._written()
+            return fields[field]
+
+    def push_capped(self, key, value, maxlen):
+        with self._lock:
+            self._live(key)
+            items = self._lists.get(key)
+            if items is None or items.maxlen != maxlen:
+                items = self._lists[key] = deque(items or (), maxlen=maxlen)
+            items.append(value)
+            self._written()
+
+    def lrange(self, key, start=0, stop=-1):
+        with self._lock:
+            self._live(key)
+            return _slice(list(self._lists.get(key, ())), start, stop)
+
+    def expire(self, key, seconds):
+        with self._lock:
+            self._expires[key] = time.time() + seconds
+            self._written()
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._hashes.pop(key, None)
+                self._lists.pop(key, None)
+                self._expires.pop(key, None)
+
+    def write_many(self, operations):
+        with self._lock:
+            for name, args in operations:
+                getattr(self, name)(*args)
+
+
+class SQLiteStateStore(StateStore):
+    """Safe across processes: WAL readers never block, and writers serialize on the file lock"""
+
+    def __init__(self, path: str = STATE_STORE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state_hashes ("
+                "key TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (key, field))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state_lists ("
+                "key TEXT NOT NULL, seq INTEGER NOT NULL, value TEXT NOT NULL, PRIMARY KEY (key, seq))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS state_expiry (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _purge_statements(now: float) -> list:
+        return [
+            (f"DELETE FROM {table} WHERE key IN (SELECT key FROM state_expiry WHERE expires_at <= ?)", (now,))
+            for table in ("state_hashes", "state_lists")
+        ] + [("DELETE FROM state_expiry WHERE expires_at <= ? RETURNING key", (now,))]
+
+    def _execute(self, statements) -> list:
+        """
+        Run (sql, parameters) pairs in one write transaction; rows of the last statement.
+        When a sweep is due, expired keys are deleted first in the same transaction.
+        """
+        if self._purge_due():
+            statements = self._purge_statements(time.time()) + list(statements)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = []
+                for sql, parameters in statements:
+                    rows = conn.execute(sql, parameters).fetchall()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def _query(self, sql: str, key: str, parameters=()) -> list:
+        """Read rows for key, treating an expired key as missing (and purging it)"""
+        with self._lock:
+            conn = self._connection()
+            expired = conn.execute(
+                "SELECT 1 FROM state_expiry WHERE key = ? AND expires_at <= ?", (key, time.time())
+            ).fetchone()
+        if expired:
+            self.delete(key)
+            return []
+        with self._lock:
+            return self._connection().execute(sql, (key, *parameters)).fetchall()
+
+    def hget(self, key, field):
+        rows = self._query("SELECT value FROM state_hashes WHERE key = ? AND field = ?", key, (field,))
+        return _decode(rows[0][0]) if rows else None
+
+    def hgetall(self, key):
+        rows = self._query("SELECT field, value FROM state_hashes WHERE key = ?", key)
+        return {field: _decode(value) for field, value in rows}
+
+    @staticmethod
+    def _hset(key, mapping) -> list:
+        sql = ("INSERT INTO state_hashes (key, field, value) VALUES (?, ?, ?) "
+               "ON CONFLICT(key, field) DO UPDATE SET value = excluded.value")
+        return [(sql, (key, field, _encode(value))) for field, value in mapping.items()]
+
+    @staticmethod
+    def _hincrby(key, field, amount=1) -> list:
+        return [(
+            "INSERT INTO state_hashes (key, field, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(key, field) DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value "
+            "RETURNING value",
+            (key, field, amount)
+        )]
+
+    @staticmethod
+    def _push_capped(key, value, maxlen) -> list:
+        return [
+            ("INSERT INTO state_lists (key, seq, value) "
+             "SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM state_lists WHERE key = ?", (key, _encode(value), key)),
+            ("DELETE FROM state_lists WHERE key = ? AND seq <= "
+             "(SELECT MAX(seq) FROM state_lists WHERE key = ?) - ?", (key, key, maxlen)),
+        ]
+
+    @staticmethod
+    def _expire(key, seconds) -> list:
+        return [(
+            "INSERT INTO state_expiry (key, expires_at) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at",
+            (key, time.time() + seconds)
+        )]
+
+    @staticmethod
+    def _delete(*keys) -> list:
+        return [
+            (f"DELETE FROM {table} WHERE key = ?", (key,))
+            for key in keys for table in ("state_hashes", "state_lists", "state_expiry")
+        ]
+
+    def hset(self, key, mapping):
+        self._execute(self._hset(key, mapping))
+
+    def hincrby(self, key, field, amount=1):
+        return int(self._execute(self._hincrby(key, field, amount))[0][0])
+
+    def push_capped(self, key, value, maxlen):
+        self._execute(self._push_capped(key, value, maxlen))
+
+    def lrange(self, key, start=0, stop=-1):
+        rows = self._query("SELECT value FROM state_lists WHERE key = ? ORDER BY seq", key)
+        return _slice([_decode(value) for (value,) in rows], start, stop)
+
+    def expire(self, key, seconds):
+        self._execute(self._expire(key, seconds))
+
+    def delete(self, *keys):
+        self._execute(self._delete(*keys))
+
+    def write_many(self, operations):
+        self._execute([statement for name, args in operations for statement in getattr(self, "_" + name)(*args)])
+
+    def purge_expired(self):
+        self._last_purge = time.time()
+        return len(self._execute(self._purge_statements(self._last_purge)))
+
+
+class LocalRedis:
+    """In-process stand-in for the redis-py commands RedisStateStore uses (decode_responses=True)"""
+
+    def __init__(self):
+        self._store = MemoryStateStore()
+
+    def hget(self, name, key):
+        return self._store.hget(name, key)
+
+    def hgetall(self, name):
+        return self._store.hgetall(name)
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        fields = dict(mapping or {})
+        if key is not None:
+            fields[key] = value
+        self._store.hset(name, {field: str(value) for field, value in fields.items()})
+        return len(fields)
+
+    def hincrby(self, name, key, amount=1):
+        with self._store._lock:
+            self._store._live(name)
+            fields = self._store._hashes.setdefault(name, {})
+            fields[key] = str(int(fields.get(key, 0)) + amount)
+            return int(fields[key])
+
+    def rpush(self, name, *values):
+        with self._store._lock:
+            self._store._live(name)
+            items = self._store._lists.setdefault(name, deque())
+            items.extend(values)
+            return len(items)
+
+    def ltrim(self, name, start, end):
+        with self._store._lock:
+            items = self._store._lists.get(name)
+            if items is not None:
+                self._store._lists[name] = deque(_slice(list(items), start, end))
+        return True
+
+    def lrange(self, name, start, end):
+        return self._store.lrange(name, start, end)
+
+    def expire(self, name, time):
+        self._store.expire(name, time)
+        return True
+
+    def delete(self, *names):
+        self._store.delete(*names)
+        return len(names)
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    """Queues commands and runs them back to back under the store lock, like MULTI/EXEC"""
+
+    def __init__(self, client: LocalRedis):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = []
+        with self.client._store._lock:
+            for name, args, kwargs in self.commands:
+                results.append(getattr(self.client, name)(*args, **kwargs))
+        self.commands = []
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.commands = []
+
+
+class RedisStateStore(StateStore):
+    def __init__(self, client):
+        self.client = client
+
+    def hget(self, key, field):
+        return _decode(self.client.hget(key, field))
+
+    def hgetall(self, key):
+        return {field: _decode(value) for field, value in self.client.hgetall(key).items()}
+
+    def hset(self, key, mapping):
+        self.client.hset(key, mapping={field: _encode(value) for field, value in mapping.items()})
+
+    def hincrby(self, key, field, amount=1):
+        return int(self.client.hincrby(key, field, amount))
+
+    def push_capped(self, key, value, maxlen):
+        self.write_many([("push_capped", (key, value, maxlen))])
+
+    def lrange(self, key, start=0, stop=-1):
+        return [_decode(value) for value in self.client.lrange(key, start, stop)]
+
+    def expire(self, key, seconds):
+        self.client.expire(key, max(1, int(seconds)))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def write_many(self, operations):
+        pipe = self.client.pipeline(transaction=True)
+        for name, args in operations:
+            key, *rest = args
+            if name == "hset":
+                pipe.hset(key, mapping={field: _encode(value) for field, value in rest[0].items()})
+            elif name == "hincrby":
+                pipe.hincrby(key, *rest)
+            elif name == "push_capped":
+                value, maxlen = rest
+                pipe.rpush(key, _encode(value))
+                pipe.ltrim(key, -maxlen, -1)
+            elif name == "expire":
+                pipe.expire(key, max(1, int(rest[0])))
+            elif name == "delete":
+                pipe.delete(key, *rest)
+            else:
+                raise ValueError(f"Unknown state store write '{name}'")
+        pipe.execute()
+
+    def purge_expired(self):
+        return 0  # Redis expires keys itself
+
+
+def open_state_store(backend: str = STATE_BACKEND) -> StateStore:
+    if backend == "memory":
+        return MemoryStateStore()
+    if backend == "sqlite":
+        return SQLiteStateStore()
+    if backend == "redis":
+        if not REDIS_URL:
+            return RedisStateStore(LocalRedis())
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("STATE_BACKEND=redis with REDIS_URL needs the redis package (pip install redis)")
+        return RedisStateStore(redis.Redis.from_url(REDIS_URL, decode_responses=True))
+    raise ValueError(f"Unknown STATE_BACKEND '{backend}'; use memory, sqlite or redis")
+
+
+STATE_STORE = open_state_store()
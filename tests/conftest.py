@@ -0,0 +1,23 @@
+"""
+Offline test setup
+Points every SQLite file at a temporary directory before any app module is imported, so the
+offline tests never touch the stores of a real deployment. test_integration.py ignores this.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="mastercard-tests-")
+for name, filename in [
+    ("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+    ("ANALYSIS_ARTIFACT_PATH", "analysis_artifacts.sqlite3"),
+    ("INGEST_STORE_PATH", "ingested.sqlite3"),
+    ("JOB_QUEUE_PATH", "jobs.sqlite3"),
+    ("STATE_STORE_PATH", "state.sqlite3"),
+]:
+    os.environ[name] = os.path.join(_tmp, filename)
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
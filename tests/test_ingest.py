@@ -0,0 +1,108 @@
+"""
+Offline tests for NDJSON ingestion and the catalog endpoints that serve ingested records
+Runs the app in-process with a TestClient; conftest.py points the record store at a temp file.
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from customer_profiles import get_customer_profile
+from record_store import RecordStore
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+def customer_line(customer_id: str) -> str:
+    customer = dict(get_customer_profile("CUST001"), customer_id=customer_id)
+    return json.dumps(customer) + "\n"
+
+
+class TestIngestion:
+    """Test streaming NDJSON ingestion through /api/ingest"""
+
+    def test_ingest_customers(self, client):
+        """Test valid lines are committed and invalid lines reported by line number"""
+        body = customer_line("CUST-T-INGEST") + '{"customer_id": "CUST-T-BAD"}\n'
+
+        response = client.post("/api/ingest/customers", content=body.encode("utf-8"))
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["accepted"] == 1
+        assert data["rejected"] == 1
+        assert data["errors"][0]["line"] == 2
+        assert client.get("/api/customers/CUST-T-INGEST").json()["customer_id"] == "CUST-T-INGEST"
+
+    def test_existing_ids_are_not_replaced(self, client):
+        """Test built-in, already ingested and repeated ids are rejected"""
+        client.post("/api/ingest/customers", content=customer_line("CUST-T-ONCE").encode("utf-8"))
+        body = customer_line("CUST001") + customer_line("CUST-T-ONCE") + customer_line("CUST-T-NEW") * 2
+
+        data = client.post("/api/ingest/customers", content=body.encode("utf-8")).json()
+
+        assert data["accepted"] == 1
+        assert data["rejected"] == 3
+        errors = {error["line"]: error["error"] for error in data["errors"]}
+        assert "built-in" in errors[1]
+        assert "already exists" in errors[2]
+        assert "repeats line 3" in errors[4]
+
+    def test_unknown_dataset(self, client):
+        """Test an unknown dataset name returns 404"""
+        assert client.post("/api/ingest/merchants", content=b"{}\n").status_code == 404
+
+
+class TestCatalogLists:
+    """Test list endpoints stream ingested records after the built-in ones"""
+
+    def test_ingested_customer_listed(self, client):
+        """Test the customer list includes ingested records and changes its ETag"""
+        before = client.get("/api/customers")
+        client.post("/api/ingest/customers", content=customer_line("CUST-T-LISTED").encode("utf-8"))
+        after = client.get("/api/customers")
+
+        ids = [customer["customer_id"] for customer in after.json()["customers"]]
+        assert "CUST-T-LISTED" in ids
+        assert ids[:len(before.json()["customers"])] == [c["customer_id"] for c in before.json()["customers"]]
+        assert after.headers["etag"] != before.headers["etag"]
+
+        revalidated = client.get("/api/customers", headers={"If-None-Match": after.headers["etag"]})
+        assert revalidated.status_code == 304
+
+    def test_scenario_total_counts_ingested(self, client):
+        """Test the scenario list total covers ingested scenarios"""
+        scenario = client.get("/api/scenarios").json()["scenarios"][0]
+        scenario["id"] = 9001
+        client.post("/api/ingest/scenarios", content=(json.dumps(scenario) + "\n").encode("utf-8"))
+
+        data = client.get("/api/scenarios").json()
+        assert data["total"] == len(data["scenarios"])
+        assert data["scenarios"][-1]["id"] == 9001
+        assert client.post("/api/score-fraud", json={"scenario_id": 9001}).status_code == 200
+
+
+class TestRecordStore:
+    """Test the SQLite record store directly"""
+
+    def test_all_pages_in_insertion_order(self, tmp_path):
+        """Test all() reads every record across pages, oldest first"""
+        table = RecordStore(str(tmp_path / "records.sqlite3")).table("items")
+        table.insert_many((f"k{n}", {"n": n}) for n in range(5))
+
+        assert [record["n"] for record in table.all(page_size=2)] == [0, 1, 2, 3, 4]
+        assert table.version() == (5, 5)
+
+    def test_insert_never_replaces(self, tmp_path):
+        """Test insert_many skips and returns keys that are already stored"""
+        table = RecordStore(str(tmp_path / "records.sqlite3")).table("items")
+        table.insert_many([("a", {"v": 1})])
+
+        assert table.insert_many([("a", {"v": 2}), ("b", {"v": 3})]) == ["a"]
+        assert table.get("a") == {"v": 1}
+        assert len(table) == 2
@@ -3,6 +3,7 @@ Integration tests for Mastercard API
 Tests the actual deployed API at https://mastercardapi-csutherland.azurewebsites.net/
 """
 
+import json
 import requests
 import pytest
 from typing import Dict, Any
@@ -30,6 +31,24 @@ class TestHealthEndpoints:
         assert data["status"] == "running"
         assert "timestamp" in data
         assert "message" in data
+    
+    def test_llm_pool_metrics(self):
+        """Test the LLM connection pool metrics endpoint"""
+        response = requests.get(f"{BASE_URL}/api/llm/pool-metrics")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["max_connections"] > 0
+        assert data["in_flight"] >= 0
+        assert 0 <= data["saturation"]
+    
+    def test_token_usage(self):
+        """Test the per-endpoint token usage and budget endpoint"""
+        response = requests.get(f"{BASE_URL}/api/token-usage")
+        assert response.status_code == 200
+        data = response.json()
+        assert "tokenizer" in data
+        assert data["budgets"]["analyze-fraud"] > 0
+        assert isinstance(data["endpoints"], dict)
 
 
 class TestFraudScenariosAPI:
@@ -68,6 +87,18 @@ class TestFraudScenariosAPI:
         assert "merchant" in scenario["flagged_transaction"]
         assert "location" in scenario["flagged_transaction"]
     
+    def test_scenarios_etag_revalidation(self):
+        """Test that a matching If-None-Match returns 304 with the same ETag"""
+        response = requests.get(f"{BASE_URL}/api/scenarios")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert "max-age" in response.headers["Cache-Control"]
+        
+        revalidated = requests.get(f"{BASE_URL}/api/scenarios", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["ETag"] == etag
+        assert revalidated.content == b""
+    
     def test_analyze_fraud_risk_analyst(self):
         """Test fraud analysis with Risk Analyst audience"""
         payload = {
@@ -122,6 +153,77 @@ class TestFraudScenariosAPI:
         
         response = requests.post(f"{BASE_URL}/api/analyze-fraud", json=payload)
         assert response.status_code == 404
+    
+    def test_score_fraud(self):
+        """Test local rule-based fraud scoring"""
+        response = requests.post(f"{BASE_URL}/api/score-fraud", json={"scenario_id": 0})
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["scenario_id"] == 0
+        assert 0 <= data["score"] <= 100
+        assert data["rating"] in ["Low", "Medium", "High", "Critical"]
+        assert len(data["signals"]) > 0
+    
+    def test_scenario_geo_velocity(self):
+        """Test geographic velocity over a scenario's transaction history"""
+        response = requests.get(f"{BASE_URL}/api/scenarios/0/geo-velocity")
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["scenario_id"] == 0
+        assert isinstance(data["impossible_travel"], bool)
+        for segment in data["segments"]:
+            assert segment["distance_km"] >= 0
+            assert "speed_kmh" in segment
+    
+    def test_score_transactions_csv(self):
+        """Test vectorized scoring of a CSV transaction upload"""
+        csv_body = (
+            "transaction_id,card_id,timestamp,amount,country,home_country,typical_monthly_spend\n"
+            "T1,C1,2024-12-30T21:00:00Z,45.23,US,US,2840.50\n"
+            "T2,C1,2024-12-30T23:47:12Z,4599.99,JP,US,2840.50\n"
+        )
+        
+        response = requests.post(
+            f"{BASE_URL}/api/score-transactions",
+            data=csv_body,
+            headers={"Content-Type": "text/csv"}
+        )
+        assert response.status_code == 200
+        
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        results, summary = lines[:-1], lines[-1]
+        
+        assert [result["transaction_id"] for result in results] == ["T1", "T2"]
+        assert results[1]["cross_border"] is True
+        assert results[1]["score"] > results[0]["score"]
+        assert summary["type"] == "summary"
+        assert summary["transactions"] == 2
+    
+    def test_analyze_fraud_batch(self):
+        """Test batch fraud analysis streams one NDJSON line per item plus a summary"""
+        payload = {
+            "scenario_ids": [1, 9999],
+            "audiences": ["Risk Analyst", "Executive Summary"],
+            "concurrency": 2
+        }
+        
+        response = requests.post(f"{BASE_URL}/api/analyze-fraud/batch", json=payload)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        results = [line for line in lines if line["type"] == "result"]
+        summary = lines[-1]
+        
+        assert len(results) == 4
+        assert sorted(result["index"] for result in results) == [0, 1, 2, 3]
+        assert all(result["status"] == "ok" for result in results if result["scenario_id"] == 1)
+        assert all(result["status_code"] == 404 for result in results if result["scenario_id"] == 9999)
+        assert summary["type"] == "summary"
+        assert summary["total"] == 4
+        assert summary["failed"] == 2
 
 
 class TestMerchantAPI:
@@ -158,6 +260,30 @@ class TestMerchantAPI:
         assert isinstance(data["monthly_data"], list)
         assert len(data["monthly_data"]) == 12
     
+    def test_get_merchant_stats(self):
+        """Test vectorized KPI analytics for a merchant"""
+        response = requests.get(f"{BASE_URL}/api/merchants/weekend_warrior/stats", params={"window": 3})
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert len(data["months"]) == 12
+        assert data["window"] == 3
+        assert data["growth_pct"]["revenue"][0] is None
+        assert len(data["rolling_mean"]["revenue"]) == 12
+        assert data["correlations"]["revenue"]["revenue"] == 1.0
+    
+    def test_get_merchant_anomalies(self):
+        """Test ranked KPI anomaly findings for a merchant"""
+        response = requests.get(f"{BASE_URL}/api/merchants/seasonal_pivot/anomalies")
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert len(data["findings"]) > 0
+        scores = [finding["score"] for finding in data["findings"]]
+        assert scores == sorted(scores, reverse=True)
+        assert data["findings"][0]["kind"] in ("outlier", "changepoint")
+        assert "terminal_latency_ms" in data["by_metric"]
+    
     def test_generate_merchant_narrative(self):
         """Test merchant narrative generation"""
         merchants_response = requests.get(f"{BASE_URL}/api/merchants")
@@ -214,6 +340,18 @@ class TestCustomerAPI:
         assert "card_type" in data or "current_card" in data
         assert "spending_behavior" in data or "spending_patterns" in data or "monthly_spend" in data
     
+    def test_search_customers_by_card_type(self):
+        """Test filtering customers through the card_type index"""
+        customers = requests.get(f"{BASE_URL}/api/customers").json()["customers"]
+        card_type = customers[0]["card_type"]
+        
+        response = requests.get(f"{BASE_URL}/api/customers/search", params={"card_type": card_type})
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert len(data["customers"]) > 0
+        assert all(customer["card_type"] == card_type for customer in data["customers"])
+    
     def test_analyze_customer_upgrade_executive(self):
         """Test customer upgrade analysis in Executive mode"""
         customers_response = requests.get(f"{BASE_URL}/api/customers")
@@ -288,6 +426,16 @@ class TestDisputeAPI:
         assert "merchant_evidence" in data
         assert "status" in data
     
+    def test_search_disputes_by_claim_and_status(self):
+        """Test filtering disputes through the customer_claim and status indexes"""
+        dispute = requests.get(f"{BASE_URL}/api/disputes").json()["disputes"][0]
+        params = {"customer_claim": dispute["customer_claim"], "status": dispute["status"]}
+        
+        response = requests.get(f"{BASE_URL}/api/disputes/search", params=params)
+        assert response.status_code == 200
+        case_ids = [case["case_id"] for case in response.json()["disputes"]]
+        assert dispute["case_id"] in case_ids
+    
     def test_analyze_dispute(self):
         """Test dispute forensic analysis"""
         disputes_response = requests.get(f"{BASE_URL}/api/disputes")
@@ -305,6 +453,40 @@ class TestDisputeAPI:
         assert "case_id" in data
         assert len(data["analysis"]) > 0
     
+    def test_analyze_dispute_stream(self):
+        """Test dispute analysis streamed as server-sent events"""
+        disputes_response = requests.get(f"{BASE_URL}/api/disputes")
+        case_id = disputes_response.json()["disputes"][0]["case_id"]
+        
+        response = requests.post(f"{BASE_URL}/api/analyze-dispute/stream", json={"case_id": case_id})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        
+        body = response.text
+        assert "event: token" in body
+        assert "event: done" in body
+        assert case_id in body.split("event: done")[-1]
+    
+    def test_dispute_triage_job(self):
+        """Test queueing a dispute triage job and polling it"""
+        response = requests.post(f"{BASE_URL}/api/jobs", json={"status": "Under Investigation"})
+        assert response.status_code == 202
+        job = response.json()
+        
+        assert job["kind"] == "dispute-triage"
+        assert job["total"] > 0
+        
+        poll_response = requests.get(f"{BASE_URL}/api/jobs/{job['job_id']}", params={"include_items": True})
+        assert poll_response.status_code == 200
+        data = poll_response.json()
+        
+        assert data["job_id"] == job["job_id"]
+        assert len(data["items"]) == data["total"]
+        assert data["pending"] + data["running"] + data["completed"] + data["failed"] == data["total"]
+        
+        progress = requests.get(f"{BASE_URL}/api/jobs/{job['job_id']}").json()
+        assert progress["items"] == []
+    
     def test_dispute_not_found(self):
         """Test analyzing non-existent dispute"""
         payload = {"case_id": "invalid-case-id"}
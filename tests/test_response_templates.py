@@ -0,0 +1,81 @@
+"""
+Offline tests for templated virtual agent replies
+Template selection and the reasons a turn falls back to the LLM; no completion is requested.
+"""
+
+import pytest
+
+import response_templates
+from response_templates import reply, template_key
+from virtual_agent import DEMO_ACCOUNT
+
+
+@pytest.fixture(autouse=True)
+def metrics(monkeypatch):
+    """Fresh fast-path counters for every test"""
+    monkeypatch.setattr(response_templates, "_by_intent", {})
+    monkeypatch.setattr(response_templates, "_fallbacks", {})
+    monkeypatch.setattr(response_templates, "VIRTUAL_AGENT_TEMPLATES", True)
+
+
+class TestTemplateKey:
+    """Test which template (if any) answers a turn"""
+
+    @pytest.mark.parametrize("intent, message, new_status, previous_intent, expected", [
+        ("check_balance", "What's my balance?", None, None, "check_balance"),
+        ("check_balance", "balance please", None, None, "check_balance"),
+        ("check_balance", "why is my balance so high?", None, None, None),
+        ("freeze_card", "Please freeze my card", "frozen", None, "freeze"),
+        ("freeze_card", "unlock my card", "active", None, "unfreeze"),
+        ("freeze_card", "is my card frozen?", None, None, None),
+        ("freeze_card", "I lost my wallet so freeze it", "frozen", None, None),
+        ("lost_card", "I lost my card", None, None, "lost_card"),
+        ("lost_card", "report my card stolen", None, None, "lost_card"),
+        ("lost_card", "I didn't lose my card", None, None, None),
+        ("lost_card", "was my card reported stolen?", None, None, None),
+        ("lost_card", "confirm", "lost_stolen", "lost_card", "lost_card_confirmed"),
+        ("lost_card", "confirm", "lost_stolen", "check_balance", None),
+        ("lost_card", "confirm", None, None, None),
+        ("dispute", "I want to dispute a charge", None, None, None),
+    ])
+    def test_selection(self, intent, message, new_status, previous_intent, expected):
+        assert template_key(intent, message, new_status, previous_intent) == expected
+
+
+class TestReply:
+    """Test templated replies and fallback reasons"""
+
+    def test_balance_reply_uses_account_facts(self):
+        text, reason = reply("check_balance", "neutral", 0.99, "what is my balance", None, None, DEMO_ACCOUNT)
+        assert reason is None
+        assert DEMO_ACCOUNT["balance"] in text
+
+    def test_lost_card_reply_is_empathetic(self):
+        """Test a lost card report gets an empathy opener even at neutral sentiment"""
+        text, _ = reply("lost_card", "neutral", 0.99, "my card was stolen", None, None, DEMO_ACCOUNT)
+        assert any(text.startswith(opener) for opener in response_templates.EMPATHY["negative"])
+
+    @pytest.mark.parametrize("intent, message, new_status, confidence, expected", [
+        ("dispute", "I want to dispute a charge", None, 0.99, "free_form"),
+        ("freeze_card", "do not freeze my card", None, 0.99, "negation"),
+        ("freeze_card", "is my card frozen?", None, 0.99, "question"),
+        ("freeze_card", "my card should be frozen", None, 0.99, "not_command"),
+        ("check_balance", "show my balance and my last payments", None, 0.99, "not_command"),
+        ("freeze_card", "please freeze my card right now " + "because " * 12, "frozen", 0.99, "long_message"),
+        ("freeze_card", "freeze my card", "frozen", 0.5, "low_confidence"),
+    ])
+    def test_fallback_reasons(self, intent, message, new_status, confidence, expected):
+        assert reply(intent, "neutral", confidence, message, new_status, None, DEMO_ACCOUNT) == (None, expected)
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(response_templates, "VIRTUAL_AGENT_TEMPLATES", False)
+        assert reply("check_balance", "neutral", 0.99, "balance", None, None, DEMO_ACCOUNT) == (None, "disabled")
+
+    def test_metrics(self):
+        """Test template and LLM turns are counted per intent along with fallback reasons"""
+        reply("check_balance", "neutral", 0.99, "my balance", None, None, DEMO_ACCOUNT)
+        reply("check_balance", "neutral", 0.99, "why is my balance so high?", None, None, DEMO_ACCOUNT)
+        metrics = response_templates.get_fast_path_metrics()
+        assert metrics["by_intent"] == {"check_balance": {"template": 1, "llm": 1}}
+        assert metrics["fallbacks"] == {"question": 1}
+        assert metrics["hit_rate"] == 0.5
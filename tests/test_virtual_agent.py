@@ -0,0 +1,264 @@
+"""
+Offline unit tests for the virtual agent's classification and session state
+No network, no OpenAI calls: the keyword matcher, the local intent model and the session store
+(on MemoryStateStore) are exercised directly.
+"""
+
+import pytest
+
+import state_store
+import virtual_agent
+from intent_model import IntentModel, features, train
+from keyword_matcher import KeywordMatcher, trie_pattern
+from sessions import ChatSessions
+from state_store import MemoryStateStore
+from virtual_agent import classify, keyword_classify
+
+
+TRAINING_EXAMPLES = [
+    {"text": text, "intent": intent, "sentiment": sentiment}
+    for intent, sentiment, texts in [
+        ("check_balance", "neutral", ["what is my balance", "how much do I owe", "show my balance please",
+                                      "balance check", "what do I owe this month"]),
+        ("freeze_card", "neutral", ["freeze my card", "please lock my card", "put a freeze on the card",
+                                    "lock the card now", "freeze it please"]),
+        ("off_topic", "positive", ["tell me a joke", "what's the weather like", "who won the game",
+                                   "recommend a movie", "what's your favorite color"]),
+    ]
+    for text in texts
+]
+
+
+@pytest.fixture(scope="module")
+def trained():
+    """A small model trained on TRAINING_EXAMPLES"""
+    model, report = train(TRAINING_EXAMPLES, folds=3, buckets=2 ** 12)
+    assert report["examples"] == len(TRAINING_EXAMPLES)
+    return model
+
+
+class TestKeywordMatcher:
+    """Test the compiled keyword matcher"""
+
+    @pytest.fixture
+    def matcher(self):
+        return KeywordMatcher({
+            "intent": [("dispute", ["charge"]), ("lost_card", ["lost", "lost my card"]), ("activate", ["activate"])],
+            "sentiment": [("positive", ["thank"])],
+        })
+
+    @pytest.mark.parametrize("message", ["charges", "charged", "activated", "activates", "thanking you"])
+    def test_inflections_match(self, matcher, message):
+        """Test plural and verb inflections of a keyword are matched"""
+        assert matcher.scan(message)
+
+    @pytest.mark.parametrize("message", ["recharge my phone", "chargeback", "glossy finish", "deactivate"])
+    def test_word_boundaries(self, matcher, message):
+        """Test keywords do not fire inside longer words"""
+        assert matcher.scan(message) == frozenset()
+
+    def test_phrase_carries_contained_labels(self, matcher):
+        """Test a longer phrase also counts as the keywords inside it"""
+        found = matcher.scan("I LOST MY CARD, thanks")
+        assert ("intent", "lost_card") in found
+        assert ("sentiment", "positive") in found
+
+    def test_first_respects_priority(self, matcher):
+        """Test first() returns the highest-priority label of a table"""
+        found = matcher.scan("I lost my card and there is a charge")
+        assert matcher.first(found, "intent") == "dispute"
+        assert matcher.first(found, "sentiment") is None
+
+    def test_trie_pattern_matches_exactly_the_words(self):
+        """Test the trie-factored alternation matches the words and nothing else"""
+        import re
+        pattern = re.compile(trie_pattern(["lock", "lost", "lo"]) + "$")
+        assert all(pattern.match(word) for word in ["lock", "lost", "lo"])
+        assert not any(pattern.match(word) for word in ["l", "loc", "lose"])
+
+
+class TestKeywordClassify:
+    """Test the sentiment, intent and off-topic scan over the agent's keyword tables"""
+
+    @pytest.mark.parametrize("message, expected", [
+        ("What's my balance?", ("neutral", "check_balance", False)),
+        ("This is ridiculous, my card was stolen", ("frustrated", "lost_card", False)),
+        ("Thanks, please freeze my card", ("positive", "freeze_card", False)),
+        ("Tell me a joke", ("neutral", "general_inquiry", True)),
+        ("hello", ("neutral", "general_inquiry", False)),
+    ])
+    def test_messages(self, message, expected):
+        assert keyword_classify(message) == expected
+
+    def test_legacy_helpers_agree(self):
+        """Test the single-purpose helpers give the same answers as the combined scan"""
+        message = "I'm upset about a charge I didn't make"
+        sentiment, intent, off_topic = keyword_classify(message)
+        assert virtual_agent.detect_sentiment(message) == sentiment == "frustrated"
+        assert virtual_agent.detect_intent(message) == intent == "dispute"
+        assert virtual_agent.is_off_topic(message) is off_topic is False
+
+
+class TestIntentModel:
+    """Test the hashed n-gram classifier and how classify() combines it with the keywords"""
+
+    def test_features_are_normalized(self):
+        """Test hashed features are unique buckets with unit L2 norm"""
+        indices, values = features("freeze freeze my card", buckets=2 ** 12)
+        assert len(set(indices.tolist())) == len(indices)
+        assert abs(float((values ** 2).sum()) - 1.0) < 1e-5
+        assert len(features("")[0]) == 0
+
+    def test_predicts_training_labels(self, trained):
+        """Test the trained heads recover the labels of their own training messages"""
+        assert trained.predict("freeze my card")["intent"][0] == "freeze_card"
+        assert trained.predict("what is my balance")["intent"][0] == "check_balance"
+        label, confidence = trained.predict("tell me a joke")["intent"]
+        assert label == "off_topic" and 0 < confidence <= 1
+
+    def test_save_and_load(self, trained, tmp_path):
+        """Test a saved model loads back with identical predictions"""
+        path = str(tmp_path / "model.npz")
+        trained.save(path)
+        loaded = IntentModel.load(path)
+        assert loaded.predict("lock the card") == trained.predict("lock the card")
+
+    def test_classify_without_model_uses_keywords(self, monkeypatch):
+        """Test classify() falls back to the keyword scan when no model is built"""
+        monkeypatch.setattr(virtual_agent, "INTENT_MODEL", None)
+        assert classify("what's my balance") == ("neutral", "check_balance", False, None, "check_balance")
+
+    def test_classify_with_model(self, trained, monkeypatch):
+        """Test classify() reports the model's probability for the intent it returns"""
+        monkeypatch.setattr(virtual_agent, "INTENT_MODEL", trained)
+        monkeypatch.setattr(virtual_agent, "INTENT_MODEL_MIN_CONFIDENCE", 0.0)
+        result = classify("what is my balance")
+        assert result.intent == "check_balance"
+        assert result.confidence == round(trained.probabilities("what is my balance")["intent"]["check_balance"], 3)
+
+    def test_keywords_win_below_threshold(self, trained, monkeypatch):
+        """Test the keyword intent is kept, with the model's probability for it, when the model is unsure"""
+        monkeypatch.setattr(virtual_agent, "INTENT_MODEL", trained)
+        monkeypatch.setattr(virtual_agent, "INTENT_MODEL_MIN_CONFIDENCE", 1.01)
+        result = classify("lock the balance")
+        assert result.intent == result.keyword_intent == "check_balance"
+        assert result.confidence == round(trained.probabilities("lock the balance")["intent"]["check_balance"], 3)
+
+    def test_min_confidence_reaches_target_precision(self):
+        """Test the calibrated threshold is a probability and the training report carries it"""
+        _, report = train(TRAINING_EXAMPLES, folds=3, buckets=2 ** 12)
+        assert 0 < report["intent"]["min_confidence"] <= 1
+        assert 0 <= report["intent"]["held_out_coverage"] <= 1
+
+
+class TestCardUpdate:
+    """Test card status changes need an unambiguous request, whatever the model says"""
+
+    @staticmethod
+    def update(message, intent, keyword_intent="general_inquiry", previous_intent=None):
+        classification = virtual_agent.Classification("neutral", intent, False, 0.99, keyword_intent)
+        return virtual_agent.card_update(message, classification, previous_intent)
+
+    @pytest.mark.parametrize("message, expected", [
+        ("freeze my card", "frozen"),
+        ("Please unfreeze my card", "active"),
+        ("can you lock my card?", "frozen"),
+        ("I want to freeze my card", "frozen"),
+    ])
+    def test_commands(self, message, expected):
+        assert self.update(message, "freeze_card") == expected
+
+    def test_keyword_statement(self):
+        """Test a statement the keyword matcher also reads as freeze_card changes the card"""
+        assert self.update("I lost my wallet so freeze it", "freeze_card", "freeze_card") == "frozen"
+
+    @pytest.mark.parametrize("message", [
+        "is my card frozen?", "why is my card locked", "do not freeze my card", "please don't lock it",
+    ])
+    def test_questions_and_negations(self, message):
+        assert self.update(message, "freeze_card", "freeze_card") is None
+
+    def test_model_label_alone(self):
+        """Test a model-only freeze_card label on a statement changes nothing"""
+        assert self.update("my card situation", "freeze_card") is None
+
+    def test_lost_card_confirmation_needs_previous_intent(self):
+        assert self.update("confirm", "lost_card", previous_intent="lost_card") == "lost_stolen"
+        assert self.update("Yes, I confirm", "general_inquiry", previous_intent="lost_card") == "lost_stolen"
+        assert self.update("confirm", "lost_card") is None
+        assert self.update("confirm", "lost_card", previous_intent="check_balance") is None
+        assert self.update("I do not confirm", "lost_card", previous_intent="lost_card") is None
+
+
+class TestChatSessions:
+    """Test session buffering, counters and expiry on the in-memory state store"""
+
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        now = [1_000_000.0]
+        monkeypatch.setattr(state_store.time, "time", lambda: now[0])
+        return now
+
+    @pytest.fixture
+    def sessions(self):
+        return ChatSessions(MemoryStateStore(), max_turns=4, ttl_seconds=60)
+
+    def test_turns_are_capped(self, sessions):
+        """Test only the last max_turns messages are buffered, while counters keep the full totals"""
+        session = sessions.start()
+        for n in range(3):
+            sessions.record_turn(session, f"message {n}", "neutral", False, f"reply {n}")
+        sessions.record_turn(session, "tell me a joke", "positive", True, "I'm here for Mastercard")
+
+        stored = sessions.get(session.session_id)
+        assert [turn["content"] for turn in stored.turns] == ["message 2", "reply 2", "tell me a joke", "I'm here for Mastercard"]
+        assert stored.turn_count == 4
+        assert stored.off_topic_count == 1
+        assert stored.sentiment_counts == {"neutral": 3, "off_topic": 1}
+        assert stored.sentiment_trajectory == ["neutral", "off_topic"]
+        assert stored.history(2) == ["user: tell me a joke", "assistant: I'm here for Mastercard"]
+
+    def test_last_intent(self, sessions):
+        """Test the latest recorded user intent is available to the next turn"""
+        session = sessions.start([{"role": "user", "content": "my card is lost", "intent": "lost_card"}])
+        assert sessions.get(session.session_id).last_intent == "lost_card"
+        sessions.record_turn(session, "balance?", "neutral", False, "Your balance is ...", "check_balance")
+        assert sessions.get(session.session_id).last_intent == "check_balance"
+
+    def test_seeded_from_history(self, sessions):
+        """Test a session started with a client transcript keeps its turns and counts"""
+        session = sessions.start([
+            {"role": "user", "content": "hi", "sentiment": "neutral"},
+            {"role": "assistant", "content": "hello"},
+            {"role": "user", "content": "weather?", "sentiment": "off_topic"},
+        ])
+        stored = sessions.get(session.session_id)
+        assert len(stored.turns) == 3
+        assert stored.turn_count == 2
+        assert stored.off_topic_count == 1
+
+    def test_idle_session_expires(self, sessions, clock):
+        """Test a session expires after the TTL and each turn extends it"""
+        session = sessions.start()
+        clock[0] += 50
+        sessions.record_turn(session, "balance", "neutral", False, "Your balance is ...")
+        clock[0] += 50
+        assert sessions.get(session.session_id) is not None
+        clock[0] += 11
+        assert sessions.get(session.session_id) is None
+
+    def test_expired_keys_are_purged_on_write(self, clock, monkeypatch):
+        """Test a write sweeps expired sessions that are never read again"""
+        monkeypatch.setattr(state_store, "STATE_PURGE_INTERVAL", 0)
+        store = MemoryStateStore()
+        sessions = ChatSessions(store, ttl_seconds=60)
+        session = sessions.start()
+        sessions.record_turn(session, "hi", "neutral", False, "hello")
+        clock[0] += 61
+        sessions.start()
+        assert all(session.session_id not in key for key in [*store._hashes, *store._lists])
+
+    def test_end(self, sessions):
+        session = sessions.start()
+        sessions.end(session.session_id)
+        assert sessions.get(session.session_id) is None
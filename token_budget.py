@@ -0,0 +1,183 @@
+"""
+Prompt token budgets
+Prompts are counted locally (see prompt_encoding.count_tokens) before a completion is sent.
+When a prompt exceeds its endpoint's budget, reducers shrink the record's lowest-priority fields
+one step at a time until it fits; a prompt that still does not fit is rejected with 413.
+How many steps a record needed (and its token count) is remembered per
+(template version, record id), so repeat requests skip the counting.
+Per-endpoint token usage, local estimates and the API's reported usage alike, is kept for
+/api/token-usage.
+"""
+
+import copy
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+from prompt_encoding import DEFAULT_MODEL, count_tokens, tokenizer_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGETS = {
+    "analyze-fraud": 3000,
+    "merchant-narrative": 3000,
+    "customer-upgrade": 2500,
+    "analyze-dispute": 2500,
+    "virtual-agent": 2000,
+    "test-prompt": 4000,
+    "test-connection": 100,
+}
+
+# Chat formatting overhead per message and per reply, as documented for the GPT chat models
+_TOKENS_PER_MESSAGE = 3
+_TOKENS_PER_REPLY = 3
+
+
+def budget_for(endpoint: str) -> int:
+    """Prompt token budget for an endpoint; override with TOKEN_BUDGET_<ENDPOINT>, e.g. TOKEN_BUDGET_ANALYZE_FRAUD"""
+    env_name = "TOKEN_BUDGET_" + endpoint.upper().replace("-", "_")
+    return int(os.getenv(env_name, DEFAULT_BUDGETS.get(endpoint, 4000)))
+
+
+def message_tokens(messages: List[dict], model: str = DEFAULT_MODEL) -> int:
+    return _TOKENS_PER_REPLY + sum(
+        _TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "", model) for message in messages
+    )
+
+
+# Reducers: each returns a smaller copy of the record and ignores paths the record does not have
+
+def _parent(record: dict, path: str):
+    *parents, leaf = path.split(".")
+    node = record
+    for name in parents:
+        node = node.get(name) if isinstance(node, dict) else None
+    return (node, leaf) if isinstance(node, dict) and leaf in node else (None, leaf)
+
+
+def keep_last(path: str, count: int) -> Callable[[dict], dict]:
+    """Keep only the last `count` items of a list field"""
+    def reduce(record: dict) -> dict:
+        node, leaf = _parent(record, path)
+        if node is not None and isinstance(node[leaf], list):
+            node[leaf] = node[leaf][-count:] if count else []
+        return record
+    return reduce
+
+
+def drop(path: str) -> Callable[[dict], dict]:
+    """Remove a field"""
+    def reduce(record: dict) -> dict:
+        node, leaf = _parent(record, path)
+        if node is not None:
+            del node[leaf]
+        return record
+    return reduce
+
+
+def clip_text(path: str, max_chars: int) -> Callable[[dict], dict]:
+    """Shorten a text field to max_chars, marking the cut"""
+    def reduce(record: dict) -> dict:
+        node, leaf = _parent(record, path)
+        if node is not None and isinstance(node[leaf], str) and len(node[leaf]) > max_chars:
+            node[leaf] = node[leaf][:max_chars].rstrip() + " [...]"
+        return record
+    return reduce
+
+
+def _empty_usage() -> dict:
+    return {
+        "prompts": 0,
+        "prompt_tokens_estimated": 0,
+        "reduced_prompts": 0,
+        "rejected_prompts": 0,
+        "api_calls": 0,
+        "cached_responses": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0
+    }
+
+
+_usage: Dict[str, dict] = {}
+
+
+def _endpoint_usage(endpoint: str) -> dict:
+    return _usage.setdefault(endpoint, _empty_usage())
+
+
+def record_completion(endpoint: str, completion) -> None:
+    """Add a finished completion's usage: reported tokens for API calls, a count for cache/artifact hits"""
+    usage = _endpoint_usage(endpoint)
+    if completion.cache_status in ("HIT", "ARTIFACT"):
+        usage["cached_responses"] += 1
+        return
+    usage["api_calls"] += 1
+    for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        usage[field] += completion.usage.get(field, 0) if completion.usage else 0
+
+
+def get_token_usage() -> dict:
+    return {
+        "tokenizer": tokenizer_name(),
+        "budgets": {endpoint: budget_for(endpoint) for endpoint in sorted(set(DEFAULT_BUDGETS) | set(_usage))},
+        "endpoints": {endpoint: dict(usage) for endpoint, usage in sorted(_usage.items())}
+    }
+
+
+class PromptBudget:
+    def __init__(self, template_version: str):
+        self.template_version = template_version
+        self._fitted = {}  # (template version, endpoint, model, record id) -> (reducer steps, prompt tokens)
+
+    def fit(self, endpoint: str, record_id: Optional[str], record, build: Callable[..., dict],
+            reducers: Sequence[Callable[[dict], dict]] = (), model: str = DEFAULT_MODEL) -> dict:
+        """
+        Return build(record) completion arguments whose messages fit the endpoint budget,
+        applying reducers (lowest priority first) to a copy of the record as needed.
+        Tokens are counted with the tokenizer of the model the prompt is sent to.
+        record_id None disables the per-record cache (e.g. free-form chat input).
+        """
+        usage = _endpoint_usage(endpoint)
+        usage["prompts"] += 1
+        key = (self.template_version, endpoint, model, record_id)
+        known = self._fitted.get(key) if record_id is not None else None
+        if known is not None:
+            steps, tokens = known
+            completion = build(self._reduce(record, reducers[:steps]))
+        else:
+            steps, tokens, completion = self._fit(endpoint, record, build, reducers, model)
+            if record_id is not None:
+                self._fitted[key] = (steps, tokens)
+
+        usage["prompt_tokens_estimated"] += tokens
+        if steps:
+            usage["reduced_prompts"] += 1
+        return completion
+
+    def _fit(self, endpoint, record, build, reducers, model):
+        budget = budget_for(endpoint)
+        reduced = record
+        for steps in range(len(reducers) + 1):
+            if steps:
+                reduced = reducers[steps - 1](copy.deepcopy(reduced))
+            completion = build(reduced)
+            tokens = message_tokens(completion["messages"], model)
+            if tokens <= budget:
+                if steps:
+                    logger.info("%s prompt reduced with %d step(s) to %d tokens", endpoint, steps, tokens)
+                return steps, tokens, completion
+
+        _endpoint_usage(endpoint)["rejected_prompts"] += 1
+        raise HTTPException(
+            status_code=413,
+            detail=f"Prompt needs {tokens} tokens, over the {budget}-token budget for {endpoint}"
+        )
+
+    @staticmethod
+    def _reduce(record, reducers):
+        for reduce in reducers:
+            record = reduce(copy.deepcopy(record))
+        return record
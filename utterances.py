@@ -0,0 +1,33 @@
+"""
+Phrasing of virtual agent messages
+Regexes over a lower-cased message telling an explicit request ("please freeze my card",
+"what's my balance", "report my card stolen") from a question or a negation ("is my card
+frozen?", "do not freeze my card"). Card updates and templated replies act only on the former.
+"""
+
+import re
+
+_CARD_VERB = r"(?:freeze|unfreeze|lock|unlock|block|disable|turn off|report|confirm)"
+_POLITE = (
+    r"^\W*(?:(?:ok|okay|yes|yeah|hi|hello)\W+)?"
+    r"(?:please\s+|(?:can|could|would|will) you\s+(?:please\s+)?|i(?:'d| would)? (?:want|need|like) (?:you )?to\s+)?"
+)
+
+# "freeze my card", "could you please unlock it", "I'd like to freeze my card"
+CARD_COMMAND = re.compile(_POLITE + r"(?P<verb>freeze|unfreeze|lock|unlock|block|disable|turn off)\b")
+# "report my card stolen", "I lost my card", "my card was stolen"
+LOST_CARD_REPORT = re.compile(
+    _POLITE + r"(?:report\b|i(?:'ve| have)? (?:just )?lost\b"
+    r"|(?:my|the) (?:credit |master)?card (?:is|was|has been|got) (?:lost|stolen)|(?:someone|somebody) stole\b)"
+)
+# "what's my balance", "show me my current balance", "balance please"
+BALANCE_REQUEST = re.compile(
+    _POLITE + r"(?:(?:what(?:'s| is)|show|tell|give|get|check)\s+(?:me\s+)?)?(?:my\s+)?(?:current\s+|account\s+)?"
+    r"balance(?:\s+please)?\W*$"
+)
+CONFIRMATION = re.compile(r"^\W*(?:(?:yes|yeah|ok|okay)\W+)?(?:i\s+)?confirm(?:ed)?\b")
+
+NEGATION = re.compile(r"\b(?:not|never|no|dont|\w+n't)\b")
+# A negation within a few words before a card action: "do not freeze", "don't want you to lock"
+NEGATED_ACTION = re.compile(r"\b(?:not|never|dont|\w+n't)\b(?:\W+\w+){0,3}?\W+" + _CARD_VERB + r"\b")
+QUESTION = re.compile(r"\?\s*$|^\W*(?:is|are|was|were|am|do|does|did|has|have|why|what|when|where|how|which|who)\b")
@@ -3,28 +3,120 @@ Virtual Agent endpoints for Mastercard Contact Center
 Handles authentication, chat, and customer support capabilities
 """
 
+import os
+import re
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
 from fastapi import HTTPException
-import openai
+from starlette.concurrency import run_in_threadpool
+import response_templates
+from intent_model import load_model
+from keyword_matcher import KeywordMatcher
+from llm_gateway import chat_completion, require_openai_api_key
+from sessions import CHAT_SESSIONS
+from state_store import STATE_STORE
+from token_budget import PromptBudget, clip_text, keep_last
+from utterances import CARD_COMMAND, CONFIRMATION, NEGATED_ACTION, QUESTION
 from models import (
     AuthenticationRequest, AuthenticationResponse,
     VirtualAgentChatRequest, VirtualAgentChatResponse,
-    CapabilitiesResponse
+    CapabilitiesResponse, ChatSessionResponse
 )
 
 def get_api_key():
-    """Import API key from main module"""
-    from main import require_openai_api_key
+    """The configured OpenAI API key (500 if missing)"""
     return require_openai_api_key()
 
-# Card state tracking (in-memory for demo purposes)
-card_state = {
-    "card_1115": {
-        "status": "active",  # active, frozen, lost_stolen, deactivated
-        "last_updated": None
-    }
+CHAT_MODEL = "gpt-4o"
+
+# Chat turns are free-form, so budgets are enforced per request without the per-record cache
+chat_budget = PromptBudget(template_version="virtual-agent")
+CHAT_REDUCERS = [
+    keep_last("history", 2),
+    keep_last("history", 0),
+    clip_text("message", 2000),
+]
+
+# Card state lives in the shared state store so every worker sees the same status
+CARD_STATUSES = ("active", "frozen", "lost_stolen", "deactivated")
+DEMO_CARD_ID = "card_1115"
+
+# Account facts shared by the system prompt and the templated replies
+DEMO_ACCOUNT = {
+    "card_last4": "1115",
+    "balance": "$16,475.00",
+    "minimum_payment": "$403.32",
+    "next_payment_date": "January 29th, 2026",
+    "replacement_days": "48 hours",
 }
 
 
+def get_card_state(card_id: str) -> dict:
+    """Status and last update of a card; cards never updated are active"""
+    state = STATE_STORE.hgetall(f"card:{card_id}")
+    return {"status": state.get("status", "active"), "last_updated": state.get("last_updated")}
+
+
+def set_card_status(card_id: str, status: str):
+    if status not in CARD_STATUSES:
+        raise ValueError(f"Unknown card status '{status}'")
+    STATE_STORE.hset(f"card:{card_id}", {
+        "status": status,
+        "last_updated": datetime.now(timezone.utc).isoformat()
+    })
+
+
+# Keyword tables, highest priority first within each table
+SENTIMENT_KEYWORDS = [
+    ("frustrated", ["angry", "upset", "frustrated", "terrible", "awful",
+                    "horrible", "worst", "ridiculous", "unacceptable"]),
+    ("negative", ["problem", "issue", "error", "wrong", "not working",
+                  "help", "lost", "stolen"]),
+    ("positive", ["thank", "thanks", "great", "good", "perfect",
+                  "excellent", "appreciate"]),
+]
+
+INTENT_KEYWORDS = [
+    ("check_balance", ["balance", "how much", "account balance"]),
+    ("lost_card", ["lost", "stolen", "missing card", "lost my card", "lost wallet"]),
+    ("freeze_card", ["freeze", "unfreeze", "lock", "unlock", "disable", "turn off"]),
+    ("dispute", ["dispute", "charge", "transaction", "didn't make", "unauthorized"]),
+    ("new_card", ["new card", "replacement", "replace card"]),
+    ("rewards", ["rewards", "points", "cashback", "cash back"]),
+    ("travel", ["travel", "abroad", "overseas", "international"]),
+    ("activate", ["activate", "activation"]),
+    ("live_agent", ["agent", "human", "person", "representative", "speak to someone"]),
+    ("address", ["address", "billing address", "update address"]),
+]
+
+OFF_TOPIC_KEYWORDS = [
+    ("off_topic", ["weather", "joke", "tell me a joke", "how are you", "what's your name",
+                   "where do you live", "personal life", "hobby", "favorite", "movie",
+                   "sports", "politics", "news"]),
+]
+
+KEYWORDS = KeywordMatcher({
+    "sentiment": SENTIMENT_KEYWORDS,
+    "intent": INTENT_KEYWORDS,
+    "off_topic": OFF_TOPIC_KEYWORDS,
+})
+
+# Trained hashed n-gram classifier (python intent_model.py train intent_corpus.jsonl); None if not built
+INTENT_MODEL = load_model()
+# Confidence below which the keyword matcher decides; unset uses each head's threshold calibrated on held-out data
+INTENT_MODEL_MIN_CONFIDENCE = (
+    float(os.environ["INTENT_MODEL_MIN_CONFIDENCE"]) if os.getenv("INTENT_MODEL_MIN_CONFIDENCE") else None
+)
+
+class Classification(NamedTuple):
+    sentiment: str
+    intent: str
+    off_topic: bool
+    confidence: Optional[float]  # the model's calibrated probability for intent; None without a model
+    keyword_intent: str  # what the keyword matcher alone found
+
+
 def get_capabilities():
     """
     Get the list of capabilities the virtual agent can help with
@@ -69,18 +161,52 @@ def authenticate_user(request: AuthenticationRequest):
         )
 
 
-def process_chat(request: VirtualAgentChatRequest):
+async def process_chat(request: VirtualAgentChatRequest):
     """
-    Process chat message with sentiment detection and intent recognition
+    Process chat message with sentiment detection and intent recognition. With a session_id the
+    conversation so far comes from the server-side session. Without one the client's
+    conversation_history is used; start_session moves that conversation into a new session
+    whose id is returned for the next turn, otherwise nothing is stored.
     """
-    try:
-        sentiment = detect_sentiment(request.message)
-        intent = detect_intent(request.message)
-        
+    session = None
+    if request.session_id:
+        session = await run_in_threadpool(CHAT_SESSIONS.get, request.session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found or expired")
+        off_topic_count = session.off_topic_count
+        history = session.history(5)
+        previous_intent = session.last_intent
+    else:
         off_topic_count = sum(1 for msg in request.conversation_history 
                              if hasattr(msg, 'sentiment') and msg.sentiment == "off_topic")
+        history = [f"{msg.role}: {msg.content}" for msg in request.conversation_history[-5:]]
+        previous_intent = next((msg.intent for msg in reversed(request.conversation_history) if msg.intent), None)
+    
+    response = await _respond(request, off_topic_count, history, previous_intent)
+    if session is None and request.start_session:
+        session = await run_in_threadpool(
+            CHAT_SESSIONS.start, [msg.model_dump() for msg in request.conversation_history]
+        )
+    if session is not None:
+        response.session_id = session.session_id
+        await run_in_threadpool(
+            CHAT_SESSIONS.record_turn, session, request.message, response.sentiment,
+            response.intent in ("off_topic", "transfer"), response.response, response.intent
+        )
+    return response
+
+
+async def _respond(request: VirtualAgentChatRequest, off_topic_count: int, history: list,
+                   previous_intent: Optional[str] = None) -> VirtualAgentChatResponse:
+    """
+    One agent turn given the conversation so far (off-topic count, recent "role: content" lines
+    and the intent of the previous turn)
+    """
+    try:
+        classification = classify(request.message)
+        sentiment, intent, off_topic, confidence, _ = classification
         
-        if is_off_topic(request.message):
+        if off_topic:
             off_topic_count += 1
             
             if off_topic_count >= 3:
@@ -90,7 +216,8 @@ def process_chat(request: VirtualAgentChatRequest):
                     intent="transfer",
                     suggested_actions=[],
                     transfer_to_agent=True,
-                    off_topic_count=off_topic_count
+                    off_topic_count=off_topic_count,
+                    intent_confidence=confidence
                 )
             else:
                 return VirtualAgentChatResponse(
@@ -99,58 +226,74 @@ def process_chat(request: VirtualAgentChatRequest):
                     intent="off_topic",
                     suggested_actions=["Check account balance", "Report lost card", "Dispute transaction"],
                     transfer_to_agent=False,
-                    off_topic_count=off_topic_count
+                    off_topic_count=off_topic_count,
+                    intent_confidence=confidence
                 )
         
-        # Update card state based on detected intent and conversation
-        message_lower = request.message.lower()
-        if intent == "lost_card" and "confirm" in message_lower:
-            card_state["card_1115"]["status"] = "lost_stolen"
-        elif intent == "freeze_card":
-            if "unfreeze" in message_lower or "unlock" in message_lower:
-                card_state["card_1115"]["status"] = "active"
-            else:
-                card_state["card_1115"]["status"] = "frozen"
+        # Update card state only on an unambiguous request (see card_update)
+        new_status = card_update(request.message, classification, previous_intent)
+        if new_status == "lost_stolen":
+            # The confirmation continues the lost card report, whatever the message alone looks like
+            intent, confidence = "lost_card", None
+        if new_status is not None:
+            await run_in_threadpool(set_card_status, DEMO_CARD_ID, new_status)
         
         # Get current card status
-        old_card_status = card_state["card_1115"]["status"]
+        old_card_status = (await run_in_threadpool(get_card_state, DEMO_CARD_ID))["status"]
         
-        conversation_context = "\n".join([
-            f"{msg.role}: {msg.content}" 
-            for msg in request.conversation_history[-5:]
-        ])
+        # Fixed answers (balance, freeze/unfreeze, lost card) come from templates without a completion
+        templated, _ = response_templates.reply(
+            intent, sentiment, confidence, request.message, new_status, previous_intent, DEMO_ACCOUNT
+        )
+        if templated is not None:
+            return VirtualAgentChatResponse(
+                response=templated,
+                sentiment=sentiment,
+                intent=intent,
+                suggested_actions=get_suggested_actions(intent),
+                transfer_to_agent=False,
+                off_topic_count=off_topic_count,
+                intent_confidence=confidence
+            )
+        
+        turns = {
+            "history": history,
+            "message": request.message
+        }
         
         system_prompt = f"""You are Tracy, a professional and empathetic Mastercard Contact Center Virtual Assistant helping customer Michael Miebach.
 
 CUSTOMER DATA (CONFIDENTIAL):
 - Name: Michael Miebach
-- Card ending in: 1115 (NEVER show full number 5555 3412 4444 1115)
+- Card ending in: {DEMO_ACCOUNT['card_last4']} (NEVER show full number 5555 3412 4444 1115)
 - Old Card Status: {old_card_status} (active, frozen, lost_stolen, or deactivated)
 - Address: 1 King Street West, Toronto, Ontario, M3J 3P8
 - Account Status: Good Standing
-- Current Balance: $16,475.00
-- Minimum Payment: $403.32
-- Next Payment Date: January 29th, 2026
+- Current Balance: {DEMO_ACCOUNT['balance']}
+- Minimum Payment: {DEMO_ACCOUNT['minimum_payment']}
+- Next Payment Date: {DEMO_ACCOUNT['next_payment_date']}
 - Last Purchase: $2.35 at Starbucks - Store #2456
 - Number of Cards: 1
 
 DETECTED INTENT: {intent}
 USER SENTIMENT: {sentiment}
+CARD STATUS CHANGED THIS TURN: {new_status or "no"}
 
 CAPABILITY-SPECIFIC INSTRUCTIONS:
 
 1. CHECK BALANCE (intent: check_balance):
-   - Simply provide the current balance: $16,475.00
+   - Simply provide the current balance: {DEMO_ACCOUNT['balance']}
    - Mention next payment date and minimum payment if relevant
 
 2. REPORT LOST/STOLEN CARD (intent: lost_card):
    - Ask user to type "confirm" to report card ending in 1115 as lost/stolen
-   - Once confirmed, tell them card is reported and new card will arrive in 48 hours
+   - Only if the card status changed to lost_stolen this turn, tell them card is reported and new card will arrive in 48 hours
    - Be empathetic about the situation
 
 3. FREEZE/UNFREEZE CARD (intent: freeze_card):
-   - If freezing: Confirm card ending in 1115 is now frozen
-   - If unfreezing: Confirm card ending in 1115 is now unfrozen and ready to use
+   - Only confirm a freeze or unfreeze if the card status changed this turn; otherwise answer from the current status and ask them to say "freeze my card" or "unfreeze my card"
+   - If frozen this turn: Confirm card ending in 1115 is now frozen
+   - If unfrozen this turn: Confirm card ending in 1115 is now unfrozen and ready to use
    - Keep response brief and clear
 
 4. ACTIVATE NEW CARD (intent: activate):
@@ -171,18 +314,17 @@ TONE: Professional, warm, concise. Use short clear sentences. Enhanced empathy i
 Provide a helpful, concise response based on the detected intent."""
         
         api_key = get_api_key()
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
+        completion_args = chat_budget.fit("virtual-agent", None, turns, lambda turns: {
+            "messages": [
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Previous conversation:\n{conversation_context}\n\nUser: {request.message}"}
+                {"role": "user", "content": "Previous conversation:\n" + "\n".join(turns["history"]) + f"\n\nUser: {turns['message']}"}
             ],
-            temperature=0.7,
-            max_tokens=300
-        )
+            "temperature": 0.7,
+            "max_tokens": 300
+        }, CHAT_REDUCERS, model=CHAT_MODEL)
+        completion = await chat_completion(api_key, model=CHAT_MODEL, **completion_args, usage_label="virtual-agent")
         
-        agent_response = response.choices[0].message.content
+        agent_response = completion.content
         suggested_actions = get_suggested_actions(intent)
         
         return VirtualAgentChatResponse(
@@ -191,70 +333,110 @@ Provide a helpful, concise response based on the detected intent."""
             intent=intent,
             suggested_actions=suggested_actions,
             transfer_to_agent=False,
-            off_topic_count=off_topic_count
+            off_topic_count=off_topic_count,
+            intent_confidence=confidence
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 
+async def get_session(session_id: str) -> ChatSessionResponse:
+    """Buffered turns and running totals of a chat session"""
+    session = await run_in_threadpool(CHAT_SESSIONS.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return ChatSessionResponse(
+        session_id=session.session_id,
+        created_at=session.created_at,
+        last_active=session.last_active,
+        turn_count=session.turn_count,
+        off_topic_count=session.off_topic_count,
+        sentiment_counts=session.sentiment_counts,
+        sentiment_trajectory=session.sentiment_trajectory,
+        turns=session.turns
+    )
+
+
+def keyword_classify(message: str) -> tuple:
+    """(sentiment, intent, off_topic) of a message from one scan of the compiled keyword matcher"""
+    found = KEYWORDS.scan(message)
+    return (
+        KEYWORDS.first(found, "sentiment") or "neutral",
+        KEYWORDS.first(found, "intent") or "general_inquiry",
+        ("off_topic", "off_topic") in found
+    )
+
+
+def _min_confidence(head: str) -> float:
+    if INTENT_MODEL_MIN_CONFIDENCE is not None:
+        return INTENT_MODEL_MIN_CONFIDENCE
+    return INTENT_MODEL.heads[head].min_confidence
+
+
+def classify(message: str) -> Classification:
+    """
+    Sentiment, intent and off-topic flag of a message. The local model decides each head it is
+    confident about (its calibrated threshold, or INTENT_MODEL_MIN_CONFIDENCE); the keyword matcher
+    covers the rest and every head when no model has been trained. confidence is the model's
+    probability for the intent the turn is answered as, whichever decided it.
+    """
+    sentiment, intent, off_topic = keyword_classify(message)
+    keyword_intent = intent
+    if INTENT_MODEL is None:
+        return Classification(sentiment, intent, off_topic, None, keyword_intent)
+    probabilities = INTENT_MODEL.probabilities(message)
+    model_sentiment = max(probabilities["sentiment"], key=probabilities["sentiment"].get)
+    if probabilities["sentiment"][model_sentiment] >= _min_confidence("sentiment"):
+        sentiment = model_sentiment
+    model_intent = max(probabilities["intent"], key=probabilities["intent"].get)
+    if probabilities["intent"][model_intent] >= _min_confidence("intent"):
+        intent, off_topic = model_intent, model_intent == "off_topic"
+    # Off-topic turns are answered (and reported) as the off_topic intent
+    confidence = probabilities["intent"].get("off_topic" if off_topic else intent)
+    return Classification(
+        sentiment, intent, off_topic, round(confidence, 3) if confidence is not None else None, keyword_intent
+    )
+
+
+def card_update(message: str, classification: Classification, previous_intent: Optional[str]) -> Optional[str]:
+    """
+    The card status this message asks for, or None. The model's label alone never changes a
+    card: freezing or unfreezing needs an explicit command ("please freeze my card") or the
+    keyword matcher to agree on a statement, and reporting the card lost needs a "confirm" right
+    after the agent asked for it (the previous turn's intent was lost_card). Negated actions and
+    questions ("do not freeze my card", "is my card frozen?") change nothing.
+    """
+    text = message.lower().strip()
+    if NEGATED_ACTION.search(text):
+        return None
+    if CONFIRMATION.match(text):
+        return "lost_stolen" if previous_intent == "lost_card" else None
+    if classification.intent != "freeze_card":
+        return None
+    command = CARD_COMMAND.match(text)
+    if command is not None:
+        return "active" if command.group("verb") in ("unfreeze", "unlock") else "frozen"
+    if classification.keyword_intent != "freeze_card" or QUESTION.search(text):
+        return None
+    return "active" if re.search(r"\bun(?:freeze|lock)", text) else "frozen"
+
+
 def detect_sentiment(message: str) -> str:
     """Detect sentiment from user message"""
-    message_lower = message.lower()
-    
-    frustrated_keywords = ["angry", "upset", "frustrated", "terrible", "awful", 
-                          "horrible", "worst", "ridiculous", "unacceptable"]
-    if any(keyword in message_lower for keyword in frustrated_keywords):
-        return "frustrated"
-    
-    negative_keywords = ["problem", "issue", "error", "wrong", "not working", 
-                        "help", "lost", "stolen"]
-    if any(keyword in message_lower for keyword in negative_keywords):
-        return "negative"
-    
-    positive_keywords = ["thank", "thanks", "great", "good", "perfect", 
-                        "excellent", "appreciate"]
-    if any(keyword in message_lower for keyword in positive_keywords):
-        return "positive"
-    
-    return "neutral"
+    return KEYWORDS.first(KEYWORDS.scan(message), "sentiment") or "neutral"
 
 
 def detect_intent(message: str) -> str:
     """Detect user intent from message"""
-    message_lower = message.lower()
-    
-    intent_patterns = {
-        "check_balance": ["balance", "how much", "account balance"],
-        "lost_card": ["lost", "stolen", "missing card", "lost my card", "lost wallet"],
-        "freeze_card": ["freeze", "lock", "disable", "turn off"],
-        "dispute": ["dispute", "charge", "transaction", "didn't make", "unauthorized"],
-        "new_card": ["new card", "replacement", "replace card"],
-        "rewards": ["rewards", "points", "cashback", "cash back"],
-        "travel": ["travel", "abroad", "overseas", "international"],
-        "activate": ["activate", "activation"],
-        "live_agent": ["agent", "human", "person", "representative", "speak to someone"],
-        "address": ["address", "billing address", "update address"]
-    }
-    
-    for intent, keywords in intent_patterns.items():
-        if any(keyword in message_lower for keyword in keywords):
-            return intent
-    
-    return "general_inquiry"
+    return KEYWORDS.first(KEYWORDS.scan(message), "intent") or "general_inquiry"
 
 
 def is_off_topic(message: str) -> bool:
     """Check if message is off-topic"""
-    message_lower = message.lower()
-    
-    off_topic_patterns = [
-        "weather", "joke", "tell me a joke", "how are you", "what's your name",
-        "where do you live", "personal life", "hobby", "favorite", "movie",
-        "sports", "politics", "news"
-    ]
-    
-    return any(pattern in message_lower for pattern in off_topic_patterns)
+    return ("off_topic", "off_topic") in KEYWORDS.scan(message)
 
 
 def get_suggested_actions(intent: str) -> list:
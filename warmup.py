@@ -0,0 +1,133 @@
+"""
+Analysis warm-up job
+Pre-generates every (scenario x audience), merchant, (customer x output mode x format) and
+dispute analysis through a bounded-concurrency worker pool and stores the results in the
+versioned artifact store that the analysis endpoints serve from.
+
+Usage:
+    python warmup.py --concurrency 8          # generate whatever is missing
+    python warmup.py --force                  # regenerate everything
+    python warmup.py --prune                  # also drop artifacts from older versions
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from functools import partial
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-worker lock
+    fcntl = None
+
+import analysis_prompts
+import llm_gateway
+from customer_profiles import CUSTOMER_PROFILES
+from dispute_cases import DISPUTE_CASES
+from fraud_scenarios import get_fraud_scenarios
+from llm_gateway import chat_completion
+from merchant_data import MERCHANTS
+
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "8"))
+
+
+def analysis_jobs():
+    """Yield (artifact item key, function building the completion arguments) for every analysis combination"""
+
+    for scenario in get_fraud_scenarios():
+        for audience in analysis_prompts.FRAUD_AUDIENCES:
+            yield (analysis_prompts.fraud_artifact_key(scenario["id"], audience),
+                   partial(analysis_prompts.fraud_analysis_completion, scenario, audience))
+
+    for merchant_id, merchant in MERCHANTS.items():
+        yield analysis_prompts.merchant_artifact_key(merchant_id), partial(analysis_prompts.merchant_narrative_completion, merchant_id, merchant)
+
+    for customer in CUSTOMER_PROFILES:
+        for output_mode in analysis_prompts.UPGRADE_OUTPUT_MODES:
+            for format_mode in analysis_prompts.UPGRADE_FORMAT_MODES:
+                yield (analysis_prompts.customer_artifact_key(customer["customer_id"], output_mode, format_mode),
+                       partial(analysis_prompts.customer_upgrade_completion, customer, output_mode, format_mode))
+
+    for dispute in DISPUTE_CASES:
+        yield analysis_prompts.dispute_artifact_key(dispute["case_id"]), partial(analysis_prompts.dispute_analysis_completion, dispute)
+
+
+async def run_warmup(api_key: str, concurrency: int = WARMUP_CONCURRENCY, force: bool = False) -> dict:
+    """Generate missing artifacts (all of them with force) and return a summary"""
+    store = analysis_prompts.analysis_artifacts
+
+    existing = set() if force else await run_in_threadpool(store.keys)
+    jobs = [(key, build) for key, build in analysis_jobs() if key not in existing]
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = {}
+
+    async def generate(item_key, build):
+        async with semaphore:
+            try:
+                completion = await chat_completion(api_key, **build(), use_cache=True, bypass_cache=force,
+                                                   usage_label="warmup")
+            except Exception as e:
+                failures[item_key] = str(e)
+                return
+            await run_in_threadpool(store.put, item_key, completion)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(generate(key, build) for key, build in jobs))
+
+    return {
+        "version": store.version,
+        "skipped": len(existing),
+        "generated": len(jobs) - len(failures),
+        "failed": failures,
+        "elapsed_seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+async def run_warmup_once_per_host(api_key: str, concurrency: int = WARMUP_CONCURRENCY) -> dict:
+    """Startup variant: only the first worker on the host to take the lock runs the job"""
+    if fcntl is None:
+        return await run_warmup(api_key, concurrency)
+
+    lock_path = analysis_prompts.analysis_artifacts.path + ".warmup.lock"
+    with open(lock_path, "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return {"version": analysis_prompts.analysis_artifacts.version, "skipped": "locked by another worker"}
+        return await run_warmup(api_key, concurrency)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=WARMUP_CONCURRENCY, help="max completions in flight")
+    parser.add_argument("--force", action="store_true", help="regenerate artifacts that already exist")
+    parser.add_argument("--prune", action="store_true", help="delete artifacts from older versions")
+    args = parser.parse_args()
+
+    api_key = llm_gateway.get_openai_api_key()
+    if not api_key:
+        sys.exit("OPENAI_API_KEY is not configured")
+
+    async def run():
+        try:
+            return await run_warmup(api_key, args.concurrency, args.force)
+        finally:
+            await llm_gateway.close_client()
+
+    summary = asyncio.run(run())
+    if args.prune:
+        summary["pruned"] = analysis_prompts.analysis_artifacts.prune()
+
+    print(f"Artifact version: {summary['version']}")
+    print(f"Generated: {summary['generated']}  Skipped: {summary['skipped']}  Failed: {len(summary['failed'])}")
+    for item_key, error in summary["failed"].items():
+        print(f"  {item_key}: {error}")
+    print(f"Elapsed: {summary['elapsed_seconds']}s")
+
+
+if __name__ == "__main__":
+    main_cli()